@@ -0,0 +1,67 @@
+"""add unread notification counters maintained by trigger
+
+Revision ID: add_contadores_notificacoes
+Revises: add_indice_historico
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_contadores_notificacoes'
+down_revision = 'add_indice_historico'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Número de participações não vistas de cada usuário
+    op.create_table(
+        'contadores_notificacoes',
+        sa.Column('usuario_id', sa.Integer(), sa.ForeignKey('usuarios.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('nao_vistas', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Trigger que mantém o contador na mesma transação de cada INSERT, DELETE
+    # (inclusive em cascata) ou UPDATE de reserva_participantes
+    op.execute("""
+        CREATE FUNCTION atualizar_contador_notificacoes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND NOT OLD.visto THEN
+                UPDATE contadores_notificacoes
+                SET nao_vistas = nao_vistas - 1
+                WHERE usuario_id = OLD.usuario_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NOT NEW.visto THEN
+                INSERT INTO contadores_notificacoes (usuario_id, nao_vistas)
+                VALUES (NEW.usuario_id, 1)
+                ON CONFLICT (usuario_id)
+                DO UPDATE SET nao_vistas = contadores_notificacoes.nao_vistas + 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_reserva_participantes_contador
+        AFTER INSERT OR DELETE OR UPDATE OF visto, usuario_id ON reserva_participantes
+        FOR EACH ROW EXECUTE FUNCTION atualizar_contador_notificacoes()
+    """)
+
+    # Popula os contadores a partir das participações existentes
+    op.execute("""
+        INSERT INTO contadores_notificacoes (usuario_id, nao_vistas)
+        SELECT usuario_id, COUNT(*)
+        FROM reserva_participantes
+        WHERE NOT visto
+        GROUP BY usuario_id
+    """)
+
+
+def downgrade() -> None:
+    # Remover trigger, função e tabela de contadores
+    op.execute('DROP TRIGGER trg_reserva_participantes_contador ON reserva_participantes')
+    op.execute('DROP FUNCTION atualizar_contador_notificacoes()')
+    op.drop_table('contadores_notificacoes')
@@ -0,0 +1,26 @@
+"""add index for user reservation history
+
+Revision ID: add_indice_historico
+Revises: add_indices_paginacao
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_indice_historico'
+down_revision = 'add_indices_paginacao'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reservas do usuário como responsável, ordenadas por data (usado por meuHistorico)
+    op.create_index('ix_reservas_responsavel_inicio', 'reservas', ['responsavel_id', 'data_hora_inicio'])
+
+
+def downgrade() -> None:
+    # Remover índice do histórico
+    op.drop_index('ix_reservas_responsavel_inicio', table_name='reservas')
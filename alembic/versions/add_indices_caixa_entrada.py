@@ -0,0 +1,42 @@
+"""add partial indexes for participant inbox queries
+
+Revision ID: add_indices_caixa_entrada
+Revises: add_contadores_notificacoes
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_indices_caixa_entrada'
+down_revision = 'add_contadores_notificacoes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Convites não vistos / não notificados de um usuário, ordenados por (created_at, id).
+    # Índices parciais: contêm apenas as linhas pendentes, que são poucas perto do histórico
+    op.create_index(
+        'ix_reserva_participantes_nao_vistas',
+        'reserva_participantes',
+        ['usuario_id', 'created_at', 'id'],
+        postgresql_where=sa.text('visto = false')
+    )
+    op.create_index(
+        'ix_reserva_participantes_nao_notificadas',
+        'reserva_participantes',
+        ['usuario_id', 'created_at', 'id'],
+        postgresql_where=sa.text('notificado = false')
+    )
+    # Coberto pelo prefixo de ix_reserva_participantes_usuario_created_at
+    op.drop_index('ix_reserva_participantes_usuario_id', table_name='reserva_participantes')
+
+
+def downgrade() -> None:
+    # Restaurar o índice simples e remover os índices parciais
+    op.create_index('ix_reserva_participantes_usuario_id', 'reserva_participantes', ['usuario_id'])
+    op.drop_index('ix_reserva_participantes_nao_notificadas', table_name='reserva_participantes')
+    op.drop_index('ix_reserva_participantes_nao_vistas', table_name='reserva_participantes')
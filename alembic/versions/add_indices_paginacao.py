@@ -0,0 +1,33 @@
+"""add indexes for keyset pagination
+
+Revision ID: add_indices_paginacao
+Revises: add_periodo_exclusao
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_indices_paginacao'
+down_revision = 'add_periodo_exclusao'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Ordenação (data_hora_inicio, id) usada por reservasConexao
+    op.create_index('ix_reservas_data_hora_inicio_id', 'reservas', ['data_hora_inicio', 'id'])
+    # Ordenação (created_at, id) dos convites de um usuário, usada por minhasReservasConvidadasConexao
+    op.create_index(
+        'ix_reserva_participantes_usuario_created_at',
+        'reserva_participantes',
+        ['usuario_id', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    # Remover índices de paginação
+    op.drop_index('ix_reserva_participantes_usuario_created_at', table_name='reserva_participantes')
+    op.drop_index('ix_reservas_data_hora_inicio_id', table_name='reservas')
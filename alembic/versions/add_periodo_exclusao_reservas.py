@@ -0,0 +1,46 @@
+"""add periodo column and exclusion constraint to reservas
+
+Revision ID: add_periodo_exclusao
+Revises: add_visto_col
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_periodo_exclusao'
+down_revision = 'add_visto_col'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # btree_gist permite usar sala_id (inteiro) com "=" dentro de um índice GiST
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+
+    # Coluna gerada com o intervalo [inicio, fim) da reserva
+    op.add_column('reservas', sa.Column(
+        'periodo',
+        postgresql.TSRANGE(),
+        sa.Computed("tsrange(data_hora_inicio, data_hora_fim, '[)')", persisted=True),
+        nullable=True
+    ))
+
+    # Constraint de exclusão: duas reservas da mesma sala não podem se sobrepor.
+    # Falha se já existirem reservas sobrepostas na mesma sala.
+    op.create_exclude_constraint(
+        'excl_reservas_sala_periodo',
+        'reservas',
+        ('sala_id', '='),
+        ('periodo', '&&'),
+        using='gist'
+    )
+
+
+def downgrade() -> None:
+    # Remover constraint de exclusão e coluna periodo
+    op.drop_constraint('excl_reservas_sala_periodo', 'reservas')
+    op.drop_column('reservas', 'periodo')
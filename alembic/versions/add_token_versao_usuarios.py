@@ -0,0 +1,26 @@
+"""add token_versao column to usuarios
+
+Revision ID: add_token_versao_usuarios
+Revises: add_indices_caixa_entrada
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_token_versao_usuarios'
+down_revision = 'add_indices_caixa_entrada'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Versão dos tokens do usuário: incrementada para invalidar os tokens já emitidos
+    op.add_column('usuarios', sa.Column('token_versao', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    # Remover coluna token_versao
+    op.drop_column('usuarios', 'token_versao')
@@ -0,0 +1,40 @@
+"""create refresh_tokens table
+
+Revision ID: create_refresh_tokens
+Revises: add_token_versao_usuarios
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'create_refresh_tokens'
+down_revision = 'add_token_versao_usuarios'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Criar tabela refresh_tokens (apenas o HMAC do token é armazenado)
+    op.create_table(
+        'refresh_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('token_hash', sa.String(64), nullable=False),
+        sa.Column('expira_em', sa.DateTime(), nullable=False),
+        sa.Column('revogado_em', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ondelete='CASCADE')
+    )
+    # Renovação: uma busca pelo hash do token
+    op.create_index('ix_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'], unique=True)
+    op.create_index('ix_refresh_tokens_usuario_id', 'refresh_tokens', ['usuario_id'])
+
+
+def downgrade() -> None:
+    # Remover tabela refresh_tokens
+    op.drop_index('ix_refresh_tokens_usuario_id', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_token_hash', table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
@@ -1,5 +1,12 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -46,6 +53,133 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+@dataclass(frozen=True)
+class IdentidadeToken:
+    """Usuário autenticado, como descrito pelas claims de um token já verificado."""
+    id: int
+    username: str
+    admin: bool
+    versao: int
+
+
+def claims_do_usuario(usuario: Usuario) -> dict:
+    """Claims do token de acesso: username (sub), id (uid), admin (adm) e versão dos tokens (ver)."""
+    return {
+        "sub": usuario.username,
+        "uid": usuario.id,
+        "adm": usuario.admin,
+        "ver": usuario.token_versao,
+    }
+
+
+class CacheTokens:
+    """
+    LRU dos tokens já verificados, com a identidade de cada um.
+    Um token em cache é aceito sem decodificar o JWT nem consultar o banco até expirar
+    (claim exp). A cada `revalidacao_segundos`, a versão dos tokens do usuário é conferida
+    de novo no banco (uma consulta pela chave primária), para que tokens invalidados em
+    outro worker deixem de valer; no worker que fez a alteração, remover_usuario()
+    os descarta imediatamente.
+    """
+
+    def __init__(self, max_entradas: int, revalidacao_segundos: int):
+        self.max_entradas = max_entradas
+        self.revalidacao_segundos = revalidacao_segundos
+        # token -> (identidade, expira_em, validado_em), em timestamps
+        self._entradas: "OrderedDict[str, Tuple[IdentidadeToken, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, token: str, agora: float) -> Optional[Tuple[IdentidadeToken, float, float]]:
+        """Retorna (identidade, expira_em, validado_em) do token, ou None se ausente ou expirado."""
+        with self._lock:
+            entrada = self._entradas.get(token)
+            if entrada is None:
+                return None
+            if agora >= entrada[1]:
+                del self._entradas[token]
+                return None
+            self._entradas.move_to_end(token)
+            return entrada
+
+    def registrar(self, token: str, identidade: IdentidadeToken, expira_em: float, agora: float) -> None:
+        with self._lock:
+            self._entradas[token] = (identidade, expira_em, agora)
+            self._entradas.move_to_end(token)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def remover_usuario(self, usuario_id: int) -> None:
+        """Descarta os tokens em cache de um usuário (após invalidar seus tokens ou removê-lo)."""
+        with self._lock:
+            for token in [t for t, (identidade, _, _) in self._entradas.items() if identidade.id == usuario_id]:
+                del self._entradas[token]
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_tokens = CacheTokens(
+    max_entradas=settings.auth_cache_tokens_max,
+    revalidacao_segundos=settings.auth_cache_revalidacao_segundos
+)
+
+
+def autenticar_token(db: Session, token: str) -> IdentidadeToken:
+    """
+    Valida o token de acesso e retorna a identidade do usuário.
+    Tokens já verificados vêm do cache_tokens, sem consultas ao banco; nos demais casos
+    a versão dos tokens do usuário (claim ver) é conferida com usuarios.token_versao.
+    Tokens antigos, sem as claims uid/adm/ver, são aceitos carregando o usuário pelo username.
+    Lança Exception com a mensagem de erro se o token não for válido.
+    """
+    agora = time.time()
+    entrada = cache_tokens.obter(token, agora)
+    if entrada is not None:
+        identidade, expira_em, validado_em = entrada
+        if agora - validado_em < cache_tokens.revalidacao_segundos:
+            return identidade
+    else:
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        except JWTError:
+            raise Exception("Token inválido ou expirado")
+        username = payload.get("sub")
+        if not username:
+            raise Exception("Token inválido")
+        expira_em = payload.get("exp", agora)
+        if "uid" in payload:
+            identidade = IdentidadeToken(
+                id=payload["uid"], username=username,
+                admin=bool(payload.get("adm")), versao=payload.get("ver", 0)
+            )
+        else:
+            usuario = get_user_by_username(db, username)
+            if not usuario:
+                raise Exception("Usuário não encontrado")
+            identidade = IdentidadeToken(
+                id=usuario.id, username=usuario.username, admin=usuario.admin, versao=0
+            )
+
+    versao_atual = db.query(Usuario.token_versao).filter(Usuario.id == identidade.id).scalar()
+    if versao_atual is None:
+        raise Exception("Usuário não encontrado")
+    if versao_atual != identidade.versao:
+        raise Exception("Token revogado, faça login novamente")
+    cache_tokens.registrar(token, identidade, expira_em, agora)
+    return identidade
+
+
+def gerar_refresh_token() -> str:
+    """Refresh token opaco (aleatório); apenas o seu hash é armazenado no banco."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """HMAC-SHA256 (hex) do refresh token com a SECRET_KEY: barato de calcular, ao contrário do bcrypt."""
+    return hmac.new(settings.secret_key.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
 def get_user_by_username(db: Session, username: str) -> Optional[Usuario]:
     return db.query(Usuario).filter(Usuario.username == username).first()
 
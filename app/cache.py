@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+Intervalo = Tuple[datetime, datetime]
+
+
+class CacheIntervalosSala:
+    """
+    Cache LRU em memória dos intervalos ocupados de cada sala, por dia.
+    Cada entrada guarda as reservas (inicio, fim) que tocam o dia, ordenadas por início.
+    O cache é local ao worker: as escritas feitas pelo próprio processo invalidam as
+    entradas afetadas, e o TTL limita o tempo que uma escrita de outro worker fica invisível.
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: int):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._entradas: "OrderedDict[Tuple[int, date], Tuple[float, List[Intervalo]]]" = OrderedDict()
+        self._geracoes: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def obter(self, sala_id: int, dia: date) -> Optional[List[Intervalo]]:
+        """Retorna os intervalos do dia ou None se não estiverem em cache (ou expiraram)."""
+        chave = (sala_id, dia)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            expira_em, intervalos = entrada
+            if expira_em < time.monotonic():
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return intervalos
+
+    def geracao(self, sala_id: int) -> int:
+        """Geração atual da sala; deve ser lida antes de consultar o banco."""
+        with self._lock:
+            return self._geracoes.get(sala_id, 0)
+
+    def armazenar(self, sala_id: int, dia: date, intervalos: List[Intervalo], geracao: int) -> None:
+        """
+        Armazena os intervalos do dia.
+        Ignora o valor se a sala foi invalidada depois que a consulta começou (geração mudou).
+        """
+        chave = (sala_id, dia)
+        with self._lock:
+            if self._geracoes.get(sala_id, 0) != geracao:
+                return
+            self._entradas[chave] = (time.monotonic() + self.ttl_segundos, intervalos)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, sala_id: Optional[int], inicio: datetime, fim: datetime) -> None:
+        """Remove os dias da sala tocados pelo intervalo [inicio, fim)."""
+        if not sala_id:
+            return
+        with self._lock:
+            self._geracoes[sala_id] = self._geracoes.get(sala_id, 0) + 1
+            dia = inicio.date()
+            ultimo_dia = (fim - timedelta(microseconds=1)).date()
+            while dia <= ultimo_dia:
+                self._entradas.pop((sala_id, dia), None)
+                dia += timedelta(days=1)
+
+    def limpar(self) -> None:
+        """Remove todas as entradas do cache."""
+        with self._lock:
+            self._entradas.clear()
+            self._geracoes.clear()
+
+
+cache_disponibilidade = CacheIntervalosSala(
+    max_entradas=settings.cache_disponibilidade_max_dias,
+    ttl_segundos=settings.cache_disponibilidade_ttl_segundos
+)
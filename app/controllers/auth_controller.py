@@ -1,22 +1,38 @@
+from sqlalchemy import Row, select
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from datetime import datetime, timedelta
+from typing import Optional, List, Sequence, Tuple
 
-from app.models import Usuario
-from app.auth import get_password_hash
+from app.config import settings
+from app.models import Usuario, RefreshToken
+from app.auth import cache_tokens, claims_do_usuario, gerar_refresh_token, get_password_hash, hash_refresh_token
 
 
 class AuthController:
     """Controller para gerenciar autenticação e usuários."""
     
     @staticmethod
-    def criar_usuario(db: Session, username: str, email: str, password: str, nome: Optional[str] = None, admin: bool = False) -> Usuario:
-        """Cria um novo usuário."""
-        # Valida tamanho da senha antes de fazer hash (bcrypt tem limite de 72 bytes)
-        password_bytes = password.encode('utf-8')
-        if len(password_bytes) > 72:
-            raise ValueError("A senha não pode ter mais de 72 caracteres")
-        
-        hashed_password = get_password_hash(password)
+    def criar_usuario(
+        db: Session,
+        username: str,
+        email: str,
+        password: Optional[str],
+        nome: Optional[str] = None,
+        admin: bool = False,
+        hashed_password: Optional[str] = None
+    ) -> Usuario:
+        """
+        Cria um novo usuário.
+        `hashed_password` é o hash já calculado (ex: por pool_senhas, fora do event loop);
+        sem ele, o hash de `password` é calculado aqui.
+        """
+        if hashed_password is None:
+            # Valida tamanho da senha antes de fazer hash (bcrypt tem limite de 72 bytes)
+            password_bytes = password.encode('utf-8')
+            if len(password_bytes) > 72:
+                raise ValueError("A senha não pode ter mais de 72 caracteres")
+            
+            hashed_password = get_password_hash(password)
         db_user = Usuario(
             nome=nome,
             username=username,
@@ -35,9 +51,15 @@ class AuthController:
         usuario_id: int,
         nome: Optional[str] = None,
         email: Optional[str] = None,
-        password: Optional[str] = None
+        password: Optional[str] = None,
+        hashed_password: Optional[str] = None
     ) -> Optional[Usuario]:
-        """Atualiza os dados de um usuário."""
+        """
+        Atualiza os dados de um usuário.
+        A nova senha pode vir já com o hash calculado em `hashed_password`.
+        Se a senha mudar, os tokens já emitidos para o usuário são invalidados
+        (como em atualizar_usuario_admin).
+        """
         usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
         if not usuario:
             return None
@@ -58,21 +80,54 @@ class AuthController:
             usuario.email = email
         
         # Atualiza senha se fornecido
-        if password is not None:
+        invalidar_tokens = False
+        if hashed_password is not None:
+            usuario.hashed_password = hashed_password
+            invalidar_tokens = True
+        elif password is not None:
             # Valida tamanho da senha
             password_bytes = password.encode('utf-8')
             if len(password_bytes) > 72:
                 raise ValueError("A senha não pode ter mais de 72 caracteres")
             usuario.hashed_password = get_password_hash(password)
+            invalidar_tokens = True
+        
+        if invalidar_tokens:
+            usuario.token_versao = Usuario.token_versao + 1
+            AuthController.revogar_refresh_tokens(db, usuario_id)
         
         db.commit()
+        if invalidar_tokens:
+            cache_tokens.remover_usuario(usuario_id)
         db.refresh(usuario)
         return usuario
     
     @staticmethod
-    def listar_usuarios(db: Session, skip: int = 0, limit: int = 100) -> List[Usuario]:
-        """Lista todos os usuários."""
-        return db.query(Usuario).offset(skip).limit(limit).all()
+    def listar_usuarios_linhas(db: Session, colunas: Sequence[str], skip: int = 0, limit: int = 100) -> List[Row]:
+        """
+        Lista usuários consultando (Core) apenas as `colunas` informadas.
+        Retorna linhas (Row), sem criar objetos ORM nem registrá-los na sessão.
+        """
+        consulta = select(*[Usuario.__table__.c[nome] for nome in colunas])
+        return db.execute(consulta.offset(skip).limit(limit)).all()
+    
+    @staticmethod
+    def listar_usuarios_linhas_por_cursor(
+        db: Session,
+        colunas: Sequence[str],
+        limit: int = 20,
+        apos_id: Optional[int] = None
+    ) -> List[Row]:
+        """Lista usuários ordenados por id a partir de apos_id (exclusivo), como listar_usuarios_linhas."""
+        consulta = select(*[Usuario.__table__.c[nome] for nome in colunas])
+        if apos_id is not None:
+            consulta = consulta.where(Usuario.id > apos_id)
+        return db.execute(consulta.order_by(Usuario.id).limit(limit)).all()
+    
+    @staticmethod
+    def obter_usuarios_por_ids(db: Session, usuario_ids: List[int]) -> List[Usuario]:
+        """Obtém vários usuários por ID em uma única consulta."""
+        return db.query(Usuario).filter(Usuario.id.in_(usuario_ids)).all()
     
     @staticmethod
     def obter_usuario_por_id(db: Session, usuario_id: int) -> Optional[Usuario]:
@@ -81,13 +136,14 @@ class AuthController:
     
     @staticmethod
     def deletar_usuario(db: Session, usuario_id: int) -> bool:
-        """Deleta um usuário."""
+        """Deleta um usuário. Os tokens dele deixam de ser aceitos."""
         usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
         if not usuario:
             return False
         
         db.delete(usuario)
         db.commit()
+        cache_tokens.remover_usuario(usuario_id)
         return True
     
     @staticmethod
@@ -97,11 +153,15 @@ class AuthController:
         nome: Optional[str] = None,
         email: Optional[str] = None,
         password: Optional[str] = None,
-        admin: Optional[bool] = None
+        admin: Optional[bool] = None,
+        hashed_password: Optional[str] = None
     ) -> Optional[Usuario]:
         """
         Atualiza um usuário (para uso por administradores).
         Permite atualizar nome, email, senha e status de admin.
+        A nova senha pode vir já com o hash calculado em `hashed_password`.
+        Se a senha ou o status de admin mudarem, os tokens já emitidos para o usuário
+        são invalidados (incrementa token_versao e revoga os refresh tokens).
         """
         usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
         if not usuario:
@@ -120,17 +180,85 @@ class AuthController:
                 raise ValueError("Email já está em uso")
             usuario.email = email
         
-        if password is not None:
+        invalidar_tokens = False
+        if hashed_password is not None:
+            usuario.hashed_password = hashed_password
+            invalidar_tokens = True
+        elif password is not None:
             if len(password.encode('utf-8')) > 72:
                 raise ValueError("A senha não pode ter mais de 72 caracteres")
             usuario.hashed_password = get_password_hash(password)
+            invalidar_tokens = True
         
-        if admin is not None:
+        if admin is not None and admin != usuario.admin:
             usuario.admin = admin
+            invalidar_tokens = True
+        
+        if invalidar_tokens:
+            usuario.token_versao = Usuario.token_versao + 1
+            AuthController.revogar_refresh_tokens(db, usuario_id)
         
         db.commit()
+        if invalidar_tokens:
+            cache_tokens.remover_usuario(usuario_id)
         db.refresh(usuario)
         return usuario
 
+    @staticmethod
+    def emitir_refresh_token(db: Session, usuario_id: int) -> str:
+        """
+        Cria um refresh token para o usuário e retorna o token (o banco guarda apenas o hash).
+        Remove os refresh tokens já expirados do usuário, mantendo a tabela pequena.
+        """
+        agora = datetime.utcnow()
+        db.query(RefreshToken).filter(
+            RefreshToken.usuario_id == usuario_id,
+            RefreshToken.expira_em < agora
+        ).delete(synchronize_session=False)
+        
+        token = gerar_refresh_token()
+        db.add(RefreshToken(
+            usuario_id=usuario_id,
+            token_hash=hash_refresh_token(token),
+            expira_em=agora + timedelta(days=settings.refresh_token_expire_days)
+        ))
+        db.commit()
+        return token
 
+    @staticmethod
+    def renovar_refresh_token(db: Session, token: str) -> Optional[Tuple[dict, str]]:
+        """
+        Troca um refresh token válido por um novo (rotação): o token usado é revogado.
+        Retorna (claims do token de acesso, novo refresh token), ou None se o token for
+        desconhecido, expirado ou já revogado. Reapresentar um token já trocado indica que
+        ele vazou: todos os refresh tokens do usuário são revogados.
+        Custa uma busca pelo hash (índice único) e um HMAC, sem bcrypt.
+        """
+        agora = datetime.utcnow()
+        resultado = db.query(RefreshToken, Usuario).join(
+            Usuario, Usuario.id == RefreshToken.usuario_id
+        ).filter(
+            RefreshToken.token_hash == hash_refresh_token(token)
+        ).with_for_update(of=RefreshToken).first()
+        if not resultado:
+            return None
+        
+        refresh_token, usuario = resultado
+        if refresh_token.revogado_em is not None:
+            AuthController.revogar_refresh_tokens(db, usuario.id)
+            db.commit()
+            return None
+        if refresh_token.expira_em <= agora:
+            return None
+        
+        refresh_token.revogado_em = agora
+        claims = claims_do_usuario(usuario)
+        return claims, AuthController.emitir_refresh_token(db, usuario.id)
 
+    @staticmethod
+    def revogar_refresh_tokens(db: Session, usuario_id: int) -> int:
+        """Revoga os refresh tokens ativos do usuário (sem commit). Retorna quantos foram revogados."""
+        return db.query(RefreshToken).filter(
+            RefreshToken.usuario_id == usuario_id,
+            RefreshToken.revogado_em.is_(None)
+        ).update({RefreshToken.revogado_em: datetime.utcnow()}, synchronize_session=False)
@@ -1,11 +1,240 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
-from datetime import datetime, date, timedelta
-from typing import Optional, List, Tuple
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy import and_, or_, func, select, exists, values, column, tuple_, Integer, DateTime, Row
+from sqlalchemy.exc import IntegrityError
+from bisect import bisect_left
+from calendar import monthrange
+from datetime import datetime, date, timedelta, timezone
+from typing import Optional, List, Sequence, Tuple, Dict
+import base64
 
-from app.models import Reserva, ReservaParticipante
-from app.views import ReservaCreate, ReservaUpdate, ReservaResponse
+import numpy as np
+
+from app.models import Reserva, ReservaParticipante, Sala
+from app.views import ReservaCreate, ReservaUpdate, ReservaResponse, FrequenciaRecorrencia
 from app.exceptions import ConflitoHorarioException
+from app.cache import cache_disponibilidade
+from app.notificacoes import canal_sala, canal_usuario, notificar
+
+# SQLSTATE do PostgreSQL para violação de constraint de exclusão
+EXCLUSION_VIOLATION = "23P01"
+
+# Acima deste número de dias, verificar_disponibilidade consulta o banco diretamente
+DIAS_MAXIMOS_VERIFICACAO_EM_CACHE = 7
+
+# Granularidades de slot aceitas (em minutos)
+GRANULARIDADES_PERMITIDAS = (5, 10, 15, 30, 60)
+
+# Maior período aceito pela grade de ocupação
+MAXIMO_DIAS_GRADE = 62
+MAXIMO_SALAS_GRADE = 50
+
+# Maior número de salas aceito por horariosDisponiveisSalas
+MAXIMO_SALAS_HORARIOS = 50
+
+# Maior número de ocorrências criadas por uma reserva recorrente
+MAXIMO_OCORRENCIAS_RECORRENCIA = 366
+
+# Limites da busca de salas disponíveis
+MAXIMO_DIAS_BUSCA_SALA = 31
+MAXIMO_RESULTADOS_BUSCA_SALA = 50
+
+
+def _eh_conflito_horario(erro: IntegrityError) -> bool:
+    """Indica se o erro de integridade veio da constraint de exclusão de horários."""
+    origem = erro.orig
+    codigo = getattr(origem, "pgcode", None) or getattr(origem, "sqlstate", None)
+    return codigo == EXCLUSION_VIOLATION
+
+
+def dados_timeline(reserva: Reserva) -> dict:
+    """Dados de uma reserva na timeline da sala (serializáveis em JSON)."""
+    return {
+        "id": reserva.id,
+        "sala_id": reserva.sala_id,
+        "responsavel_id": reserva.responsavel_id,
+        "data_hora_inicio": reserva.data_hora_inicio.isoformat(),
+        "data_hora_fim": reserva.data_hora_fim.isoformat(),
+    }
+
+
+def _notificar_timeline(db: Session, tipo: str, reserva: Reserva, sala_id: Optional[int] = None) -> None:
+    """
+    Publica a alteração da reserva no canal da sala (timeline), após o commit.
+    `sala_id` permite avisar a sala de origem quando a reserva muda de sala.
+    """
+    sala_id = sala_id or reserva.sala_id
+    if not sala_id:
+        return
+    notificar(db, canal_sala(sala_id), {"tipo": tipo, "reserva": dados_timeline(reserva)})
+
+
+def _periodo(data_hora_inicio: datetime, data_hora_fim: datetime):
+    """Monta o intervalo [inicio, fim) no mesmo formato da coluna Reserva.periodo."""
+    return func.tsrange(data_hora_inicio, data_hora_fim, '[)')
+
+
+def _para_utc_ingenuo(valor: datetime) -> datetime:
+    """
+    Converte um datetime com fuso para UTC sem fuso, o formato das colunas de reservas
+    (e dos intervalos em cache). Datetimes sem fuso são retornados como estão.
+    """
+    if valor.tzinfo is None:
+        return valor
+    return valor.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _janela_do_dia(data: date, hora_inicio: str, hora_fim: str) -> Tuple[datetime, datetime]:
+    """Converte as horas "HH:MM:SS" em datetimes de início e fim na data informada."""
+    hora_inicio_dt = datetime.strptime(hora_inicio, "%H:%M:%S").time()
+    hora_fim_dt = datetime.strptime(hora_fim, "%H:%M:%S").time()
+    return datetime.combine(data, hora_inicio_dt), datetime.combine(data, hora_fim_dt)
+
+
+def _calcular_intervalos_livres(
+    ocupados: List[Tuple[datetime, datetime]],
+    inicio: datetime,
+    fim: datetime
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Calcula os intervalos livres em [inicio, fim) a partir dos intervalos ocupados,
+    que devem estar ordenados por início.
+    """
+    horarios_disponiveis = []
+    horario_atual = inicio
+    
+    for ocupado_inicio, ocupado_fim in ocupados:
+        # Ignora reservas que terminam antes do horário atual (ou vazias, que não ocupam
+        # nada e só partiriam o intervalo livre) e para nas que começam depois da janela
+        if ocupado_fim <= horario_atual or ocupado_fim <= ocupado_inicio:
+            continue
+        if ocupado_inicio >= fim:
+            break
+        
+        # Se há um intervalo livre antes da reserva
+        if horario_atual < ocupado_inicio:
+            horarios_disponiveis.append((horario_atual, ocupado_inicio))
+        
+        # Atualiza o horário atual para depois do fim da reserva
+        horario_atual = ocupado_fim
+    
+    # Se ainda há tempo disponível após a última reserva
+    if horario_atual < fim:
+        horarios_disponiveis.append((horario_atual, fim))
+    
+    return horarios_disponiveis
+
+
+def _inicios_de_slots_livres(
+    livres: List[Tuple[datetime, datetime]],
+    inicio_grade: datetime,
+    passo: timedelta,
+    duracao: timedelta
+) -> List[str]:
+    """
+    Início ("HH:MM") de cada slot da grade alinhada em inicio_grade (de `passo` em `passo`)
+    a partir do qual há `duracao` livre dentro de um dos intervalos `livres` (ordenados).
+    Percorre os intervalos uma única vez: linear no número de intervalos mais o de slots.
+    """
+    horas_disponiveis = []
+    for livre_inicio, livre_fim in livres:
+        # Primeiro slot da grade que começa dentro do intervalo livre
+        indice = -(-(livre_inicio - inicio_grade) // passo)
+        slot = inicio_grade + indice * passo
+        while slot + duracao <= livre_fim:
+            horas_disponiveis.append(slot.strftime("%H:%M"))
+            slot += passo
+    return horas_disponiveis
+
+
+def _somar_meses(data_hora: datetime, meses: int) -> datetime:
+    """Soma meses a uma data, limitando o dia ao último dia do mês (ex: 31/01 + 1 mês = 28/02)."""
+    indice_mes = data_hora.month - 1 + meses
+    ano = data_hora.year + indice_mes // 12
+    mes = indice_mes % 12 + 1
+    dia = min(data_hora.day, monthrange(ano, mes)[1])
+    return data_hora.replace(year=ano, month=mes, day=dia)
+
+
+def _expandir_recorrencia(
+    data_hora_inicio: datetime,
+    data_hora_fim: datetime,
+    frequencia: FrequenciaRecorrencia,
+    intervalo: int,
+    data_limite: Optional[date],
+    ocorrencias: Optional[int]
+) -> List[Tuple[datetime, datetime]]:
+    """Gera os intervalos (inicio, fim) de cada ocorrência de uma reserva recorrente."""
+    duracao = data_hora_fim - data_hora_inicio
+    resultado = []
+    
+    while True:
+        passo = len(resultado) * intervalo
+        if frequencia == FrequenciaRecorrencia.DIARIA:
+            inicio = data_hora_inicio + timedelta(days=passo)
+        elif frequencia == FrequenciaRecorrencia.SEMANAL:
+            inicio = data_hora_inicio + timedelta(weeks=passo)
+        else:
+            # Sempre a partir da data original, para 31/01 -> 28/02 -> 31/03
+            inicio = _somar_meses(data_hora_inicio, passo)
+        
+        if data_limite is not None and inicio.date() > data_limite:
+            break
+        if ocorrencias is not None and len(resultado) >= ocorrencias:
+            break
+        if len(resultado) >= MAXIMO_OCORRENCIAS_RECORRENCIA:
+            raise ValueError(
+                f"Uma reserva recorrente não pode ter mais de {MAXIMO_OCORRENCIAS_RECORRENCIA} ocorrências"
+            )
+        
+        resultado.append((inicio, inicio + duracao))
+    
+    return resultado
+
+
+def _montar_grade_ocupacao(
+    linhas: Sequence[Tuple[int, datetime, datetime]],
+    sala_ids: List[int],
+    inicio: datetime,
+    total_slots: int,
+    passo: int
+) -> np.ndarray:
+    """
+    Grade booleana (salas x slots de `passo` segundos a partir de `inicio`) a partir das
+    reservas (sala_id, inicio, fim): grade[i, j] é True se a sala sala_ids[i] tem alguma
+    reserva tocando o slot j. Reservas fora da grade são recortadas.
+    """
+    grade = np.zeros((len(sala_ids), total_slots), dtype=bool)
+    if not linhas:
+        return grade
+    
+    # Segundos desde o início da grade (timedelta.total_seconds é bem mais rápido
+    # que converter listas de datetime para datetime64)
+    indice_sala = {sala_id: i for i, sala_id in enumerate(sala_ids)}
+    quantidade = len(linhas)
+    salas = np.fromiter((indice_sala[linha[0]] for linha in linhas), dtype=np.intp, count=quantidade)
+    inicios = np.fromiter(((linha[1] - inicio).total_seconds() for linha in linhas), dtype=np.float64, count=quantidade)
+    fins = np.fromiter(((linha[2] - inicio).total_seconds() for linha in linhas), dtype=np.float64, count=quantidade)
+    
+    # Slot de início arredondado para baixo e de fim para cima, limitados à grade
+    primeiro_slot = np.clip(np.floor(inicios / passo), 0, total_slots).astype(np.intp)
+    ultimo_slot = np.clip(np.ceil(fins / passo), 0, total_slots).astype(np.intp)
+    
+    # Vetor de diferenças: +1 onde a reserva começa, -1 onde termina; a soma acumulada
+    # de cada linha dá quantas reservas cobrem cada slot
+    diferencas = np.zeros((len(sala_ids), total_slots + 1), dtype=np.int32)
+    np.add.at(diferencas, (salas, primeiro_slot), 1)
+    np.add.at(diferencas, (salas, ultimo_slot), -1)
+    np.cumsum(diferencas[:, :-1], axis=1, out=diferencas[:, :-1])
+    grade[:] = diferencas[:, :-1] > 0
+    return grade
+
+
+def compactar_grade_ocupacao(grade: np.ndarray) -> List[str]:
+    """
+    Compacta cada linha da grade de ocupação em um bitmap codificado em base64.
+    Cada slot ocupa 1 bit (1 = ocupado), do bit mais significativo para o menos significativo.
+    """
+    return [base64.b64encode(linha.tobytes()).decode("ascii") for linha in np.packbits(grade, axis=1)]
 
 
 class ReservaController:
@@ -34,23 +263,8 @@ class ReservaController:
         else:
             query = db.query(Reserva).filter(Reserva.sala == sala)
         
-        # Adiciona filtros de conflito de horário
-        query = query.filter(
-            or_(
-                and_(
-                    Reserva.data_hora_inicio <= data_hora_inicio,
-                    Reserva.data_hora_fim > data_hora_inicio
-                ),
-                and_(
-                    Reserva.data_hora_inicio < data_hora_fim,
-                    Reserva.data_hora_fim >= data_hora_fim
-                ),
-                and_(
-                    Reserva.data_hora_inicio >= data_hora_inicio,
-                    Reserva.data_hora_fim <= data_hora_fim
-                )
-            )
-        )
+        # Sobreposição de intervalos (&&), atendida pelo índice GiST da constraint de exclusão
+        query = query.filter(Reserva.periodo.overlaps(_periodo(data_hora_inicio, data_hora_fim)))
         
         if reserva_id_excluir:
             query = query.filter(Reserva.id != reserva_id_excluir)
@@ -59,22 +273,22 @@ class ReservaController:
 
     @staticmethod
     def criar(db: Session, reserva: ReservaCreate, responsavel_id: int, sala_id: Optional[int] = None) -> Reserva:
-        """Cria uma nova reserva validando conflitos de horário."""
+        """
+        Cria uma nova reserva validando conflitos de horário.
+        Com sala_id, o conflito é detectado pela constraint de exclusão no próprio INSERT;
+        a verificação prévia só é feita para reservas legadas identificadas por sala (string).
+        """
         if reserva.data_hora_fim <= reserva.data_hora_inicio:
             raise ValueError("A data/hora de fim deve ser maior que a data/hora de início")
         
-        # Usa sala_id se fornecido, senão usa sala (string) para compatibilidade
-        sala_identificador = sala_id if sala_id else reserva.sala
-        
-        if ReservaController.verificar_conflito_horario(
+        if not sala_id and ReservaController.verificar_conflito_horario(
             db, 
-            sala_id=sala_id, 
-            sala=reserva.sala if not sala_id else None,
+            sala=reserva.sala,
             data_hora_inicio=reserva.data_hora_inicio, 
             data_hora_fim=reserva.data_hora_fim
         ):
             raise ConflitoHorarioException(
-                f"Já existe uma reserva para esta sala no horário especificado"
+                "Já existe uma reserva para esta sala no horário especificado"
             )
         
         reserva_data = reserva.model_dump()
@@ -86,20 +300,159 @@ class ReservaController:
             responsavel_id=responsavel_id
         )
         db.add(db_reserva)
-        db.commit()
+        try:
+            # flush antes do commit para que o id da reserva vá no evento da timeline
+            db.flush()
+            _notificar_timeline(db, "criada", db_reserva)
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if _eh_conflito_horario(e):
+                raise ConflitoHorarioException(
+                    "Já existe uma reserva para esta sala no horário especificado"
+                )
+            raise
+        cache_disponibilidade.invalidar(db_reserva.sala_id, db_reserva.data_hora_inicio, db_reserva.data_hora_fim)
         db.refresh(db_reserva)
         # Recarrega com relacionamento responsavel
         return ReservaController.obter_por_id(db, db_reserva.id)
 
+    @staticmethod
+    def criar_recorrentes(
+        db: Session,
+        reserva: ReservaCreate,
+        responsavel_id: int,
+        frequencia: FrequenciaRecorrencia,
+        intervalo: int = 1,
+        data_limite: Optional[date] = None,
+        ocorrencias: Optional[int] = None,
+        ignorar_conflitos: bool = False
+    ) -> Tuple[List[Reserva], List[Tuple[datetime, datetime]]]:
+        """
+        Cria todas as ocorrências de uma reserva recorrente em uma única transação.
+        A recorrência termina em data_limite (inclusive) ou após `ocorrencias` ocorrências.
+        
+        Os conflitos de todas as ocorrências são verificados em uma única consulta.
+        Se ignorar_conflitos=False, qualquer conflito cancela tudo (ConflitoHorarioException);
+        se True, apenas as ocorrências livres são criadas.
+        Retorna (reservas criadas, intervalos das ocorrências em conflito).
+        """
+        if not reserva.sala_id:
+            raise ValueError("Reservas recorrentes exigem sala_id")
+        if reserva.data_hora_fim <= reserva.data_hora_inicio:
+            raise ValueError("A data/hora de fim deve ser maior que a data/hora de início")
+        if intervalo < 1:
+            raise ValueError("O intervalo da recorrência deve ser maior ou igual a 1")
+        if data_limite is None and ocorrencias is None:
+            raise ValueError("Informe a data final ou o número de ocorrências da recorrência")
+        if ocorrencias is not None and ocorrencias < 1:
+            raise ValueError("O número de ocorrências deve ser maior ou igual a 1")
+        
+        intervalos = _expandir_recorrencia(
+            reserva.data_hora_inicio, reserva.data_hora_fim, frequencia, intervalo, data_limite, ocorrencias
+        )
+        if not intervalos:
+            raise ValueError("A recorrência não gera nenhuma ocorrência")
+        for (_, fim_anterior), (inicio_seguinte, _) in zip(intervalos, intervalos[1:]):
+            if inicio_seguinte < fim_anterior:
+                raise ValueError("A duração da reserva é maior que o intervalo entre as ocorrências")
+        
+        # Verifica todas as ocorrências contra as reservas existentes em uma única consulta
+        candidatos = values(
+            column("indice", Integer),
+            column("inicio", DateTime),
+            column("fim", DateTime),
+            name="candidatos"
+        ).data([(indice, inicio, fim) for indice, (inicio, fim) in enumerate(intervalos)])
+        indices_conflitantes = set(db.execute(
+            select(candidatos.c.indice).where(
+                exists().where(
+                    Reserva.sala_id == reserva.sala_id,
+                    Reserva.periodo.overlaps(_periodo(candidatos.c.inicio, candidatos.c.fim))
+                )
+            )
+        ).scalars())
+        
+        conflitos = [intervalos[indice] for indice in sorted(indices_conflitantes)]
+        if conflitos and not ignorar_conflitos:
+            raise ConflitoHorarioException(
+                "Já existe uma reserva para esta sala nos horários: "
+                + ", ".join(inicio.strftime("%d/%m/%Y %H:%M") for inicio, _ in conflitos)
+            )
+        
+        reserva_data = reserva.model_dump(exclude={"data_hora_inicio", "data_hora_fim"})
+        novas_reservas = [
+            Reserva(
+                **reserva_data,
+                data_hora_inicio=inicio,
+                data_hora_fim=fim,
+                responsavel_id=responsavel_id
+            )
+            for indice, (inicio, fim) in enumerate(intervalos)
+            if indice not in indices_conflitantes
+        ]
+        if not novas_reservas:
+            return [], conflitos
+        
+        db.add_all(novas_reservas)
+        try:
+            # flush envia os INSERTs em lote; os ids são lidos antes do commit expirar os objetos
+            db.flush()
+            ids = [r.id for r in novas_reservas]
+            for nova_reserva in novas_reservas:
+                _notificar_timeline(db, "criada", nova_reserva)
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if _eh_conflito_horario(e):
+                raise ConflitoHorarioException(
+                    "Já existe uma reserva para esta sala em um dos horários especificados"
+                )
+            raise
+        
+        for inicio, fim in intervalos:
+            cache_disponibilidade.invalidar(reserva.sala_id, inicio, fim)
+        
+        criadas = db.query(Reserva).options(joinedload(Reserva.responsavel)).filter(
+            Reserva.id.in_(ids)
+        ).order_by(Reserva.data_hora_inicio).all()
+        return criadas, conflitos
+
     @staticmethod
     def obter_por_id(db: Session, reserva_id: int) -> Optional[Reserva]:
         """Obtém uma reserva por ID com relacionamento responsavel carregado."""
         return db.query(Reserva).options(joinedload(Reserva.responsavel)).filter(Reserva.id == reserva_id).first()
 
     @staticmethod
-    def listar(db: Session, skip: int = 0, limit: int = 100) -> List[Reserva]:
-        """Lista todas as reservas com relacionamento responsavel carregado."""
-        return db.query(Reserva).options(joinedload(Reserva.responsavel)).offset(skip).limit(limit).all()
+    def obter_por_ids(db: Session, reserva_ids: List[int]) -> List[Reserva]:
+        """Obtém várias reservas por ID em uma única consulta."""
+        return db.query(Reserva).filter(Reserva.id.in_(reserva_ids)).all()
+
+    @staticmethod
+    def listar_linhas(db: Session, colunas: Sequence[str], skip: int = 0, limit: int = 100) -> List[Row]:
+        """
+        Lista reservas consultando (Core) apenas as `colunas` informadas.
+        Retorna linhas (Row), sem criar objetos ORM nem registrá-los na sessão.
+        """
+        consulta = select(*[Reserva.__table__.c[nome] for nome in colunas])
+        return db.execute(consulta.offset(skip).limit(limit)).all()
+
+    @staticmethod
+    def listar_linhas_por_cursor(
+        db: Session,
+        colunas: Sequence[str],
+        limit: int = 20,
+        apos: Optional[Tuple[datetime, int]] = None
+    ) -> List[Row]:
+        """
+        Lista reservas ordenadas por (data_hora_inicio, id) a partir da chave `apos` (exclusiva),
+        como listar_linhas. A comparação de tuplas usa o índice (data_hora_inicio, id), então
+        qualquer página custa o mesmo que a primeira.
+        """
+        consulta = select(*[Reserva.__table__.c[nome] for nome in colunas])
+        if apos is not None:
+            consulta = consulta.where(tuple_(Reserva.data_hora_inicio, Reserva.id) > tuple_(*apos))
+        return db.execute(consulta.order_by(Reserva.data_hora_inicio, Reserva.id).limit(limit)).all()
 
     @staticmethod
     def atualizar(
@@ -118,6 +471,9 @@ class ReservaController:
             return None
         
         update_data = reserva_update.model_dump(exclude_unset=True)
+        sala_id_anterior = db_reserva.sala_id
+        inicio_anterior = db_reserva.data_hora_inicio
+        fim_anterior = db_reserva.data_hora_fim
         
         # Se está atualizando horário ou sala, verifica conflitos
         if "data_hora_inicio" in update_data or "data_hora_fim" in update_data or "sala" in update_data or "sala_id" in update_data:
@@ -129,22 +485,36 @@ class ReservaController:
             if nova_fim <= nova_inicio:
                 raise ValueError("A data/hora de fim deve ser maior que a data/hora de início")
             
-            if ReservaController.verificar_conflito_horario(
+            # Com sala_id a constraint de exclusão valida o UPDATE; sala (string) ainda é verificada aqui
+            if not nova_sala_id and ReservaController.verificar_conflito_horario(
                 db, 
-                sala_id=nova_sala_id,
-                sala=nova_sala if not nova_sala_id else None,
+                sala=nova_sala,
                 data_hora_inicio=nova_inicio, 
                 data_hora_fim=nova_fim, 
                 reserva_id_excluir=reserva_id
             ):
                 raise ConflitoHorarioException(
-                    f"Já existe uma reserva para esta sala no horário especificado"
+                    "Já existe uma reserva para esta sala no horário especificado"
                 )
         
         for field, value in update_data.items():
             setattr(db_reserva, field, value)
         
-        db.commit()
+        try:
+            db.flush()
+            if sala_id_anterior and sala_id_anterior != db_reserva.sala_id:
+                _notificar_timeline(db, "removida", db_reserva, sala_id=sala_id_anterior)
+            _notificar_timeline(db, "atualizada", db_reserva)
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if _eh_conflito_horario(e):
+                raise ConflitoHorarioException(
+                    "Já existe uma reserva para esta sala no horário especificado"
+                )
+            raise
+        cache_disponibilidade.invalidar(sala_id_anterior, inicio_anterior, fim_anterior)
+        cache_disponibilidade.invalidar(db_reserva.sala_id, db_reserva.data_hora_inicio, db_reserva.data_hora_fim)
         db.refresh(db_reserva)
         return db_reserva
 
@@ -159,8 +529,17 @@ class ReservaController:
         if db_reserva.responsavel_id != responsavel_id:
             return False
         
+        # Os participantes são removidos em cascata; avisa cada um (contador de não vistas)
+        participantes = db.query(ReservaParticipante.usuario_id).filter(
+            ReservaParticipante.reserva_id == reserva_id
+        ).all()
+        for (usuario_id,) in participantes:
+            notificar(db, canal_usuario(usuario_id), {"tipo": "removido", "reserva_id": reserva_id})
+        
+        _notificar_timeline(db, "removida", db_reserva)
         db.delete(db_reserva)
         db.commit()
+        cache_disponibilidade.invalidar(db_reserva.sala_id, db_reserva.data_hora_inicio, db_reserva.data_hora_fim)
         return True
 
     @staticmethod
@@ -169,18 +548,97 @@ class ReservaController:
         sala_id: int, 
         data: date,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        opcoes: Optional[List] = None
     ) -> List[Reserva]:
-        """Lista todas as reservas de uma sala em uma data específica."""
+        """
+        Lista todas as reservas de uma sala em uma data específica.
+        `opcoes` substitui o carregamento padrão (ex: load_only apenas das colunas pedidas).
+        """
         inicio_dia = datetime.combine(data, datetime.min.time())
         fim_dia = datetime.combine(data, datetime.max.time())
         
-        return db.query(Reserva).options(joinedload(Reserva.responsavel)).filter(
+        if opcoes is None:
+            opcoes = [joinedload(Reserva.responsavel)]
+        return db.query(Reserva).options(*opcoes).filter(
             Reserva.sala_id == sala_id,
             Reserva.data_hora_inicio >= inicio_dia,
             Reserva.data_hora_inicio < fim_dia + timedelta(days=1)
         ).order_by(Reserva.data_hora_inicio).offset(skip).limit(limit).all()
 
+    @staticmethod
+    def listar_timeline_do_dia(db: Session, sala_id: int, data: date) -> List[Reserva]:
+        """
+        Reservas da sala que tocam o dia (inclusive as que começaram no dia anterior),
+        ordenadas por início, com apenas as colunas usadas pela timeline.
+        """
+        inicio_dia = datetime.combine(data, datetime.min.time())
+        fim_dia = inicio_dia + timedelta(days=1)
+        return db.query(Reserva).options(
+            load_only(
+                Reserva.id, Reserva.sala_id, Reserva.responsavel_id,
+                Reserva.data_hora_inicio, Reserva.data_hora_fim
+            )
+        ).filter(
+            Reserva.sala_id == sala_id,
+            Reserva.data_hora_inicio < fim_dia,
+            Reserva.data_hora_fim > inicio_dia
+        ).order_by(Reserva.data_hora_inicio).all()
+
+    @staticmethod
+    def obter_intervalos_ocupados_do_dia(
+        db: Session,
+        sala_id: int,
+        data: date
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Retorna os intervalos (inicio, fim) das reservas da sala que tocam o dia, ordenados por início.
+        Usa o cache em memória e só consulta o banco quando o dia não está em cache.
+        """
+        return ReservaController.obter_intervalos_ocupados_do_dia_salas(db, [sala_id], data)[sala_id]
+
+    @staticmethod
+    def obter_intervalos_ocupados_do_dia_salas(
+        db: Session,
+        sala_ids: List[int],
+        data: date
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """
+        Versão para várias salas de obter_intervalos_ocupados_do_dia.
+        As salas que não estão em cache são carregadas juntas em uma única consulta.
+        """
+        resultado = {}
+        faltantes = []
+        for sala_id in sala_ids:
+            intervalos = cache_disponibilidade.obter(sala_id, data)
+            if intervalos is None:
+                faltantes.append(sala_id)
+            else:
+                resultado[sala_id] = intervalos
+        
+        if not faltantes:
+            return resultado
+        
+        geracoes = {sala_id: cache_disponibilidade.geracao(sala_id) for sala_id in faltantes}
+        inicio_dia = datetime.combine(data, datetime.min.time())
+        fim_dia = inicio_dia + timedelta(days=1)
+        
+        for sala_id in faltantes:
+            resultado[sala_id] = []
+        
+        linhas = db.query(Reserva.sala_id, Reserva.data_hora_inicio, Reserva.data_hora_fim).filter(
+            Reserva.sala_id.in_(faltantes),
+            Reserva.periodo.overlaps(_periodo(inicio_dia, fim_dia))
+        ).order_by(Reserva.sala_id, Reserva.data_hora_inicio).all()
+        
+        for sala_id, inicio, fim in linhas:
+            resultado[sala_id].append((inicio, fim))
+        
+        for sala_id in faltantes:
+            cache_disponibilidade.armazenar(sala_id, data, resultado[sala_id], geracoes[sala_id])
+        
+        return resultado
+
     @staticmethod
     def obter_horarios_disponiveis(
         db: Session,
@@ -193,50 +651,167 @@ class ReservaController:
         Retorna lista de intervalos de horários disponíveis para uma sala em uma data.
         Retorna lista de tuplas (inicio, fim) representando os horários livres.
         """
-        # Converte strings de hora para datetime
-        hora_inicio_dt = datetime.strptime(hora_inicio, "%H:%M:%S").time()
-        hora_fim_dt = datetime.strptime(hora_fim, "%H:%M:%S").time()
+        inicio_dia, fim_dia = _janela_do_dia(data, hora_inicio, hora_fim)
         
-        inicio_dia = datetime.combine(data, hora_inicio_dt)
-        fim_dia = datetime.combine(data, hora_fim_dt)
+        ocupados = ReservaController.obter_intervalos_ocupados_do_dia(db, sala_id, data)
+        return _calcular_intervalos_livres(ocupados, inicio_dia, fim_dia)
+
+    @staticmethod
+    def obter_horarios_disponiveis_salas(
+        db: Session,
+        sala_ids: List[int],
+        data: date,
+        hora_inicio: str = "08:00:00",
+        hora_fim: str = "18:00:00"
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """
+        Retorna os horários disponíveis de várias salas em uma data.
+        Todas as reservas necessárias são buscadas em uma única consulta.
+        Retorna um dicionário {sala_id: [(inicio, fim), ...]} na ordem de sala_ids.
+        """
+        sala_ids = list(dict.fromkeys(sala_ids))  # Remove duplicatas mantendo a ordem
+        if len(sala_ids) > MAXIMO_SALAS_HORARIOS:
+            raise ValueError(f"A consulta não pode ter mais de {MAXIMO_SALAS_HORARIOS} salas")
+        return ReservaController._horarios_disponiveis_salas(db, sala_ids, data, hora_inicio, hora_fim)
+
+    @staticmethod
+    def _horarios_disponiveis_salas(
+        db: Session,
+        sala_ids: List[int],
+        data: date,
+        hora_inicio: str,
+        hora_fim: str
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """obter_horarios_disponiveis_salas sem o limite de salas (sala_ids já sem duplicatas)."""
+        inicio_dia, fim_dia = _janela_do_dia(data, hora_inicio, hora_fim)
+        
+        ocupados_por_sala = ReservaController.obter_intervalos_ocupados_do_dia_salas(db, sala_ids, data)
+        return {
+            sala_id: _calcular_intervalos_livres(ocupados_por_sala[sala_id], inicio_dia, fim_dia)
+            for sala_id in sala_ids
+        }
+
+    @staticmethod
+    def obter_horarios_disponiveis_salas_ativas(
+        db: Session,
+        data: date,
+        hora_inicio: str = "08:00:00",
+        hora_fim: str = "18:00:00"
+    ) -> Dict[int, List[Tuple[datetime, datetime]]]:
+        """Retorna os horários disponíveis de todas as salas ativas em uma data."""
+        sala_ids = [
+            sala_id for (sala_id,) in db.query(Sala.id).filter(Sala.ativa == True).order_by(Sala.id).all()
+        ]
+        return ReservaController._horarios_disponiveis_salas(db, sala_ids, data, hora_inicio, hora_fim)
+
+    @staticmethod
+    def buscar_salas_disponiveis(
+        db: Session,
+        duracao_minutos: int,
+        janela_inicio: datetime,
+        janela_fim: datetime,
+        capacidade_minima: Optional[int] = None,
+        limite: int = 5,
+        hora_inicio: str = "08:00:00",
+        hora_fim: str = "18:00:00",
+        apenas_dias_uteis: bool = True
+    ) -> List[Tuple[Sala, datetime, datetime]]:
+        """
+        Busca as primeiras salas ativas (com capacidade >= capacidade_minima) que têm um horário
+        livre de duracao_minutos dentro da janela, respeitando o expediente hora_inicio/hora_fim.
+        Retorna até `limite` tuplas (sala, inicio, fim), uma por sala, ordenadas pelo horário.
         
-        # Busca todas as reservas do dia
-        reservas = db.query(Reserva).filter(
-            Reserva.sala_id == sala_id,
-            or_(
-                and_(
-                    Reserva.data_hora_inicio >= inicio_dia,
-                    Reserva.data_hora_inicio < fim_dia
-                ),
-                and_(
-                    Reserva.data_hora_fim > inicio_dia,
-                    Reserva.data_hora_fim <= fim_dia
-                ),
-                and_(
-                    Reserva.data_hora_inicio <= inicio_dia,
-                    Reserva.data_hora_fim >= fim_dia
+        Percorre a janela dia a dia (uma consulta por dia, só para as salas ainda sem horário)
+        e para assim que encontra `limite` salas, sem montar o calendário inteiro.
+        Janelas com fuso são convertidas para UTC, como os horários das reservas.
+        """
+        janela_inicio = _para_utc_ingenuo(janela_inicio)
+        janela_fim = _para_utc_ingenuo(janela_fim)
+        if duracao_minutos <= 0:
+            raise ValueError("A duração deve ser maior que zero")
+        if janela_fim <= janela_inicio:
+            raise ValueError("O fim da janela deve ser maior que o início")
+        if (janela_fim - janela_inicio).days >= MAXIMO_DIAS_BUSCA_SALA:
+            raise ValueError(f"A janela de busca não pode ter mais de {MAXIMO_DIAS_BUSCA_SALA} dias")
+        if limite < 1 or limite > MAXIMO_RESULTADOS_BUSCA_SALA:
+            raise ValueError(f"O limite deve estar entre 1 e {MAXIMO_RESULTADOS_BUSCA_SALA}")
+        
+        query = db.query(Sala).filter(Sala.ativa == True)
+        if capacidade_minima is not None:
+            query = query.filter(Sala.capacidade >= capacidade_minima)
+        # Prefere a menor sala que comporta o grupo
+        salas_pendentes = {sala.id: sala for sala in query.order_by(Sala.capacidade, Sala.id).all()}
+        
+        duracao = timedelta(minutes=duracao_minutos)
+        encontradas = []
+        dia = janela_inicio.date()
+        
+        while dia <= janela_fim.date() and salas_pendentes and len(encontradas) < limite:
+            if apenas_dias_uteis and dia.weekday() >= 5:
+                dia += timedelta(days=1)
+                continue
+            
+            expediente_inicio, expediente_fim = _janela_do_dia(dia, hora_inicio, hora_fim)
+            inicio = max(expediente_inicio, janela_inicio)
+            fim = min(expediente_fim, janela_fim)
+            
+            if fim - inicio >= duracao:
+                ocupados_por_sala = ReservaController.obter_intervalos_ocupados_do_dia_salas(
+                    db, list(salas_pendentes), dia
                 )
-            )
-        ).order_by(Reserva.data_hora_inicio).all()
-        
-        # Calcula intervalos disponíveis
-        horarios_disponiveis = []
-        horario_atual = inicio_dia
-        
-        for reserva in reservas:
-            # Se há um intervalo livre antes da reserva
-            if horario_atual < reserva.data_hora_inicio:
-                horarios_disponiveis.append((horario_atual, reserva.data_hora_inicio))
+                encontradas_no_dia = []
+                for sala_id, ocupados in ocupados_por_sala.items():
+                    for livre_inicio, livre_fim in _calcular_intervalos_livres(ocupados, inicio, fim):
+                        if livre_fim - livre_inicio >= duracao:
+                            encontradas_no_dia.append((salas_pendentes[sala_id], livre_inicio, livre_inicio + duracao))
+                            break
+                
+                # Todo horário deste dia vem antes dos próximos dias, então basta ordenar o dia
+                encontradas_no_dia.sort(key=lambda item: (item[1], item[0].capacidade or 0, item[0].id))
+                for item in encontradas_no_dia[:limite - len(encontradas)]:
+                    encontradas.append(item)
+                    del salas_pendentes[item[0].id]
             
-            # Atualiza o horário atual para depois do fim da reserva
-            if reserva.data_hora_fim > horario_atual:
-                horario_atual = reserva.data_hora_fim
-        
-        # Se ainda há tempo disponível após a última reserva
-        if horario_atual < fim_dia:
-            horarios_disponiveis.append((horario_atual, fim_dia))
+            dia += timedelta(days=1)
         
-        return horarios_disponiveis
+        return encontradas
+
+    @staticmethod
+    def gerar_grade_ocupacao(
+        db: Session,
+        sala_ids: List[int],
+        data_inicio: date,
+        data_fim: date,
+        granularidade_minutos: int = 15
+    ) -> Tuple[datetime, np.ndarray]:
+        """
+        Gera a grade de ocupação (salas x slots) do período [data_inicio, data_fim], dias inteiros.
+        Retorna (inicio da grade, matriz booleana) onde grade[i, j] é True se a sala sala_ids[i]
+        tem alguma reserva tocando o slot j. Usa uma única consulta e operações vetorizadas.
+        """
+        if granularidade_minutos not in GRANULARIDADES_PERMITIDAS:
+            raise ValueError(f"Granularidade inválida. Use um destes valores: {GRANULARIDADES_PERMITIDAS}")
+        if data_fim < data_inicio:
+            raise ValueError("A data de fim deve ser maior ou igual à data de início")
+        if (data_fim - data_inicio).days + 1 > MAXIMO_DIAS_GRADE:
+            raise ValueError(f"O período não pode ter mais de {MAXIMO_DIAS_GRADE} dias")
+        sala_ids = list(dict.fromkeys(sala_ids))
+        if len(sala_ids) > MAXIMO_SALAS_GRADE:
+            raise ValueError(f"A grade não pode ter mais de {MAXIMO_SALAS_GRADE} salas")
+        
+        inicio = datetime.combine(data_inicio, datetime.min.time())
+        fim = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+        passo = granularidade_minutos * 60  # em segundos
+        total_slots = int((fim - inicio).total_seconds()) // passo
+        
+        if not sala_ids:
+            return inicio, np.zeros((0, total_slots), dtype=bool)
+        
+        linhas = db.query(Reserva.sala_id, Reserva.data_hora_inicio, Reserva.data_hora_fim).filter(
+            Reserva.sala_id.in_(sala_ids),
+            Reserva.periodo.overlaps(_periodo(inicio, fim))
+        ).all()
+        return inicio, _montar_grade_ocupacao(linhas, sala_ids, inicio, total_slots, passo)
 
     @staticmethod
     def verificar_disponibilidade(
@@ -248,13 +823,32 @@ class ReservaController:
         """
         Verifica se um horário específico está disponível para uma sala.
         Retorna True se disponível, False se ocupado.
+        Horários com fuso são convertidos para UTC, como os intervalos em cache.
         """
-        return not ReservaController.verificar_conflito_horario(
-            db,
-            sala_id=sala_id,
-            data_hora_inicio=data_hora_inicio,
-            data_hora_fim=data_hora_fim
-        )
+        data_hora_inicio = _para_utc_ingenuo(data_hora_inicio)
+        data_hora_fim = _para_utc_ingenuo(data_hora_fim)
+        dia = data_hora_inicio.date()
+        ultimo_dia = (data_hora_fim - timedelta(microseconds=1)).date()
+        
+        # Intervalos longos vão direto ao banco para não encher o cache com dias avulsos
+        if (ultimo_dia - dia).days > DIAS_MAXIMOS_VERIFICACAO_EM_CACHE:
+            return not ReservaController.verificar_conflito_horario(
+                db,
+                sala_id=sala_id,
+                data_hora_inicio=data_hora_inicio,
+                data_hora_fim=data_hora_fim
+            )
+        
+        while dia <= ultimo_dia:
+            ocupados = ReservaController.obter_intervalos_ocupados_do_dia(db, sala_id, dia)
+            # Reservas da mesma sala não se sobrepõem (constraint de exclusão), então os
+            # fins também estão ordenados: basta olhar a última que começa antes do fim pedido
+            indice = bisect_left(ocupados, (data_hora_fim,))
+            if indice > 0 and ocupados[indice - 1][1] > data_hora_inicio:
+                return False
+            dia += timedelta(days=1)
+        
+        return True
 
     @staticmethod
     def obter_horarios_disponiveis_por_hora(
@@ -262,62 +856,32 @@ class ReservaController:
         sala_id: int,
         data: date,
         hora_inicio: str = "08:00:00",
-        hora_fim: str = "18:00:00"
+        hora_fim: str = "18:00:00",
+        granularidade_minutos: int = 60,
+        duracao_minima_minutos: Optional[int] = None
     ) -> List[str]:
         """
-        Retorna lista de horários disponíveis em formato de slots de 1 hora.
-        Retorna lista de strings no formato "HH:MM" representando as horas disponíveis.
-        Cada hora representa um slot de 1 hora disponível (ex: "08:00", "09:00", "10:00").
-        """
-        # Converte strings de hora para datetime
-        hora_inicio_dt = datetime.strptime(hora_inicio, "%H:%M:%S").time()
-        hora_fim_dt = datetime.strptime(hora_fim, "%H:%M:%S").time()
-        
-        inicio_dia = datetime.combine(data, hora_inicio_dt)
-        fim_dia = datetime.combine(data, hora_fim_dt)
-        
-        # Busca todas as reservas do dia que se sobrepõem ao período
-        reservas = db.query(Reserva).filter(
-            Reserva.sala_id == sala_id,
-            or_(
-                and_(
-                    Reserva.data_hora_inicio >= inicio_dia,
-                    Reserva.data_hora_inicio < fim_dia
-                ),
-                and_(
-                    Reserva.data_hora_fim > inicio_dia,
-                    Reserva.data_hora_fim <= fim_dia
-                ),
-                and_(
-                    Reserva.data_hora_inicio <= inicio_dia,
-                    Reserva.data_hora_fim >= fim_dia
-                )
-            )
-        ).order_by(Reserva.data_hora_inicio).all()
-        
-        # Cria lista de todas as horas do período
-        horas_disponiveis = []
-        hora_atual = inicio_dia
-        
-        while hora_atual < fim_dia:
-            hora_fim_slot = hora_atual + timedelta(hours=1)
-            
-            # Verifica se este slot de 1 hora está livre
-            disponivel = True
-            for reserva in reservas:
-                # Verifica se há sobreposição
-                if not (hora_fim_slot <= reserva.data_hora_inicio or hora_atual >= reserva.data_hora_fim):
-                    disponivel = False
-                    break
-            
-            if disponivel:
-                # Adiciona apenas a hora (formato "HH:MM")
-                horas_disponiveis.append(hora_atual.strftime("%H:%M"))
-            
-            # Avança para a próxima hora
-            hora_atual = hora_fim_slot
+        Retorna lista de horários disponíveis em slots de granularidade_minutos (5, 10, 15, 30 ou 60).
+        Retorna lista de strings no formato "HH:MM" com o início de cada slot livre (ex: "08:00", "09:00").
+        Se duracao_minima_minutos for informado, só retorna slots a partir dos quais a sala fica
+        livre por pelo menos essa duração.
         
-        return horas_disponiveis
+        Percorre os intervalos livres (já ordenados) uma única vez, então o custo é linear
+        no número de reservas mais o número de slots retornados.
+        """
+        if granularidade_minutos not in GRANULARIDADES_PERMITIDAS:
+            raise ValueError(f"Granularidade inválida. Use um destes valores: {GRANULARIDADES_PERMITIDAS}")
+        if duracao_minima_minutos is not None and duracao_minima_minutos < 0:
+            raise ValueError("A duração mínima não pode ser negativa")
+        
+        inicio_dia, fim_dia = _janela_do_dia(data, hora_inicio, hora_fim)
+        passo = timedelta(minutes=granularidade_minutos)
+        # O slot precisa caber inteiro no intervalo livre, assim como a duração mínima
+        duracao = max(passo, timedelta(minutes=duracao_minima_minutos or 0))
+        
+        ocupados = ReservaController.obter_intervalos_ocupados_do_dia(db, sala_id, data)
+        livres = _calcular_intervalos_livres(ocupados, inicio_dia, fim_dia)
+        return _inicios_de_slots_livres(livres, inicio_dia, passo, duracao)
     
     @staticmethod
     def listar_historico_usuario(
@@ -326,7 +890,8 @@ class ReservaController:
         apenas_futuras: bool = False,
         apenas_passadas: bool = False,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        opcoes: Optional[List] = None
     ) -> List[Tuple[Reserva, bool]]:
         """
         Lista todas as reservas do usuário (como responsável ou participante).
@@ -337,53 +902,38 @@ class ReservaController:
         Parâmetros:
         - apenas_futuras: Se True, retorna apenas reservas futuras
         - apenas_passadas: Se True, retorna apenas reservas passadas
+        - opcoes: substitui o carregamento padrão (ex: load_only apenas das colunas pedidas)
         """
         agora = datetime.utcnow()
         
-        # Busca reservas onde o usuário é responsável
-        query_responsavel = db.query(Reserva).options(
-            joinedload(Reserva.responsavel),
-            joinedload(Reserva.sala_rel)
-        ).filter(Reserva.responsavel_id == usuario_id)
-        
-        # Busca reservas onde o usuário é participante
-        query_participante = db.query(Reserva).options(
-            joinedload(Reserva.responsavel),
-            joinedload(Reserva.sala_rel)
-        ).join(ReservaParticipante).filter(
-            ReservaParticipante.usuario_id == usuario_id
-        )
+        # IDs das reservas do usuário: como responsável ou como participante.
+        # O UNION já remove duplicatas (usuário responsável e participante da mesma reserva)
+        ids_reservas = select(Reserva.id.label("id")).where(
+            Reserva.responsavel_id == usuario_id
+        ).union(
+            select(ReservaParticipante.reserva_id).where(ReservaParticipante.usuario_id == usuario_id)
+        ).subquery()
+        
+        if opcoes is None:
+            opcoes = [joinedload(Reserva.responsavel), joinedload(Reserva.sala_rel)]
+        
+        query = db.query(
+            Reserva,
+            (Reserva.responsavel_id == usuario_id).label("sou_responsavel")
+        ).options(*opcoes).join(ids_reservas, ids_reservas.c.id == Reserva.id)
         
         # Aplica filtros de data se necessário
         if apenas_futuras:
-            query_responsavel = query_responsavel.filter(Reserva.data_hora_inicio > agora)
-            query_participante = query_participante.filter(Reserva.data_hora_inicio > agora)
+            query = query.filter(Reserva.data_hora_inicio > agora)
         elif apenas_passadas:
-            query_responsavel = query_responsavel.filter(Reserva.data_hora_fim < agora)
-            query_participante = query_participante.filter(Reserva.data_hora_fim < agora)
-        
-        # Busca as reservas
-        reservas_responsavel = query_responsavel.all()
-        reservas_participante = query_participante.all()
-        
-        # Cria um dicionário para evitar duplicatas (se o usuário for responsável e participante)
-        reservas_dict = {}
-        
-        # Adiciona reservas como responsável
-        for r in reservas_responsavel:
-            reservas_dict[r.id] = (r, True)
-        
-        # Adiciona reservas como participante (não sobrescreve se já for responsável)
-        for r in reservas_participante:
-            if r.id not in reservas_dict:
-                reservas_dict[r.id] = (r, False)
+            query = query.filter(Reserva.data_hora_fim < agora)
         
-        # Converte para lista e ordena por data
-        resultado = list(reservas_dict.values())
-        resultado.sort(key=lambda x: x[0].data_hora_inicio, reverse=True)
+        # Ordenação e paginação no banco: só as linhas da página são carregadas
+        resultado = query.order_by(
+            Reserva.data_hora_inicio.desc(), Reserva.id.desc()
+        ).offset(skip).limit(limit).all()
         
-        # Aplica paginação
-        return resultado[skip:skip + limit]
+        return [(reserva, sou_responsavel) for reserva, sou_responsavel in resultado]
 
 
 
@@ -1,9 +1,15 @@
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime
+from typing import List, Optional, Dict, Tuple
+from sqlalchemy import and_, text, tuple_
 
-from app.models import ReservaParticipante, Reserva, Usuario
-from app.views import ReservaParticipanteCreate
+from app.models import ReservaParticipante, Reserva, Usuario, ContadorNotificacao
+from app.notificacoes import canal_usuario, notificar
+from app.views import ReservaParticipanteCreate, StatusAdicaoParticipante
+
+# Maior número de usuários aceito por chamada de adicionar_participantes
+MAXIMO_PARTICIPANTES_POR_CHAMADA = 500
 
 
 class ReservaParticipanteController:
@@ -53,10 +59,76 @@ class ReservaParticipanteController:
             visto=False
         )
         db.add(participante)
+        notificar(db, canal_usuario(usuario_id), {"tipo": "convite", "reserva_id": reserva_id})
         db.commit()
         db.refresh(participante)
         return participante
     
+    @staticmethod
+    def adicionar_participantes(
+        db: Session,
+        reserva_id: int,
+        usuario_ids: List[int],
+        responsavel_id: int
+    ) -> Optional[Dict[int, StatusAdicaoParticipante]]:
+        """
+        Adiciona vários participantes a uma reserva de uma só vez.
+        Apenas o responsável pela reserva pode adicionar participantes; admins são recusados.
+        Valida todos os usuários com uma única consulta e insere com ON CONFLICT DO NOTHING
+        sobre uq_reserva_usuario, então quem já participa é apenas reportado.
+        Retorna {usuario_id: status} na ordem recebida, ou None se a reserva não existe
+        ou o usuário não é o responsável.
+        """
+        usuario_ids = list(dict.fromkeys(usuario_ids))  # Remove duplicatas mantendo a ordem
+        if len(usuario_ids) > MAXIMO_PARTICIPANTES_POR_CHAMADA:
+            raise ValueError(
+                f"Não é possível adicionar mais de {MAXIMO_PARTICIPANTES_POR_CHAMADA} participantes por vez"
+            )
+        
+        # Verifica se a reserva existe e se o usuário é o responsável
+        reserva = db.query(Reserva.responsavel_id).filter(Reserva.id == reserva_id).first()
+        if not reserva or reserva.responsavel_id != responsavel_id:
+            return None
+        
+        if not usuario_ids:
+            return {}
+        
+        # Valida todos os usuários de uma vez (existência e admin)
+        admin_por_usuario = dict(
+            db.query(Usuario.id, Usuario.admin).filter(Usuario.id.in_(usuario_ids)).all()
+        )
+        
+        resultado = {}
+        validos = []
+        for usuario_id in usuario_ids:
+            if usuario_id not in admin_por_usuario:
+                resultado[usuario_id] = StatusAdicaoParticipante.USUARIO_NAO_ENCONTRADO
+            elif admin_por_usuario[usuario_id]:
+                resultado[usuario_id] = StatusAdicaoParticipante.USUARIO_ADMIN
+            else:
+                resultado[usuario_id] = None  # Definido após o INSERT
+                validos.append(usuario_id)
+        
+        if validos:
+            inseridos = set(db.execute(
+                insert(ReservaParticipante)
+                .values([{"reserva_id": reserva_id, "usuario_id": usuario_id} for usuario_id in validos])
+                .on_conflict_do_nothing(constraint="uq_reserva_usuario")
+                .returning(ReservaParticipante.usuario_id)
+            ).scalars())
+            for usuario_id in inseridos:
+                notificar(db, canal_usuario(usuario_id), {"tipo": "convite", "reserva_id": reserva_id})
+            db.commit()
+            
+            for usuario_id in validos:
+                resultado[usuario_id] = (
+                    StatusAdicaoParticipante.ADICIONADO
+                    if usuario_id in inseridos
+                    else StatusAdicaoParticipante.JA_PARTICIPANTE
+                )
+        
+        return resultado
+    
     @staticmethod
     def remover_participante(
         db: Session,
@@ -88,18 +160,34 @@ class ReservaParticipanteController:
             return False
         
         db.delete(participante)
+        notificar(db, canal_usuario(usuario_id), {"tipo": "removido", "reserva_id": reserva_id})
         db.commit()
         return True
     
     @staticmethod
-    def listar_participantes(db: Session, reserva_id: int) -> List[ReservaParticipante]:
-        """Lista todos os participantes de uma reserva com relacionamento usuario carregado."""
-        return db.query(ReservaParticipante).options(
-            joinedload(ReservaParticipante.usuario)
-        ).filter(
+    def listar_participantes(db: Session, reserva_id: int, opcoes: Optional[List] = None) -> List[ReservaParticipante]:
+        """
+        Lista todos os participantes de uma reserva com relacionamento usuario carregado.
+        `opcoes` substitui o carregamento padrão (ex: load_only apenas das colunas pedidas).
+        """
+        if opcoes is None:
+            opcoes = [joinedload(ReservaParticipante.usuario)]
+        return db.query(ReservaParticipante).options(*opcoes).filter(
             ReservaParticipante.reserva_id == reserva_id
         ).all()
     
+    @staticmethod
+    def listar_participantes_das_reservas(db: Session, reserva_ids: List[int]) -> Dict[int, List[ReservaParticipante]]:
+        """Lista os participantes de várias reservas em uma única consulta, agrupados por reserva_id."""
+        participantes = db.query(ReservaParticipante).filter(
+            ReservaParticipante.reserva_id.in_(reserva_ids)
+        ).order_by(ReservaParticipante.id).all()
+        
+        por_reserva: Dict[int, List[ReservaParticipante]] = {reserva_id: [] for reserva_id in reserva_ids}
+        for participante in participantes:
+            por_reserva[participante.reserva_id].append(participante)
+        return por_reserva
+    
     @staticmethod
     def listar_reservas_do_usuario(
         db: Session,
@@ -107,18 +195,22 @@ class ReservaParticipanteController:
         apenas_nao_notificadas: bool = False,
         apenas_nao_vistas: bool = False,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        opcoes: Optional[List] = None
     ) -> List[ReservaParticipante]:
         """
         Lista todas as reservas em que o usuário é participante.
         Se apenas_nao_notificadas=True, retorna apenas reservas não notificadas.
         Se apenas_nao_vistas=True, retorna apenas reservas não vistas.
+        `opcoes` substitui o carregamento padrão (ex: load_only apenas das colunas pedidas).
         """
-        query = db.query(ReservaParticipante).options(
-            joinedload(ReservaParticipante.usuario),
-            joinedload(ReservaParticipante.reserva).joinedload(Reserva.responsavel),
-            joinedload(ReservaParticipante.reserva).joinedload(Reserva.sala_rel)
-        ).filter(
+        if opcoes is None:
+            opcoes = [
+                joinedload(ReservaParticipante.usuario),
+                joinedload(ReservaParticipante.reserva).joinedload(Reserva.responsavel),
+                joinedload(ReservaParticipante.reserva).joinedload(Reserva.sala_rel)
+            ]
+        query = db.query(ReservaParticipante).options(*opcoes).filter(
             ReservaParticipante.usuario_id == usuario_id
         )
         
@@ -131,12 +223,79 @@ class ReservaParticipanteController:
         return query.order_by(ReservaParticipante.created_at.desc()).offset(skip).limit(limit).all()
     
     @staticmethod
-    def contar_reservas_nao_vistas(db: Session, usuario_id: int) -> int:
-        """Conta quantas reservas não vistas o usuário tem."""
+    def listar_reservas_do_usuario_por_cursor(
+        db: Session,
+        usuario_id: int,
+        apenas_nao_notificadas: bool = False,
+        apenas_nao_vistas: bool = False,
+        limit: int = 20,
+        apos: Optional[Tuple[datetime, int]] = None,
+        opcoes: Optional[List] = None
+    ) -> List[ReservaParticipante]:
+        """
+        Versão paginada por cursor de listar_reservas_do_usuario.
+        Ordena por (created_at, id) decrescente e continua a partir da chave `apos` (exclusiva).
+        `opcoes` são opções de carregamento (ex: load_only).
+        """
+        query = db.query(ReservaParticipante).options(*(opcoes or [])).filter(
+            ReservaParticipante.usuario_id == usuario_id
+        )
+        
+        if apenas_nao_notificadas:
+            query = query.filter(ReservaParticipante.notificado == False)
+        
+        if apenas_nao_vistas:
+            query = query.filter(ReservaParticipante.visto == False)
+        
+        if apos is not None:
+            query = query.filter(tuple_(ReservaParticipante.created_at, ReservaParticipante.id) < tuple_(*apos))
+        
+        return query.order_by(
+            ReservaParticipante.created_at.desc(), ReservaParticipante.id.desc()
+        ).limit(limit).all()
+    
+    @staticmethod
+    def obter_participante(db: Session, reserva_id: int, usuario_id: int) -> Optional[ReservaParticipante]:
+        """Obtém a participação de um usuário em uma reserva."""
         return db.query(ReservaParticipante).filter(
-            ReservaParticipante.usuario_id == usuario_id,
-            ReservaParticipante.visto == False
-        ).count()
+            and_(
+                ReservaParticipante.reserva_id == reserva_id,
+                ReservaParticipante.usuario_id == usuario_id
+            )
+        ).first()
+    
+    @staticmethod
+    def contar_reservas_nao_vistas(db: Session, usuario_id: int) -> int:
+        """
+        Conta quantas reservas não vistas o usuário tem.
+        Lê o contador mantido pelo banco (busca pela chave primária, sem COUNT).
+        """
+        nao_vistas = db.query(ContadorNotificacao.nao_vistas).filter(
+            ContadorNotificacao.usuario_id == usuario_id
+        ).scalar()
+        return nao_vistas or 0
+    
+    @staticmethod
+    def reconciliar_contadores(db: Session) -> int:
+        """
+        Recalcula os contadores de não vistas de todos os usuários a partir de
+        reserva_participantes e corrige os que divergirem.
+        Bloqueia escritas em reserva_participantes durante o recálculo (LOCK SHARE), para
+        que nenhum incremento feito pelo trigger seja sobrescrito por uma contagem antiga.
+        Retorna o número de contadores criados ou corrigidos.
+        """
+        db.execute(text("LOCK TABLE reserva_participantes IN SHARE MODE"))
+        corrigidos = db.execute(text("""
+            INSERT INTO contadores_notificacoes (usuario_id, nao_vistas)
+            SELECT u.id, COUNT(p.id) FILTER (WHERE NOT p.visto)
+            FROM usuarios u
+            LEFT JOIN reserva_participantes p ON p.usuario_id = u.id
+            GROUP BY u.id
+            ON CONFLICT (usuario_id) DO UPDATE SET nao_vistas = EXCLUDED.nao_vistas
+            WHERE contadores_notificacoes.nao_vistas <> EXCLUDED.nao_vistas
+        """)).rowcount
+        db.commit()
+        return corrigidos
     
     @staticmethod
     def marcar_como_notificado(
@@ -176,10 +335,43 @@ class ReservaParticipanteController:
         if not participante:
             return False
         
-        participante.visto = True
+        if not participante.visto:
+            participante.visto = True
+            notificar(db, canal_usuario(usuario_id), {"tipo": "visto", "reserva_id": reserva_id})
         db.commit()
         return True
-    
+
+    @staticmethod
+    def marcar_todas_como_notificadas(db: Session, usuario_id: int) -> int:
+        """
+        Marca todas as reservas do usuário como notificadas em um único UPDATE
+        (usa o índice parcial ix_reserva_participantes_nao_notificadas).
+        Retorna quantas reservas foram marcadas.
+        """
+        marcadas = db.query(ReservaParticipante).filter(
+            ReservaParticipante.usuario_id == usuario_id,
+            ReservaParticipante.notificado == False
+        ).update({ReservaParticipante.notificado: True}, synchronize_session=False)
+        db.commit()
+        return marcadas
+
+    @staticmethod
+    def marcar_todas_como_vistas(db: Session, usuario_id: int) -> int:
+        """
+        Marca todas as reservas do usuário como vistas em um único UPDATE
+        (usa o índice parcial ix_reserva_participantes_nao_vistas).
+        O contador de não vistas é atualizado pelo trigger na mesma transação.
+        Retorna quantas reservas foram marcadas.
+        """
+        marcadas = db.query(ReservaParticipante).filter(
+            ReservaParticipante.usuario_id == usuario_id,
+            ReservaParticipante.visto == False
+        ).update({ReservaParticipante.visto: True}, synchronize_session=False)
+        if marcadas:
+            notificar(db, canal_usuario(usuario_id), {"tipo": "todas_vistas"})
+        db.commit()
+        return marcadas
+
     @staticmethod
     def listar_usuarios_nao_admin(db: Session, skip: int = 0, limit: int = 100) -> List[Usuario]:
         """Lista todos os usuários que não são administradores."""
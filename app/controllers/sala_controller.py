@@ -1,5 +1,6 @@
+from sqlalchemy import Row, select
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Sequence
 
 from app.models import Sala, Usuario
 from app.views import SalaCreate, SalaUpdate
@@ -32,19 +33,46 @@ class SalaController:
         return db.query(Sala).filter(Sala.id == sala_id).first()
 
     @staticmethod
-    def listar(db: Session, skip: int = 0, limit: int = 100, apenas_ativas: bool = False) -> List[Sala]:
-        """Lista todas as salas."""
-        query = db.query(Sala)
+    def obter_por_ids(db: Session, sala_ids: List[int]) -> List[Sala]:
+        """Obtém várias salas por ID em uma única consulta."""
+        return db.query(Sala).filter(Sala.id.in_(sala_ids)).all()
+
+    @staticmethod
+    def listar_linhas(
+        db: Session,
+        colunas: Sequence[str],
+        skip: int = 0,
+        limit: int = 100,
+        apenas_ativas: bool = False,
+        criador_id: Optional[int] = None
+    ) -> List[Row]:
+        """
+        Lista salas (opcionalmente só as ativas ou só as de um criador) consultando (Core)
+        apenas as `colunas` informadas. Retorna linhas (Row), sem criar objetos ORM nem
+        registrá-los na sessão.
+        """
+        consulta = select(*[Sala.__table__.c[nome] for nome in colunas])
         if apenas_ativas:
-            query = query.filter(Sala.ativa == True)
-        return query.offset(skip).limit(limit).all()
+            consulta = consulta.where(Sala.ativa == True)
+        if criador_id is not None:
+            consulta = consulta.where(Sala.criador_id == criador_id)
+        return db.execute(consulta.offset(skip).limit(limit)).all()
 
     @staticmethod
-    def listar_por_criador(db: Session, criador_id: int, skip: int = 0, limit: int = 100) -> List[Sala]:
-        """Lista salas criadas por um usuário específico."""
-        return db.query(Sala).filter(
-            Sala.criador_id == criador_id
-        ).offset(skip).limit(limit).all()
+    def listar_linhas_por_cursor(
+        db: Session,
+        colunas: Sequence[str],
+        limit: int = 20,
+        apos_id: Optional[int] = None,
+        apenas_ativas: bool = False
+    ) -> List[Row]:
+        """Lista salas ordenadas por id a partir de apos_id (exclusivo), como listar_linhas."""
+        consulta = select(*[Sala.__table__.c[nome] for nome in colunas])
+        if apenas_ativas:
+            consulta = consulta.where(Sala.ativa == True)
+        if apos_id is not None:
+            consulta = consulta.where(Sala.id > apos_id)
+        return db.execute(consulta.order_by(Sala.id).limit(limit)).all()
 
     @staticmethod
     def atualizar(
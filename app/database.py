@@ -1,15 +1,39 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import settings
 
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrono (asyncpg), criado apenas quando DATABASE_ASYNC=true
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.database_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        settings.database_async_url
+        or settings.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    )
+    # expire_on_commit=False: objetos já entregues aos DataLoaders não podem disparar
+    # recarga implícita fora de run_sync depois de um commit
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
 Base = declarative_base()
 
 
+@event.listens_for(Session, "after_begin")
+def _iniciar_transacao_somente_leitura(session, transaction, connection):
+    """Sessões marcadas com info["somente_leitura"] (queries GraphQL) abrem transações READ ONLY."""
+    if session.info.get("somente_leitura"):
+        connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -17,3 +41,7 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_db_async():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -3,4 +3,6 @@ class ConflitoHorarioException(Exception):
     pass
 
 
-
+class SobrecargaSenhasException(Exception):
+    """Exceção lançada quando há operações de senha (bcrypt) demais aguardando na fila."""
+    pass
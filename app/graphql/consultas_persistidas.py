@@ -0,0 +1,167 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from graphql import GraphQLError
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLRequestData
+from strawberry.http.exceptions import HTTPException
+from strawberry.types import ExecutionResult
+
+from app.config import settings
+
+
+def calcular_hash(query: str) -> str:
+    """Hash SHA-256 (hex) do texto da consulta, como enviado pelo cliente no protocolo APQ."""
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class ConsultaPersistidaException(Exception):
+    """Erro do protocolo de consultas persistidas, devolvido ao cliente como erro GraphQL."""
+
+    def __init__(self, mensagem: str, codigo: str):
+        super().__init__(mensagem)
+        self.codigo = codigo
+
+
+class ArmazemConsultasPersistidas:
+    """
+    Consultas persistidas conhecidas pelo worker, indexadas pelo hash SHA-256 do texto.
+    As consultas registradas pelos clientes (APQ) ficam em um LRU limitado; as da lista
+    de permitidas, carregada de arquivo, nunca são descartadas. No modo somente permitidas,
+    apenas as consultas da lista são aceitas e os clientes não registram novas.
+    """
+
+    def __init__(self, max_entradas: int, permitidas: Optional[Dict[str, str]] = None,
+                 somente_permitidas: bool = False):
+        self.max_entradas = max_entradas
+        self.permitidas: Dict[str, str] = dict(permitidas or {})
+        self.somente_permitidas = somente_permitidas
+        self._entradas: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, sha256: str) -> Optional[str]:
+        """Retorna o texto da consulta com o hash informado ou None se não for conhecida."""
+        query = self.permitidas.get(sha256)
+        if query is not None or self.somente_permitidas:
+            return query
+        with self._lock:
+            query = self._entradas.get(sha256)
+            if query is not None:
+                self._entradas.move_to_end(sha256)
+            return query
+
+    def registrar(self, sha256: str, query: str) -> None:
+        """Registra uma consulta enviada com seu hash (ignorado no modo somente permitidas)."""
+        if self.somente_permitidas or sha256 in self.permitidas:
+            return
+        with self._lock:
+            self._entradas[sha256] = query
+            self._entradas.move_to_end(sha256)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def permitida(self, query: str) -> bool:
+        """Indica se o texto da consulta pode ser executado."""
+        return not self.somente_permitidas or calcular_hash(query) in self.permitidas
+
+    def limpar(self) -> None:
+        """Remove as consultas registradas pelos clientes."""
+        with self._lock:
+            self._entradas.clear()
+
+
+def carregar_consultas_permitidas(caminho: Optional[str]) -> Dict[str, str]:
+    """
+    Lê a lista de consultas permitidas de um arquivo JSON.
+    Aceita um objeto {hash: consulta} (manifesto gerado no build do front-end)
+    ou uma lista de consultas, cujos hashes são calculados aqui.
+    """
+    if not caminho:
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        conteudo = json.load(arquivo)
+    if isinstance(conteudo, list):
+        return {calcular_hash(query): query for query in conteudo}
+    for sha256, query in conteudo.items():
+        if calcular_hash(query) != sha256:
+            raise ValueError(f"Hash não confere com a consulta registrada: {sha256}")
+    return dict(conteudo)
+
+
+consultas_persistidas = ArmazemConsultasPersistidas(
+    max_entradas=settings.graphql_consultas_persistidas_max,
+    permitidas=carregar_consultas_permitidas(settings.graphql_consultas_permitidas_arquivo),
+    somente_permitidas=settings.graphql_somente_consultas_permitidas
+)
+
+
+class GraphQLRouterConsultasPersistidas(GraphQLRouter):
+    """
+    GraphQLRouter com suporte a consultas persistidas automáticas (APQ), no formato
+    usado pelo Apollo Client: o cliente envia apenas
+    extensions.persistedQuery.sha256Hash e, se o servidor ainda não conhece o hash,
+    recebe PersistedQueryNotFound e reenvia a consulta completa junto com o hash,
+    que passa a ficar registrado. Consultas (não mutations) podem ser enviadas por GET.
+    """
+
+    def should_render_graphiql(self, request) -> bool:
+        # GET só com o hash (sem "query") é uma consulta persistida, não a abertura do GraphiQL
+        return (
+            request.query_params.get("extensions") is None
+            and super().should_render_graphiql(request)
+        )
+
+    async def parse_http_body(self, request) -> GraphQLRequestData:
+        content_type = request.content_type or ""
+
+        if "application/json" in content_type:
+            dados = self.parse_json(await request.get_body())
+        elif content_type.startswith("multipart/form-data"):
+            dados = await self.parse_multipart(request)
+        elif request.method == "GET":
+            dados = self.parse_query_params(request.query_params)
+            if isinstance(dados.get("extensions"), str):
+                dados["extensions"] = self.parse_json(dados["extensions"])
+        else:
+            raise HTTPException(400, "Unsupported content type")
+
+        query = dados.get("query")
+        extensoes = dados.get("extensions")
+        persistida = extensoes.get("persistedQuery") if isinstance(extensoes, dict) else None
+
+        if not persistida:
+            if query and not consultas_persistidas.permitida(query):
+                raise ConsultaPersistidaException("Consulta não permitida", "PERSISTED_QUERY_NOT_ALLOWED")
+        elif persistida.get("version") != 1 or not persistida.get("sha256Hash"):
+            raise HTTPException(400, "Versão de consulta persistida não suportada")
+        elif query:
+            if calcular_hash(query) != persistida["sha256Hash"]:
+                raise HTTPException(400, "O hash informado não confere com a consulta")
+            if not consultas_persistidas.permitida(query):
+                raise ConsultaPersistidaException("Consulta não permitida", "PERSISTED_QUERY_NOT_ALLOWED")
+            consultas_persistidas.registrar(persistida["sha256Hash"], query)
+        else:
+            query = consultas_persistidas.obter(persistida["sha256Hash"])
+            if query is None:
+                if consultas_persistidas.somente_permitidas:
+                    raise ConsultaPersistidaException("Consulta não permitida", "PERSISTED_QUERY_NOT_ALLOWED")
+                raise ConsultaPersistidaException("PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND")
+
+        return GraphQLRequestData(
+            query=query,
+            variables=dados.get("variables"),
+            operation_name=dados.get("operationName"),
+        )
+
+    async def execute_operation(self, request, context, root_value) -> ExecutionResult:
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except ConsultaPersistidaException as e:
+            # Respondido como erro GraphQL (HTTP 200), que é o que os clientes APQ esperam
+            return ExecutionResult(
+                data=None,
+                errors=[GraphQLError(str(e), extensions={"code": e.codigo})]
+            )
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Union
+
+from fastapi import Depends, Request, WebSocket
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.auth import IdentidadeToken, autenticar_token
+from app.config import settings
+from app.database import get_db, get_db_async
+from app.graphql.loaders import Loaders
+
+# Sessão do request: AsyncSession (asyncpg) em modo assíncrono, Session (psycopg2) caso contrário
+_sessao_do_request = get_db_async if settings.database_async else get_db
+
+
+async def get_context(db: Union[Session, AsyncSession] = Depends(_sessao_do_request)) -> dict:
+    """
+    Contexto de cada request GraphQL.
+    O Strawberry mescla este dicionário com "request", "response" e "background_tasks".
+    A sessão é compartilhada por todos os resolvers do request e fechada pelo FastAPI
+    ao final dele. "db" é sempre a sessão síncrona usada pelos controllers; em modo
+    assíncrono é a sync_session da AsyncSession em "db_async".
+    """
+    assincrona = isinstance(db, AsyncSession)
+    contexto = {
+        "db": db.sync_session if assincrona else db,
+        "db_async": db if assincrona else None,
+        "trava_db": asyncio.Lock(),
+    }
+    contexto["loaders"] = Loaders(contexto)
+    return contexto
+
+
+def obter_db(info) -> Session:
+    """Retorna a sessão do banco do request GraphQL atual."""
+    return info.context["db"]
+
+
+def _autenticar(request: Union[Request, WebSocket], db: Session) -> IdentidadeToken:
+    """
+    Valida o header Authorization e retorna a identidade do usuário do token
+    (id, username e admin vêm das claims; ver autenticar_token).
+    Em conexões WebSocket (subscriptions), em que o navegador não envia headers
+    customizados, o token também é aceito no parâmetro ?token= da URL.
+    """
+    auth_header = request.headers.get("Authorization", "")
+    
+    if auth_header.startswith("Bearer "):
+        token = auth_header.replace("Bearer ", "")
+    elif isinstance(request, WebSocket) and request.query_params.get("token"):
+        token = request.query_params["token"]
+    else:
+        raise Exception("Token de autenticação não fornecido")
+    
+    return autenticar_token(db, token)
+
+
+def obter_usuario_autenticado(contexto: dict) -> IdentidadeToken:
+    """
+    Autentica o request na primeira chamada e memoiza o resultado no contexto.
+    Chamadas seguintes no mesmo request (outros campos raiz, por exemplo) reutilizam
+    o usuário ou repetem o mesmo erro sem decodificar o token nem consultar o banco de novo.
+    """
+    if "autenticacao" not in contexto:
+        resultado: Union[IdentidadeToken, Exception]
+        try:
+            resultado = _autenticar(contexto["request"], contexto["db"])
+        except Exception as e:
+            resultado = e
+        contexto["autenticacao"] = resultado
+    
+    resultado = contexto["autenticacao"]
+    if isinstance(resultado, Exception):
+        raise Exception(str(resultado))
+    return resultado
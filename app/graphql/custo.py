@@ -0,0 +1,173 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLSchema,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    get_named_type,
+    is_leaf_type,
+)
+from graphql.execution.values import get_argument_values
+
+# Argumentos que definem quantos itens um campo de lista (ou conexão) pode retornar
+ARGUMENTOS_DE_TAMANHO = ("first", "limit", "limite")
+
+
+@dataclass
+class CustoConsulta:
+    custo: int = 0
+    profundidade: int = 0
+    # Argumentos de tamanho acima do máximo, como (caminho do campo, argumento, valor)
+    tamanhos_excedidos: List[tuple] = field(default_factory=list)
+
+
+class _Calculadora:
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        fragmentos: Dict[str, FragmentDefinitionNode],
+        variaveis: Optional[dict],
+        tamanho_lista_padrao: int,
+        limite_maximo: int
+    ):
+        self.schema = schema
+        self.fragmentos = fragmentos
+        self.variaveis = variaveis or {}
+        self.tamanho_lista_padrao = tamanho_lista_padrao
+        self.limite_maximo = limite_maximo
+        self.resultado = CustoConsulta()
+
+    def _campos(self, selecao: SelectionSetNode, tipo, visitados: frozenset):
+        """Campos da seleção, expandindo fragmentos (com o tipo em que cada campo é resolvido)."""
+        for no in selecao.selections:
+            if isinstance(no, FieldNode):
+                yield no, tipo
+            elif isinstance(no, InlineFragmentNode):
+                condicao = self.schema.get_type(no.type_condition.name.value) if no.type_condition else tipo
+                yield from self._campos(no.selection_set, condicao, visitados)
+            elif isinstance(no, FragmentSpreadNode):
+                nome = no.name.value
+                fragmento = self.fragmentos.get(nome)
+                if fragmento is None or nome in visitados:
+                    continue
+                condicao = self.schema.get_type(fragmento.type_condition.name.value)
+                yield from self._campos(fragmento.selection_set, condicao, visitados | {nome})
+
+    def custo_selecao(
+        self,
+        selecao: SelectionSetNode,
+        tipo,
+        profundidade: int,
+        caminho: str,
+        lista_dimensionada: bool = False
+    ) -> int:
+        """
+        Custo de uma seleção: cada campo custa o seu peso e multiplica o custo dos
+        subcampos pelo número de itens que pode retornar.
+        `lista_dimensionada` indica que o campo pai já aplicou um argumento de tamanho
+        (conexões: first é aplicado em reservasConexao, e não de novo em edges).
+        """
+        self.resultado.profundidade = max(self.resultado.profundidade, profundidade)
+        total = 0
+        for no, tipo_pai in self._campos(selecao, tipo, frozenset()):
+            nome = no.name.value
+            # Introspecção (__typename, __schema, __type) não conta no custo
+            if nome.startswith("__") or not isinstance(tipo_pai, GraphQLObjectType):
+                continue
+            definicao = tipo_pai.fields.get(nome)
+            if definicao is None:
+                continue
+
+            caminho_campo = f"{caminho}.{nome}" if caminho else nome
+            tipo_campo = definicao.type
+            if isinstance(tipo_campo, GraphQLNonNull):
+                tipo_campo = tipo_campo.of_type
+            eh_lista = isinstance(tipo_campo, GraphQLList)
+            tipo_nomeado = get_named_type(tipo_campo)
+
+            try:
+                argumentos = get_argument_values(definicao, no, self.variaveis)
+            except Exception:
+                # Argumentos inválidos são rejeitados na execução
+                argumentos = {}
+
+            tamanho = None
+            for argumento in ARGUMENTOS_DE_TAMANHO:
+                valor = argumentos.get(argumento)
+                if isinstance(valor, int):
+                    if valor > self.limite_maximo:
+                        self.resultado.tamanhos_excedidos.append((caminho_campo, argumento, valor))
+                    tamanho = max(valor, 0)
+                    break
+
+            if tamanho is not None:
+                multiplicador = tamanho
+            elif eh_lista and not lista_dimensionada:
+                multiplicador = self.tamanho_lista_padrao
+            else:
+                multiplicador = 1
+
+            strawberry_field = definicao.extensions.get("strawberry-definition")
+            metadados = getattr(strawberry_field, "metadata", None) or {}
+            peso = metadados.get("custo", 0 if is_leaf_type(tipo_nomeado) else 1)
+            if callable(peso):
+                # Peso que depende do tamanho da entrada (ex: número de salas x dias)
+                peso = max(int(peso(argumentos)), 0)
+
+            custo_filhos = 0
+            if no.selection_set is not None:
+                custo_filhos = self.custo_selecao(
+                    no.selection_set,
+                    tipo_nomeado,
+                    profundidade + 1,
+                    caminho_campo,
+                    lista_dimensionada=tamanho is not None and not eh_lista
+                )
+            total += peso + multiplicador * custo_filhos
+        return total
+
+
+def calcular_custo(
+    schema: GraphQLSchema,
+    documento: DocumentNode,
+    nome_operacao: Optional[str],
+    variaveis: Optional[dict],
+    tamanho_lista_padrao: int,
+    limite_maximo: int
+) -> Optional[CustoConsulta]:
+    """
+    Calcula, sem executar, o custo estático de uma operação GraphQL.
+
+    O peso de um campo vem de strawberry.field(metadata={"custo": N}); sem ele, campos
+    de objeto custam 1 e campos escalares 0. N também pode ser uma função que recebe os
+    argumentos do campo (nomes do GraphQL) e devolve o peso. Campos de lista multiplicam o custo dos
+    subcampos pelo argumento first/limit/limite (ou pelo valor padrão do argumento);
+    listas sem esse argumento usam tamanho_lista_padrao.
+    Retorna None se a operação não for encontrada no documento.
+    """
+    operacoes = [d for d in documento.definitions if isinstance(d, OperationDefinitionNode)]
+    fragmentos = {
+        d.name.value: d for d in documento.definitions if isinstance(d, FragmentDefinitionNode)
+    }
+    if nome_operacao:
+        operacoes = [o for o in operacoes if o.name and o.name.value == nome_operacao]
+    if len(operacoes) != 1:
+        return None
+
+    operacao = operacoes[0]
+    tipo_raiz = schema.get_root_type(operacao.operation)
+    if tipo_raiz is None:
+        return None
+
+    calculadora = _Calculadora(schema, fragmentos, variaveis, tamanho_lista_padrao, limite_maximo)
+    calculadora.resultado.custo = calculadora.custo_selecao(operacao.selection_set, tipo_raiz, 1, "")
+    return calculadora.resultado
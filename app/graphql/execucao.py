@@ -0,0 +1,29 @@
+import functools
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+
+async def executar_db(contexto: dict, funcao: Callable, *args, **kwargs) -> Any:
+    """
+    Executa código síncrono que acessa o banco (controllers e conversão para os tipos
+    GraphQL) sem bloquear o event loop: via AsyncSession.run_sync em modo assíncrono,
+    ou no threadpool caso contrário.
+    A trava do request serializa as chamadas, pois uma sessão não pode ser usada em paralelo
+    (campos raiz e DataLoaders de um mesmo request rodam concorrentemente).
+    """
+    async with contexto["trava_db"]:
+        if contexto["db_async"] is not None:
+            return await contexto["db_async"].run_sync(lambda _sessao: funcao(*args, **kwargs))
+        return await run_in_threadpool(funcao, *args, **kwargs)
+
+
+def nao_bloqueante(resolver: Callable) -> Callable:
+    """
+    Transforma um resolver síncrono em assíncrono, executado por executar_db.
+    O corpo do resolver continua usando obter_db(info) e os controllers normalmente.
+    """
+    @functools.wraps(resolver)
+    async def resolver_assincrono(*args, **kwargs):
+        return await executar_db(kwargs["info"].context, resolver, *args, **kwargs)
+    return resolver_assincrono
@@ -0,0 +1,117 @@
+from functools import lru_cache
+
+from graphql import GraphQLError
+from strawberry.extensions import SchemaExtension
+from strawberry.schema.execute import parse_document, validate_document
+from graphql import ExecutionResult as GraphQLExecutionResult
+from strawberry.types.graphql import OperationType
+
+from app.config import settings
+from app.graphql.custo import calcular_custo
+
+_analisar_documento = lru_cache(maxsize=settings.graphql_cache_documentos)(parse_document)
+_validar_documento = lru_cache(maxsize=settings.graphql_cache_documentos)(validate_document)
+
+
+class TransacaoSomenteLeitura(SchemaExtension):
+    """
+    Marca a sessão do request como somente leitura quando a operação é uma query.
+    A primeira consulta do request abre então uma transação READ ONLY (ver app/database.py),
+    usada por todos os resolvers até a sessão ser fechada ao final do request.
+    """
+
+    def on_execute(self):
+        contexto = self.execution_context.context
+        if isinstance(contexto, dict) and "db" in contexto:
+            if self.execution_context.operation_type == OperationType.QUERY:
+                contexto["db"].info["somente_leitura"] = True
+        yield
+
+
+class CacheDocumentos(SchemaExtension):
+    """
+    Reaproveita a análise e a validação de documentos GraphQL já vistos pelo worker
+    (LRU por texto da consulta, limitado por graphql_cache_documentos).
+    Como o mesmo texto devolve o mesmo DocumentNode, a validação também é feita uma
+    única vez por documento e conjunto de regras.
+    Usada como classe (uma instância por request), já que o Strawberry compartilha o
+    execution_context entre requests concorrentes quando a extensão é uma instância.
+    """
+
+    def on_parse(self):
+        contexto = self.execution_context
+        try:
+            contexto.graphql_document = _analisar_documento(contexto.query, **contexto.parse_options)
+        except GraphQLError:
+            # Documento inválido: o Strawberry analisa de novo e devolve o erro de sintaxe
+            pass
+        yield
+
+    def on_validate(self):
+        contexto = self.execution_context
+        if contexto.graphql_document is not None and contexto.validation_rules:
+            contexto.errors = _validar_documento(
+                contexto.schema._schema,
+                contexto.graphql_document,
+                contexto.validation_rules
+            )
+        yield
+
+
+class LimiteCustoConsulta(SchemaExtension):
+    """
+    Calcula o custo estático da operação (ver app/graphql/custo.py) antes de executá-la e
+    a rejeita se passar de graphql_custo_maximo, de graphql_profundidade_maxima ou se algum
+    first/limit/limite passar de graphql_limite_maximo. O custo calculado é devolvido em
+    extensions.custo na resposta.
+    """
+
+    def __init__(self, *, execution_context):
+        super().__init__(execution_context=execution_context)
+        self.custo = None
+
+    def on_execute(self):
+        contexto = self.execution_context
+        self.custo = calcular_custo(
+            contexto.schema._schema,
+            contexto.graphql_document,
+            contexto.operation_name,
+            contexto.variables,
+            tamanho_lista_padrao=settings.graphql_custo_tamanho_lista_padrao,
+            limite_maximo=settings.graphql_limite_maximo
+        )
+        erros = []
+        if self.custo is not None:
+            for caminho, argumento, valor in self.custo.tamanhos_excedidos:
+                erros.append(GraphQLError(
+                    f"{argumento} em {caminho} não pode ser maior que {settings.graphql_limite_maximo} "
+                    f"(recebido: {valor})",
+                    extensions={"code": "LIMITE_EXCEDIDO"}
+                ))
+            if self.custo.profundidade > settings.graphql_profundidade_maxima:
+                erros.append(GraphQLError(
+                    f"Consulta com profundidade {self.custo.profundidade} excede o máximo de "
+                    f"{settings.graphql_profundidade_maxima}",
+                    extensions={"code": "PROFUNDIDADE_EXCEDIDA"}
+                ))
+            if self.custo.custo > settings.graphql_custo_maximo:
+                erros.append(GraphQLError(
+                    f"Consulta com custo {self.custo.custo} excede o máximo de "
+                    f"{settings.graphql_custo_maximo}",
+                    extensions={"code": "CUSTO_EXCEDIDO"}
+                ))
+        if erros:
+            # Com um resultado já definido, o Strawberry não executa a operação
+            contexto.result = GraphQLExecutionResult(data=None, errors=erros)
+        yield
+
+    def get_results(self):
+        if self.custo is None:
+            return {}
+        return {
+            "custo": {
+                "custo": self.custo.custo,
+                "maximo": settings.graphql_custo_maximo,
+                "profundidade": self.custo.profundidade,
+            }
+        }
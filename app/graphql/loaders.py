@@ -0,0 +1,48 @@
+from typing import List, Optional
+
+from strawberry.dataloader import DataLoader
+
+from app.graphql.execucao import executar_db
+from app.models import Usuario, Sala, Reserva, ReservaParticipante
+from app.controllers.auth_controller import AuthController
+from app.controllers.reserva_controller import ReservaController
+from app.controllers.sala_controller import SalaController
+from app.controllers.reserva_participante_controller import ReservaParticipanteController
+
+
+class Loaders:
+    """
+    DataLoaders de um request GraphQL.
+    Agrupam as chaves pedidas pelos campos de relacionamento (responsavel, salaRel,
+    participantes, usuario, reserva) em uma única consulta IN por tipo, evitando N+1.
+    Usam a sessão do request, então devem ser criados por request para que o cache
+    não vaze entre usuários.
+    """
+
+    def __init__(self, contexto: dict):
+        self.contexto = contexto
+        self.usuarios = DataLoader(load_fn=self.carregar_usuarios)
+        self.salas = DataLoader(load_fn=self.carregar_salas)
+        self.reservas = DataLoader(load_fn=self.carregar_reservas)
+        self.participantes_por_reserva = DataLoader(load_fn=self.carregar_participantes)
+
+    async def _executar(self, funcao, *args):
+        return await executar_db(self.contexto, funcao, self.contexto["db"], *args)
+
+    async def carregar_usuarios(self, ids: List[int]) -> List[Optional[Usuario]]:
+        usuarios = {u.id: u for u in await self._executar(AuthController.obter_usuarios_por_ids, ids)}
+        return [usuarios.get(usuario_id) for usuario_id in ids]
+
+    async def carregar_salas(self, ids: List[int]) -> List[Optional[Sala]]:
+        salas = {s.id: s for s in await self._executar(SalaController.obter_por_ids, ids)}
+        return [salas.get(sala_id) for sala_id in ids]
+
+    async def carregar_reservas(self, ids: List[int]) -> List[Optional[Reserva]]:
+        reservas = {r.id: r for r in await self._executar(ReservaController.obter_por_ids, ids)}
+        return [reservas.get(reserva_id) for reserva_id in ids]
+
+    async def carregar_participantes(self, reserva_ids: List[int]) -> List[List[ReservaParticipante]]:
+        por_reserva = await self._executar(
+            ReservaParticipanteController.listar_participantes_das_reservas, reserva_ids
+        )
+        return [por_reserva[reserva_id] for reserva_id in reserva_ids]
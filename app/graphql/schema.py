@@ -1,20 +1,54 @@
-from typing import List, Optional
-from datetime import datetime
+from typing import AsyncGenerator, Callable, Generic, List, Optional, TypeVar
+from datetime import datetime, date, timedelta
 import strawberry
+from graphql import ExecutionResult as GraphQLExecutionResult, GraphQLError, parse, validate
 from strawberry.fastapi import GraphQLRouter
+from strawberry.types import ExecutionResult
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
 from app.models import Reserva, Usuario, Sala, ReservaParticipante
-from app.views import ReservaCreate, ReservaUpdate, SalaCreate, SalaUpdate
-from app.controllers.reserva_controller import ReservaController
+from app.views import ReservaCreate, ReservaUpdate, SalaCreate, SalaUpdate, FrequenciaRecorrencia, StatusAdicaoParticipante
+from app.controllers.reserva_controller import ReservaController, compactar_grade_ocupacao, MAXIMO_DIAS_GRADE
 from app.controllers.sala_controller import SalaController
 from app.controllers.auth_controller import AuthController
 from app.controllers.reserva_participante_controller import ReservaParticipanteController
-from app.auth import authenticate_user, create_access_token
+from app.auth import IdentidadeToken, claims_do_usuario, create_access_token, get_user_by_username
+from app.graphql.consultas_persistidas import consultas_persistidas
+from app.graphql.context import obter_db, obter_usuario_autenticado
+from app.graphql.execucao import executar_db, nao_bloqueante
+from app.graphql.extensions import CacheDocumentos, LimiteCustoConsulta, TransacaoSomenteLeitura
+from app.graphql.loaders import Loaders
+from app.graphql.selecao import colunas_selecionadas, mapeador_de_linhas, opcoes_de_carregamento, valores_carregados
+from app.notificacoes import barramento_notificacoes, canal_usuario
 from app.config import settings
 from app.exceptions import ConflitoHorarioException
-from datetime import timedelta
+from app.paginacao import codificar_cursor, decodificar_cursor, validar_tamanho_pagina
+from app.senhas import pool_senhas
+
+T = TypeVar("T")
+
+# Colunas sempre carregadas mesmo se o cliente não pedir: usadas pelos DataLoaders
+# dos campos de relacionamento (responsavel, salaRel, usuario, reserva)
+COLUNAS_OBRIGATORIAS_RESERVA = ("responsavel_id", "sala_id")
+COLUNAS_OBRIGATORIAS_PARTICIPANTE = ("reserva_id", "usuario_id")
+
+
+def custo_horarios_disponiveis_salas(argumentos: dict) -> int:
+    """Custo de horariosDisponiveisSalas: uma lista de horários por sala pedida."""
+    return len(set(argumentos.get("salaIds") or [])) or 1
+
+
+def custo_grade_ocupacao(argumentos: dict) -> int:
+    """Custo de gradeOcupacao: uma linha por sala com um bitmap por dia do período."""
+    salas = len(set(argumentos.get("salaIds") or [])) or 1
+    try:
+        inicio = datetime.strptime(argumentos["dataInicio"], "%Y-%m-%d").date()
+        fim = datetime.strptime(argumentos["dataFim"], "%Y-%m-%d").date()
+        dias = min(max((fim - inicio).days + 1, 1), MAXIMO_DIAS_GRADE)
+    except (KeyError, TypeError, ValueError):
+        # Datas inválidas são rejeitadas na execução
+        dias = 1
+    return salas * dias
 
 
 def criar_responsavel_type(usuario):
@@ -29,41 +63,80 @@ def criar_responsavel_type(usuario):
     )
 
 
-def criar_reserva_type_completa(reserva):
-    """Helper para criar ReservaType completo a partir de uma Reserva."""
+def criar_sala_type(sala):
+    """
+    Helper para criar SalaType a partir de uma Sala.
+    Colunas não carregadas (load_only) ficam None; o cliente não as pediu.
+    """
+    if not sala:
+        return None
+    valores = valores_carregados(sala)
+    return SalaType(
+        id=valores.get("id"),
+        nome=valores.get("nome"),
+        local=valores.get("local"),
+        capacidade=valores.get("capacidade"),
+        descricao=valores.get("descricao"),
+        criador_id=valores.get("criador_id"),
+        ativa=valores.get("ativa"),
+        created_at=valores.get("created_at"),
+        updated_at=valores.get("updated_at")
+    )
+
+
+def criar_usuario_type(usuario):
+    """Helper para criar UsuarioType a partir de um Usuario."""
+    if not usuario:
+        return None
+    return UsuarioType(
+        id=usuario.id,
+        nome=usuario.nome,
+        username=usuario.username,
+        email=usuario.email,
+        admin=usuario.admin,
+        created_at=usuario.created_at
+    )
+
+
+def criar_participante_type(participante):
+    """
+    Helper para criar ReservaParticipanteType a partir de um ReservaParticipante.
+    Usuário e reserva são resolvidos pelos campos do tipo, via DataLoaders do request.
+    """
+    valores = valores_carregados(participante)
+    return ReservaParticipanteType(
+        id=valores.get("id"),
+        reserva_id=valores.get("reserva_id"),
+        usuario_id=valores.get("usuario_id"),
+        notificado=valores.get("notificado"),
+        visto=valores.get("visto"),
+        created_at=valores.get("created_at")
+    )
+
+
+def criar_reserva_type(reserva):
+    """
+    Helper para criar ReservaType a partir de uma Reserva.
+    Relacionamentos (responsavel, salaRel, participantes) são resolvidos pelos
+    campos do tipo, via DataLoaders do request.
+    Colunas não carregadas (load_only) ficam None; o cliente não as pediu.
+    """
     if not reserva:
         return None
-    
-    # Carrega a sala se existir
-    sala_type = None
-    if reserva.sala_rel:
-        sala_type = SalaType(
-            id=reserva.sala_rel.id,
-            nome=reserva.sala_rel.nome,
-            local=reserva.sala_rel.local,
-            capacidade=reserva.sala_rel.capacidade,
-            descricao=reserva.sala_rel.descricao,
-            criador_id=reserva.sala_rel.criador_id,
-            ativa=reserva.sala_rel.ativa,
-            created_at=reserva.sala_rel.created_at,
-            updated_at=reserva.sala_rel.updated_at
-        )
-    
+    valores = valores_carregados(reserva)
     return ReservaType(
-        id=reserva.id,
-        local=reserva.local,
-        sala=reserva.sala,
-        sala_id=reserva.sala_id,
-        data_hora_inicio=reserva.data_hora_inicio,
-        data_hora_fim=reserva.data_hora_fim,
-        responsavel_id=reserva.responsavel_id,
-        responsavel=criar_responsavel_type(reserva.responsavel) if reserva.responsavel else None,
-        cafe_quantidade=reserva.cafe_quantidade,
-        cafe_descricao=reserva.cafe_descricao,
-        link_meet=reserva.link_meet,
-        created_at=reserva.created_at,
-        updated_at=reserva.updated_at,
-        sala_rel=sala_type
+        id=valores.get("id"),
+        local=valores.get("local"),
+        sala=valores.get("sala"),
+        sala_id=valores.get("sala_id"),
+        data_hora_inicio=valores.get("data_hora_inicio"),
+        data_hora_fim=valores.get("data_hora_fim"),
+        responsavel_id=valores.get("responsavel_id"),
+        cafe_quantidade=valores.get("cafe_quantidade"),
+        cafe_descricao=valores.get("cafe_descricao"),
+        link_meet=valores.get("link_meet"),
+        created_at=valores.get("created_at"),
+        updated_at=valores.get("updated_at")
     )
 
 
@@ -90,12 +163,81 @@ class SalaType:
     updated_at: datetime
 
 
+@strawberry.type
+class PageInfoType:
+    has_next_page: bool
+    end_cursor: Optional[str]  # Cursor do último item; passe como "after" para obter a próxima página
+
+
+@strawberry.type
+class EdgeType(Generic[T]):
+    cursor: str
+    node: T
+
+
+@strawberry.type
+class ConnectionType(Generic[T]):
+    """Página de uma listagem paginada por cursor (estilo Relay)."""
+    edges: List[EdgeType[T]]
+    page_info: PageInfoType
+
+
+def montar_conexao(registros: list, first: int, chave: Callable, converter: Callable) -> ConnectionType:
+    """
+    Monta uma ConnectionType a partir de até first + 1 registros já ordenados.
+    O registro excedente só indica que existe uma próxima página.
+    chave(registro) retorna a tupla de ordenação codificada no cursor.
+    """
+    tem_proxima = len(registros) > first
+    edges = [
+        EdgeType(cursor=codificar_cursor(*chave(r)), node=converter(r))
+        for r in registros[:first]
+    ]
+    return ConnectionType(
+        edges=edges,
+        page_info=PageInfoType(
+            has_next_page=tem_proxima,
+            end_cursor=edges[-1].cursor if edges else None
+        )
+    )
+
+
 @strawberry.type
 class HorarioDisponivelType:
     inicio: datetime
     fim: datetime
 
 
+@strawberry.type
+class HorariosDisponiveisSalaType:
+    """Horários livres de uma sala, usado nas consultas de várias salas."""
+    sala_id: int
+    horarios: List[HorarioDisponivelType]
+
+
+@strawberry.type
+class GradeOcupacaoSalaType:
+    sala_id: int
+    ocupacao: str  # Bitmap em base64: 1 bit por slot (1 = ocupado), bit mais significativo primeiro
+
+
+@strawberry.type
+class GradeOcupacaoType:
+    """Grade de ocupação de várias salas em um período, dividida em slots de tamanho fixo."""
+    inicio: datetime  # Início do primeiro slot
+    granularidade_minutos: int
+    total_slots: int
+    salas: List[GradeOcupacaoSalaType]
+
+
+@strawberry.type
+class SalaDisponivelType:
+    """Sala encontrada pela busca de salas disponíveis, com o primeiro horário livre."""
+    sala: SalaType
+    inicio: datetime
+    fim: datetime
+
+
 @strawberry.type
 class ResponsavelType:
     id: int
@@ -112,8 +254,26 @@ class ReservaParticipanteType:
     notificado: bool
     visto: bool  # Se o usuário já viu a notificação
     created_at: datetime
-    usuario: Optional[ResponsavelType] = None
-    reserva: Optional["ReservaType"] = None  # Dados da reserva
+    
+    @strawberry.field
+    async def usuario(self, info) -> Optional[ResponsavelType]:
+        usuario = await info.context["loaders"].usuarios.load(self.usuario_id)
+        return criar_responsavel_type(usuario)
+    
+    @strawberry.field
+    async def reserva(self, info) -> Optional["ReservaType"]:
+        """Dados da reserva."""
+        reserva = await info.context["loaders"].reservas.load(self.reserva_id)
+        return criar_reserva_type(reserva)
+
+
+StatusAdicaoParticipanteEnum = strawberry.enum(StatusAdicaoParticipante, name="StatusAdicaoParticipante")
+
+
+@strawberry.type
+class ResultadoAdicaoParticipanteType:
+    usuario_id: int
+    status: StatusAdicaoParticipanteEnum
 
 
 @strawberry.type
@@ -125,13 +285,29 @@ class ReservaType:
     data_hora_inicio: datetime
     data_hora_fim: datetime
     responsavel_id: int
-    responsavel: Optional[ResponsavelType] = None
     cafe_quantidade: Optional[int]
     cafe_descricao: Optional[str]
     link_meet: Optional[str]  # Link da sala de meet (URL)
-    sala_rel: Optional["SalaType"] = None  # Dados completos da sala
     created_at: datetime
     updated_at: datetime
+    
+    @strawberry.field
+    async def responsavel(self, info) -> Optional[ResponsavelType]:
+        usuario = await info.context["loaders"].usuarios.load(self.responsavel_id)
+        return criar_responsavel_type(usuario)
+    
+    @strawberry.field
+    async def sala_rel(self, info) -> Optional[SalaType]:
+        """Dados completos da sala."""
+        if self.sala_id is None:
+            return None
+        sala = await info.context["loaders"].salas.load(self.sala_id)
+        return criar_sala_type(sala)
+    
+    @strawberry.field
+    async def participantes(self, info) -> List[ReservaParticipanteType]:
+        participantes = await info.context["loaders"].participantes_por_reserva.load(self.id)
+        return [criar_participante_type(p) for p in participantes]
 
 
 @strawberry.type
@@ -153,6 +329,29 @@ class ReservaInput:
     link_meet: Optional[str] = None  # Link da sala de meet (URL)
 
 
+FrequenciaRecorrenciaEnum = strawberry.enum(FrequenciaRecorrencia, name="FrequenciaRecorrencia")
+
+
+@strawberry.input
+class RecorrenciaInput:
+    frequencia: FrequenciaRecorrenciaEnum
+    intervalo: int = 1  # A cada quantos dias/semanas/meses
+    data_fim: Optional[date] = None  # Última data possível (inclusive)
+    ocorrencias: Optional[int] = None  # Ou número total de ocorrências
+
+
+@strawberry.type
+class OcorrenciaConflitanteType:
+    inicio: datetime
+    fim: datetime
+
+
+@strawberry.type
+class ResultadoRecorrenciaType:
+    reservas_criadas: List["ReservaType"]
+    conflitos: List[OcorrenciaConflitanteType]  # Ocorrências não criadas por conflito de horário
+
+
 @strawberry.input
 class ReservaUpdateInput:
     local: Optional[str] = None
@@ -224,43 +423,45 @@ class UsuarioAdminUpdateInput:
 class TokenType:
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None  # Use em renovarToken quando o token de acesso expirar
 
 
-def get_current_user_from_context(info) -> Usuario:
-    """Obtém o usuário atual do contexto GraphQL."""
-    request = info.context["request"]
-    auth_header = request.headers.get("Authorization", "")
-    
-    if not auth_header.startswith("Bearer "):
-        raise Exception("Token de autenticação não fornecido")
-    
-    token = auth_header.replace("Bearer ", "")
-    
-    from app.database import SessionLocal
-    from app.auth import get_user_by_username
-    from jose import jwt
-    from app.config import settings
-    
-    db = SessionLocal()
+def get_current_user_from_context(info) -> IdentidadeToken:
+    """
+    Obtém o usuário atual do contexto GraphQL (autenticado uma única vez por request).
+    Retorna a identidade do token (id, username, admin), normalmente sem consultar o banco.
+    """
+    return obter_usuario_autenticado(info.context)
+
+
+def verificar_username_e_email_livres(db: Session, username: str, email: str) -> None:
+    """Lança exceção se o username ou o email já estiverem em uso."""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username = payload.get("sub")
-        if not username:
-            raise Exception("Token inválido")
-        
-        user = get_user_by_username(db, username)
-        if not user:
-            raise Exception("Usuário não encontrado")
-        return user
-    except jwt.JWTError:
-        raise Exception("Token inválido ou expirado")
+        if db.query(Usuario).filter(Usuario.username == username).first():
+            raise Exception("Username já está em uso")
+        if db.query(Usuario).filter(Usuario.email == email).first():
+            raise Exception("Email já está em uso")
     finally:
-        db.close()
+        db.rollback()
+
+
+async def gerar_hash_senha(password: Optional[str]) -> Optional[str]:
+    """
+    Valida o tamanho da senha e calcula o hash no pool_senhas, sem bloquear o event loop.
+    Retorna None se a senha não foi informada.
+    """
+    if password is None:
+        return None
+    # bcrypt tem limite de 72 bytes
+    if len(password.encode('utf-8')) > 72:
+        raise Exception("A senha não pode ter mais de 72 caracteres")
+    return await pool_senhas.gerar_hash(password)
 
 
 @strawberry.type
 class Query:
     @strawberry.field
+    @nao_bloqueante
     def reservas(
         self,
         info,
@@ -270,59 +471,60 @@ class Query:
         """Lista todas as reservas."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
+        db = obter_db(info)
+        colunas = colunas_selecionadas(info, Reserva, obrigatorios=COLUNAS_OBRIGATORIAS_RESERVA)
+        mapear = mapeador_de_linhas(ReservaType, colunas)
+        return [
+            mapear(linha)
+            for linha in ReservaController.listar_linhas(db, colunas, skip=skip, limit=limit)
+        ]
+    
+    @strawberry.field
+    @nao_bloqueante
+    def reservas_conexao(
+        self,
+        info,
+        first: int = 20,
+        after: Optional[str] = None
+    ) -> ConnectionType[ReservaType]:
+        """
+        Lista reservas paginadas por cursor, ordenadas por data/hora de início.
+        Use pageInfo.endCursor como "after" para obter a próxima página.
+        """
+        get_current_user_from_context(info)  # Valida autenticação
+        
         try:
-            reservas = ReservaController.listar(db, skip=skip, limit=limit)
-            return [
-                ReservaType(
-                    id=r.id,
-                    local=r.local,
-                    sala=r.sala,
-                    sala_id=r.sala_id,
-                    data_hora_inicio=r.data_hora_inicio,
-                    data_hora_fim=r.data_hora_fim,
-                    responsavel_id=r.responsavel_id,
-                    responsavel=criar_responsavel_type(r.responsavel),
-                    cafe_quantidade=r.cafe_quantidade,
-                    cafe_descricao=r.cafe_descricao,
-                    link_meet=r.link_meet,
-                    created_at=r.created_at,
-                    updated_at=r.updated_at
-                )
-                for r in reservas
-            ]
-        finally:
-            db.close()
+            validar_tamanho_pagina(first)
+            apos = decodificar_cursor(after, datetime, int) if after else None
+        except ValueError as e:
+            raise Exception(str(e))
+        
+        db = obter_db(info)
+        colunas = colunas_selecionadas(
+            info, Reserva, caminho=("edges", "node"),
+            obrigatorios=COLUNAS_OBRIGATORIAS_RESERVA + ("data_hora_inicio",)
+        )
+        reservas = ReservaController.listar_linhas_por_cursor(db, colunas, limit=first + 1, apos=apos)
+        return montar_conexao(
+            reservas, first,
+            lambda r: (r.data_hora_inicio, r.id),
+            mapeador_de_linhas(ReservaType, colunas)
+        )
     
     @strawberry.field
+    @nao_bloqueante
     def reserva(self, info, reserva_id: int) -> Optional[ReservaType]:
         """Obtém uma reserva específica por ID."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
-        try:
-            r = ReservaController.obter_por_id(db, reserva_id)
-            if not r:
-                return None
-            return ReservaType(
-                id=r.id,
-                local=r.local,
-                sala=r.sala,
-                sala_id=r.sala_id,
-                data_hora_inicio=r.data_hora_inicio,
-                data_hora_fim=r.data_hora_fim,
-                responsavel_id=r.responsavel_id,
-                responsavel=criar_responsavel_type(r.responsavel),
-                cafe_quantidade=r.cafe_quantidade,
-                cafe_descricao=r.cafe_descricao,
-                link_meet=r.link_meet,
-                created_at=r.created_at,
-                updated_at=r.updated_at
-            )
-        finally:
-            db.close()
+        db = obter_db(info)
+        r = ReservaController.obter_por_id(db, reserva_id)
+        if not r:
+            return None
+        return criar_reserva_type(r)
     
     @strawberry.field
+    @nao_bloqueante
     def salas(
         self,
         info,
@@ -333,51 +535,55 @@ class Query:
         """Lista todas as salas."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
+        db = obter_db(info)
+        colunas = colunas_selecionadas(info, Sala)
+        mapear = mapeador_de_linhas(SalaType, colunas)
+        return [
+            mapear(linha)
+            for linha in SalaController.listar_linhas(
+                db, colunas, skip=skip, limit=limit, apenas_ativas=apenas_ativas
+            )
+        ]
+    
+    @strawberry.field
+    @nao_bloqueante
+    def salas_conexao(
+        self,
+        info,
+        first: int = 20,
+        after: Optional[str] = None,
+        apenas_ativas: bool = False
+    ) -> ConnectionType[SalaType]:
+        """Lista salas paginadas por cursor, ordenadas por ID."""
+        get_current_user_from_context(info)  # Valida autenticação
+        
         try:
-            salas = SalaController.listar(db, skip=skip, limit=limit, apenas_ativas=apenas_ativas)
-            return [
-                SalaType(
-                    id=s.id,
-                    nome=s.nome,
-                    local=s.local,
-                    capacidade=s.capacidade,
-                    descricao=s.descricao,
-                    criador_id=s.criador_id,
-                    ativa=s.ativa,
-                    created_at=s.created_at,
-                    updated_at=s.updated_at
-                )
-                for s in salas
-            ]
-        finally:
-            db.close()
+            validar_tamanho_pagina(first)
+            apos = decodificar_cursor(after, int) if after else None
+        except ValueError as e:
+            raise Exception(str(e))
+        
+        db = obter_db(info)
+        colunas = colunas_selecionadas(info, Sala, caminho=("edges", "node"))
+        salas = SalaController.listar_linhas_por_cursor(
+            db, colunas, limit=first + 1, apos_id=apos[0] if apos else None, apenas_ativas=apenas_ativas
+        )
+        return montar_conexao(salas, first, lambda s: (s.id,), mapeador_de_linhas(SalaType, colunas))
     
     @strawberry.field
+    @nao_bloqueante
     def sala(self, info, sala_id: int) -> Optional[SalaType]:
         """Obtém uma sala específica por ID."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
-        try:
-            s = SalaController.obter_por_id(db, sala_id)
-            if not s:
-                return None
-            return SalaType(
-                id=s.id,
-                nome=s.nome,
-                local=s.local,
-                capacidade=s.capacidade,
-                descricao=s.descricao,
-                criador_id=s.criador_id,
-                ativa=s.ativa,
-                created_at=s.created_at,
-                updated_at=s.updated_at
-            )
-        finally:
-            db.close()
+        db = obter_db(info)
+        s = SalaController.obter_por_id(db, sala_id)
+        if not s:
+            return None
+        return criar_sala_type(s)
     
     @strawberry.field
+    @nao_bloqueante
     def minhas_salas(
         self,
         info,
@@ -387,41 +593,30 @@ class Query:
         """Lista as salas criadas pelo usuário atual."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
-        try:
-            salas = SalaController.listar_por_criador(db, current_user.id, skip=skip, limit=limit)
-            return [
-                SalaType(
-                    id=s.id,
-                    nome=s.nome,
-                    local=s.local,
-                    capacidade=s.capacidade,
-                    descricao=s.descricao,
-                    criador_id=s.criador_id,
-                    ativa=s.ativa,
-                    created_at=s.created_at,
-                    updated_at=s.updated_at
-                )
-                for s in salas
-            ]
-        finally:
-            db.close()
+        db = obter_db(info)
+        colunas = colunas_selecionadas(info, Sala)
+        mapear = mapeador_de_linhas(SalaType, colunas)
+        return [
+            mapear(linha)
+            for linha in SalaController.listar_linhas(
+                db, colunas, skip=skip, limit=limit, criador_id=current_user.id
+            )
+        ]
     
     @strawberry.field
+    @nao_bloqueante
     def meu_perfil(self, info) -> UsuarioType:
         """Retorna o perfil do usuário atual, incluindo se é admin."""
         current_user = get_current_user_from_context(info)
         
-        return UsuarioType(
-            id=current_user.id,
-            nome=current_user.nome,
-            username=current_user.username,
-            email=current_user.email,
-            admin=current_user.admin,
-            created_at=current_user.created_at
-        )
+        # O token só traz id, username e admin; os demais dados vêm do banco
+        usuario = AuthController.obter_usuario_por_id(obter_db(info), current_user.id)
+        if not usuario:
+            raise Exception("Usuário não encontrado")
+        return criar_usuario_type(usuario)
     
     @strawberry.field
+    @nao_bloqueante
     def usuarios(self, info, skip: int = 0, limit: int = 100) -> List[UsuarioType]:
         """
         Lista todos os usuários do sistema.
@@ -431,24 +626,45 @@ class Query:
         if not current_user.admin:
             raise Exception("Apenas administradores podem listar usuários")
         
-        db = SessionLocal()
+        db = obter_db(info)
+        colunas = colunas_selecionadas(info, Usuario)
+        mapear = mapeador_de_linhas(UsuarioType, colunas)
+        return [
+            mapear(linha)
+            for linha in AuthController.listar_usuarios_linhas(db, colunas, skip=skip, limit=limit)
+        ]
+    
+    @strawberry.field
+    @nao_bloqueante
+    def usuarios_conexao(
+        self,
+        info,
+        first: int = 20,
+        after: Optional[str] = None
+    ) -> ConnectionType[UsuarioType]:
+        """
+        Lista usuários paginados por cursor, ordenados por ID.
+        Apenas administradores podem acessar esta query.
+        """
+        current_user = get_current_user_from_context(info)
+        if not current_user.admin:
+            raise Exception("Apenas administradores podem listar usuários")
+        
         try:
-            usuarios = AuthController.listar_usuarios(db, skip=skip, limit=limit)
-            return [
-                UsuarioType(
-                    id=u.id,
-                    nome=u.nome,
-                    username=u.username,
-                    email=u.email,
-                    admin=u.admin,
-                    created_at=u.created_at
-                )
-                for u in usuarios
-            ]
-        finally:
-            db.close()
+            validar_tamanho_pagina(first)
+            apos = decodificar_cursor(after, int) if after else None
+        except ValueError as e:
+            raise Exception(str(e))
+        
+        db = obter_db(info)
+        colunas = colunas_selecionadas(info, Usuario, caminho=("edges", "node"))
+        usuarios = AuthController.listar_usuarios_linhas_por_cursor(
+            db, colunas, limit=first + 1, apos_id=apos[0] if apos else None
+        )
+        return montar_conexao(usuarios, first, lambda u: (u.id,), mapeador_de_linhas(UsuarioType, colunas))
     
     @strawberry.field
+    @nao_bloqueante
     def usuario(self, info, usuario_id: int) -> Optional[UsuarioType]:
         """
         Obtém um usuário específico por ID.
@@ -458,23 +674,21 @@ class Query:
         if not current_user.admin:
             raise Exception("Apenas administradores podem visualizar usuários")
         
-        db = SessionLocal()
-        try:
-            u = AuthController.obter_usuario_por_id(db, usuario_id)
-            if not u:
-                return None
-            return UsuarioType(
-                id=u.id,
-                nome=u.nome,
-                username=u.username,
-                email=u.email,
-                admin=u.admin,
-                created_at=u.created_at
-            )
-        finally:
-            db.close()
+        db = obter_db(info)
+        u = AuthController.obter_usuario_por_id(db, usuario_id)
+        if not u:
+            return None
+        return UsuarioType(
+            id=u.id,
+            nome=u.nome,
+            username=u.username,
+            email=u.email,
+            admin=u.admin,
+            created_at=u.created_at
+        )
     
     @strawberry.field
+    @nao_bloqueante
     def usuarios_nao_admin(
         self,
         info,
@@ -484,46 +698,36 @@ class Query:
         """Lista todos os usuários que não são administradores (para seleção de participantes)."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
-        try:
-            usuarios = ReservaParticipanteController.listar_usuarios_nao_admin(db, skip=skip, limit=limit)
-            return [
-                ResponsavelType(
-                    id=u.id,
-                    nome=u.nome,
-                    username=u.username,
-                    email=u.email
-                )
-                for u in usuarios
-            ]
-        finally:
-            db.close()
+        db = obter_db(info)
+        usuarios = ReservaParticipanteController.listar_usuarios_nao_admin(db, skip=skip, limit=limit)
+        return [
+            ResponsavelType(
+                id=u.id,
+                nome=u.nome,
+                username=u.username,
+                email=u.email
+            )
+            for u in usuarios
+        ]
     
     @strawberry.field
+    @nao_bloqueante
     def participantes_reserva(self, info, reserva_id: int) -> List[ReservaParticipanteType]:
         """Lista todos os participantes de uma reserva."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
-        try:
-            participantes = ReservaParticipanteController.listar_participantes(db, reserva_id)
-            return [
-                ReservaParticipanteType(
-                    id=p.id,
-                    reserva_id=p.reserva_id,
-                    usuario_id=p.usuario_id,
-                    notificado=p.notificado,
-                    visto=p.visto,
-                    created_at=p.created_at,
-                    usuario=criar_responsavel_type(p.usuario) if p.usuario else None,
-                    reserva=criar_reserva_type_completa(p.reserva) if p.reserva else None
-                )
-                for p in participantes
-            ]
-        finally:
-            db.close()
+        db = obter_db(info)
+        participantes = ReservaParticipanteController.listar_participantes(
+            db, reserva_id,
+            opcoes=opcoes_de_carregamento(info, ReservaParticipante, obrigatorios=COLUNAS_OBRIGATORIAS_PARTICIPANTE)
+        )
+        return [
+            criar_participante_type(p)
+            for p in participantes
+        ]
     
     @strawberry.field
+    @nao_bloqueante
     def minhas_reservas_convidadas(
         self,
         info,
@@ -539,28 +743,55 @@ class Query:
         """
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
+        participantes = ReservaParticipanteController.listar_reservas_do_usuario(
+            db, current_user.id, apenas_nao_notificadas, apenas_nao_vistas, skip=skip, limit=limit,
+            opcoes=opcoes_de_carregamento(info, ReservaParticipante, obrigatorios=COLUNAS_OBRIGATORIAS_PARTICIPANTE)
+        )
+        return [
+            criar_participante_type(p)
+            for p in participantes
+        ]
+    
+    @strawberry.field
+    @nao_bloqueante
+    def minhas_reservas_convidadas_conexao(
+        self,
+        info,
+        first: int = 20,
+        after: Optional[str] = None,
+        apenas_nao_notificadas: bool = False,
+        apenas_nao_vistas: bool = False
+    ) -> ConnectionType[ReservaParticipanteType]:
+        """
+        Versão paginada por cursor de minhasReservasConvidadas,
+        ordenada dos convites mais recentes para os mais antigos.
+        """
+        current_user = get_current_user_from_context(info)
+        
         try:
-            participantes = ReservaParticipanteController.listar_reservas_do_usuario(
-                db, current_user.id, apenas_nao_notificadas, apenas_nao_vistas, skip=skip, limit=limit
+            validar_tamanho_pagina(first)
+            apos = decodificar_cursor(after, datetime, int) if after else None
+        except ValueError as e:
+            raise Exception(str(e))
+        
+        db = obter_db(info)
+        participantes = ReservaParticipanteController.listar_reservas_do_usuario_por_cursor(
+            db, current_user.id, apenas_nao_notificadas, apenas_nao_vistas,
+            limit=first + 1, apos=apos,
+            opcoes=opcoes_de_carregamento(
+                info, ReservaParticipante, caminho=("edges", "node"),
+                obrigatorios=COLUNAS_OBRIGATORIAS_PARTICIPANTE + ("created_at",)
             )
-            return [
-                ReservaParticipanteType(
-                    id=p.id,
-                    reserva_id=p.reserva_id,
-                    usuario_id=p.usuario_id,
-                    notificado=p.notificado,
-                    visto=p.visto,
-                    created_at=p.created_at,
-                    usuario=criar_responsavel_type(p.usuario) if p.usuario else None,
-                    reserva=criar_reserva_type_completa(p.reserva) if p.reserva else None
-                )
-                for p in participantes
-            ]
-        finally:
-            db.close()
+        )
+        return montar_conexao(
+            participantes, first,
+            lambda p: (p.created_at, p.id),
+            criar_participante_type
+        )
     
     @strawberry.field
+    @nao_bloqueante
     def contar_reservas_nao_vistas(self, info) -> int:
         """
         Conta quantas reservas não vistas o usuário atual tem.
@@ -568,13 +799,11 @@ class Query:
         """
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
-        try:
-            return ReservaParticipanteController.contar_reservas_nao_vistas(db, current_user.id)
-        finally:
-            db.close()
+        db = obter_db(info)
+        return ReservaParticipanteController.contar_reservas_nao_vistas(db, current_user.id)
     
     @strawberry.field
+    @nao_bloqueante
     def meu_historico(
         self,
         info,
@@ -595,55 +824,27 @@ class Query:
         """
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
-        try:
-            historico = ReservaController.listar_historico_usuario(
-                db, current_user.id, apenas_futuras, apenas_passadas, skip, limit
+        db = obter_db(info)
+        historico = ReservaController.listar_historico_usuario(
+            db, current_user.id, apenas_futuras, apenas_passadas, skip, limit,
+            opcoes=opcoes_de_carregamento(
+                info, Reserva, caminho=("reserva",), obrigatorios=COLUNAS_OBRIGATORIAS_RESERVA
             )
+        )
+        
+        resultado = []
+        for reserva, is_responsavel in historico:
+            reserva_type = criar_reserva_type(reserva)
             
-            resultado = []
-            for reserva, is_responsavel in historico:
-                sala_type = None
-                if reserva.sala_rel:
-                    sala_type = SalaType(
-                        id=reserva.sala_rel.id,
-                        nome=reserva.sala_rel.nome,
-                        local=reserva.sala_rel.local,
-                        capacidade=reserva.sala_rel.capacidade,
-                        descricao=reserva.sala_rel.descricao,
-                        criador_id=reserva.sala_rel.criador_id,
-                        ativa=reserva.sala_rel.ativa,
-                        created_at=reserva.sala_rel.created_at,
-                        updated_at=reserva.sala_rel.updated_at
-                    )
-                
-                reserva_type = ReservaType(
-                    id=reserva.id,
-                    local=reserva.local,
-                    sala=reserva.sala,
-                    sala_id=reserva.sala_id,
-                    data_hora_inicio=reserva.data_hora_inicio,
-                    data_hora_fim=reserva.data_hora_fim,
-                    responsavel_id=reserva.responsavel_id,
-                    responsavel=criar_responsavel_type(reserva.responsavel),
-                    cafe_quantidade=reserva.cafe_quantidade,
-                    cafe_descricao=reserva.cafe_descricao,
-                    link_meet=reserva.link_meet,
-                    sala_rel=sala_type,
-                    created_at=reserva.created_at,
-                    updated_at=reserva.updated_at
-                )
-                
-                resultado.append(ReservaHistoricoType(
-                    reserva=reserva_type,
-                    sou_responsavel=is_responsavel
-                ))
-            
-            return resultado
-        finally:
-            db.close()
+            resultado.append(ReservaHistoricoType(
+                reserva=reserva_type,
+                sou_responsavel=is_responsavel
+            ))
+        
+        return resultado
     
     @strawberry.field
+    @nao_bloqueante
     def reservas_por_sala(
         self,
         info,
@@ -655,33 +856,20 @@ class Query:
         """Lista todas as reservas de uma sala em uma data específica."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
-        try:
-            from datetime import date as date_type
-            data_obj = datetime.strptime(data, "%Y-%m-%d").date()
-            reservas = ReservaController.listar_por_sala_e_data(db, sala_id, data_obj, skip=skip, limit=limit)
-            return [
-                ReservaType(
-                    id=r.id,
-                    local=r.local,
-                    sala=r.sala,
-                    sala_id=r.sala_id,
-                    data_hora_inicio=r.data_hora_inicio,
-                    data_hora_fim=r.data_hora_fim,
-                    responsavel_id=r.responsavel_id,
-                    responsavel=criar_responsavel_type(r.responsavel),
-                    cafe_quantidade=r.cafe_quantidade,
-                    cafe_descricao=r.cafe_descricao,
-                    link_meet=r.link_meet,
-                    created_at=r.created_at,
-                    updated_at=r.updated_at
-                )
-                for r in reservas
-            ]
-        finally:
-            db.close()
+        db = obter_db(info)
+        from datetime import date as date_type
+        data_obj = datetime.strptime(data, "%Y-%m-%d").date()
+        reservas = ReservaController.listar_por_sala_e_data(
+            db, sala_id, data_obj, skip=skip, limit=limit,
+            opcoes=opcoes_de_carregamento(info, Reserva, obrigatorios=COLUNAS_OBRIGATORIAS_RESERVA)
+        )
+        return [
+            criar_reserva_type(r)
+            for r in reservas
+        ]
     
     @strawberry.field
+    @nao_bloqueante
     def horarios_disponiveis(
         self,
         info,
@@ -693,21 +881,157 @@ class Query:
         """Retorna os horários disponíveis de uma sala em uma data específica."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
+        db = obter_db(info)
+        from datetime import date as date_type
+        data_obj = datetime.strptime(data, "%Y-%m-%d").date()
+        horarios = ReservaController.obter_horarios_disponiveis(
+            db, sala_id, data_obj, hora_inicio, hora_fim
+        )
+        return [
+            HorarioDisponivelType(inicio=inicio, fim=fim)
+            for inicio, fim in horarios
+        ]
+    
+    @strawberry.field(metadata={"custo": custo_horarios_disponiveis_salas})
+    @nao_bloqueante
+    def horarios_disponiveis_salas(
+        self,
+        info,
+        sala_ids: List[int],
+        data: str,  # Formato: "YYYY-MM-DD"
+        hora_inicio: Optional[str] = "08:00:00",  # Formato: "HH:MM:SS"
+        hora_fim: Optional[str] = "18:00:00"  # Formato: "HH:MM:SS"
+    ) -> List[HorariosDisponiveisSalaType]:
+        """
+        Retorna os horários disponíveis de várias salas em uma data específica.
+        Todas as salas são resolvidas com uma única consulta ao banco.
+        """
+        get_current_user_from_context(info)  # Valida autenticação
+        
+        db = obter_db(info)
         try:
-            from datetime import date as date_type
             data_obj = datetime.strptime(data, "%Y-%m-%d").date()
-            horarios = ReservaController.obter_horarios_disponiveis(
-                db, sala_id, data_obj, hora_inicio, hora_fim
+            horarios_por_sala = ReservaController.obter_horarios_disponiveis_salas(
+                db, sala_ids, data_obj, hora_inicio, hora_fim
             )
             return [
-                HorarioDisponivelType(inicio=inicio, fim=fim)
-                for inicio, fim in horarios
+                HorariosDisponiveisSalaType(
+                    sala_id=sala_id,
+                    horarios=[HorarioDisponivelType(inicio=inicio, fim=fim) for inicio, fim in horarios]
+                )
+                for sala_id, horarios in horarios_por_sala.items()
             ]
-        finally:
-            db.close()
+        except ValueError as e:
+            raise Exception(str(e))
+    
+    @strawberry.field(metadata={"custo": 20})
+    @nao_bloqueante
+    def horarios_disponiveis_salas_ativas(
+        self,
+        info,
+        data: str,  # Formato: "YYYY-MM-DD"
+        hora_inicio: Optional[str] = "08:00:00",  # Formato: "HH:MM:SS"
+        hora_fim: Optional[str] = "18:00:00"  # Formato: "HH:MM:SS"
+    ) -> List[HorariosDisponiveisSalaType]:
+        """Retorna os horários disponíveis de todas as salas ativas em uma data específica."""
+        get_current_user_from_context(info)  # Valida autenticação
+        
+        db = obter_db(info)
+        data_obj = datetime.strptime(data, "%Y-%m-%d").date()
+        horarios_por_sala = ReservaController.obter_horarios_disponiveis_salas_ativas(
+            db, data_obj, hora_inicio, hora_fim
+        )
+        return [
+            HorariosDisponiveisSalaType(
+                sala_id=sala_id,
+                horarios=[HorarioDisponivelType(inicio=inicio, fim=fim) for inicio, fim in horarios]
+            )
+            for sala_id, horarios in horarios_por_sala.items()
+        ]
+    
+    @strawberry.field(metadata={"custo": 10})
+    @nao_bloqueante
+    def buscar_sala_disponivel(
+        self,
+        info,
+        duracao_minutos: int,
+        janela_inicio: datetime,
+        janela_fim: datetime,
+        capacidade_minima: Optional[int] = None,
+        limite: int = 5,
+        hora_inicio: Optional[str] = "08:00:00",  # Início do expediente, formato: "HH:MM:SS"
+        hora_fim: Optional[str] = "18:00:00",  # Fim do expediente, formato: "HH:MM:SS"
+        apenas_dias_uteis: bool = True
+    ) -> List[SalaDisponivelType]:
+        """
+        Busca salas ativas com capacidade para o grupo e um horário livre de duracao_minutos
+        dentro da janela informada. Retorna até `limite` salas, cada uma com o seu primeiro
+        horário livre, ordenadas pelo horário.
+        """
+        get_current_user_from_context(info)  # Valida autenticação
+        
+        db = obter_db(info)
+        try:
+            encontradas = ReservaController.buscar_salas_disponiveis(
+                db,
+                duracao_minutos,
+                janela_inicio,
+                janela_fim,
+                capacidade_minima=capacidade_minima,
+                limite=limite,
+                hora_inicio=hora_inicio,
+                hora_fim=hora_fim,
+                apenas_dias_uteis=apenas_dias_uteis
+            )
+            return [
+                SalaDisponivelType(
+                    sala=criar_sala_type(s),
+                    inicio=inicio,
+                    fim=fim
+                )
+                for s, inicio, fim in encontradas
+            ]
+        except ValueError as e:
+            raise Exception(str(e))
+    
+    @strawberry.field(metadata={"custo": custo_grade_ocupacao})
+    @nao_bloqueante
+    def grade_ocupacao(
+        self,
+        info,
+        sala_ids: List[int],
+        data_inicio: str,  # Formato: "YYYY-MM-DD"
+        data_fim: str,  # Formato: "YYYY-MM-DD"
+        granularidade_minutos: int = 15
+    ) -> GradeOcupacaoType:
+        """
+        Retorna a ocupação de várias salas em um período (ex: semana ou mês) como bitmaps,
+        um por sala, com um bit por slot de granularidade_minutos (5, 10, 15, 30 ou 60).
+        """
+        get_current_user_from_context(info)  # Valida autenticação
+        
+        db = obter_db(info)
+        try:
+            data_inicio_obj = datetime.strptime(data_inicio, "%Y-%m-%d").date()
+            data_fim_obj = datetime.strptime(data_fim, "%Y-%m-%d").date()
+            sala_ids = list(dict.fromkeys(sala_ids))
+            inicio, grade = ReservaController.gerar_grade_ocupacao(
+                db, sala_ids, data_inicio_obj, data_fim_obj, granularidade_minutos
+            )
+            return GradeOcupacaoType(
+                inicio=inicio,
+                granularidade_minutos=granularidade_minutos,
+                total_slots=grade.shape[1],
+                salas=[
+                    GradeOcupacaoSalaType(sala_id=sala_id, ocupacao=ocupacao)
+                    for sala_id, ocupacao in zip(sala_ids, compactar_grade_ocupacao(grade))
+                ]
+            )
+        except ValueError as e:
+            raise Exception(str(e))
     
     @strawberry.field
+    @nao_bloqueante
     def verificar_disponibilidade(
         self,
         info,
@@ -718,116 +1042,152 @@ class Query:
         """Verifica se um horário específico está disponível para uma sala."""
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             # Parse ISO 8601 format
             inicio = datetime.strptime(data_hora_inicio, "%Y-%m-%dT%H:%M:%S")
             fim = datetime.strptime(data_hora_fim, "%Y-%m-%dT%H:%M:%S")
-            return ReservaController.verificar_disponibilidade(db, sala_id, inicio, fim)
         except ValueError:
             # Tenta formato com timezone
             try:
                 inicio = datetime.fromisoformat(data_hora_inicio.replace('Z', '+00:00'))
                 fim = datetime.fromisoformat(data_hora_fim.replace('Z', '+00:00'))
-                return ReservaController.verificar_disponibilidade(db, sala_id, inicio, fim)
-            except:
+            except ValueError:
                 raise Exception("Formato de data/hora inválido. Use: YYYY-MM-DDTHH:mm:ss")
-        finally:
-            db.close()
+        return ReservaController.verificar_disponibilidade(db, sala_id, inicio, fim)
     
     @strawberry.field
+    @nao_bloqueante
     def horarios_disponiveis_por_hora(
         self,
         info,
         sala_id: int,
         data: str,  # Formato: "YYYY-MM-DD"
         hora_inicio: Optional[str] = "08:00:00",  # Formato: "HH:MM:SS"
-        hora_fim: Optional[str] = "18:00:00"  # Formato: "HH:MM:SS"
+        hora_fim: Optional[str] = "18:00:00",  # Formato: "HH:MM:SS"
+        granularidade_minutos: int = 60,  # 5, 10, 15, 30 ou 60
+        duracao_minima_minutos: Optional[int] = None
     ) -> List[str]:
         """
-        Retorna lista de horários disponíveis em slots de 1 hora.
+        Retorna lista de horários disponíveis em slots de granularidade_minutos (padrão: 1 hora).
         Retorna lista de strings no formato "HH:MM" (ex: ["08:00", "09:00", "10:00"]).
-        Cada hora representa um slot de 1 hora disponível para reserva.
+        Cada horário representa o início de um slot disponível para reserva.
+        Com duracao_minima_minutos, retorna apenas os horários a partir dos quais a sala
+        fica livre por pelo menos essa duração.
         """
         get_current_user_from_context(info)  # Valida autenticação
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             from datetime import date as date_type
             data_obj = datetime.strptime(data, "%Y-%m-%d").date()
             horas = ReservaController.obter_horarios_disponiveis_por_hora(
-                db, sala_id, data_obj, hora_inicio, hora_fim
+                db, sala_id, data_obj, hora_inicio, hora_fim,
+                granularidade_minutos=granularidade_minutos,
+                duracao_minima_minutos=duracao_minima_minutos
             )
             return horas
-        finally:
-            db.close()
+        except ValueError as e:
+            raise Exception(str(e))
 
 
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    def criar_usuario(self, usuario: UsuarioInput) -> UsuarioType:
+    async def criar_usuario(self, info, usuario: UsuarioInput) -> UsuarioType:
         """Cria um novo usuário."""
-        db = SessionLocal()
-        try:
-            # Valida tamanho da senha (bcrypt tem limite de 72 bytes)
-            if len(usuario.password.encode('utf-8')) > 72:
-                raise Exception("A senha não pode ter mais de 72 caracteres")
-            
-            # Verifica se username já existe
-            existing_user = db.query(Usuario).filter(Usuario.username == usuario.username).first()
-            if existing_user:
-                raise Exception("Username já está em uso")
-            
-            # Verifica se email já existe
-            existing_email = db.query(Usuario).filter(Usuario.email == usuario.email).first()
-            if existing_email:
-                raise Exception("Email já está em uso")
-            
-            novo_usuario = AuthController.criar_usuario(
-                db, usuario.username, usuario.email, usuario.password, nome=usuario.nome
-            )
-            return UsuarioType(
-                id=novo_usuario.id,
-                nome=novo_usuario.nome,
-                username=novo_usuario.username,
-                email=novo_usuario.email,
-                admin=novo_usuario.admin,
-                created_at=novo_usuario.created_at
-            )
-        finally:
-            db.close()
+        await executar_db(
+            info.context, verificar_username_e_email_livres,
+            obter_db(info), usuario.username, usuario.email
+        )
+        hashed_password = await gerar_hash_senha(usuario.password)
+        
+        def criar() -> UsuarioType:
+            db = obter_db(info)
+            try:
+                novo_usuario = AuthController.criar_usuario(
+                    db, usuario.username, usuario.email, None,
+                    nome=usuario.nome, hashed_password=hashed_password
+                )
+                return criar_usuario_type(novo_usuario)
+            finally:
+                db.rollback()
+        
+        return await executar_db(info.context, criar)
     
     @strawberry.mutation
-    def login(self, login_data: LoginInput) -> TokenType:
+    async def login(self, info, login_data: LoginInput) -> TokenType:
         """Faz login e retorna um token de acesso."""
-        db = SessionLocal()
+        # Valida tamanho da senha (bcrypt tem limite de 72 bytes)
+        if len(login_data.password.encode('utf-8')) > 72:
+            raise Exception("A senha não pode ter mais de 72 caracteres")
+        
+        def obter_credenciais() -> Optional[tuple]:
+            db = obter_db(info)
+            try:
+                user = get_user_by_username(db, login_data.username)
+                return (claims_do_usuario(user), user.hashed_password) if user else None
+            finally:
+                db.rollback()
+        
+        credenciais = await executar_db(info.context, obter_credenciais)
+        # O bcrypt roda no pool_senhas, sem bloquear o event loop
+        if not credenciais or not await pool_senhas.verificar(login_data.password, credenciais[1]):
+            raise Exception("Username ou senha incorretos")
+        claims = credenciais[0]
+        
+        def emitir_refresh_token() -> str:
+            db = obter_db(info)
+            try:
+                return AuthController.emitir_refresh_token(db, claims["uid"])
+            finally:
+                db.rollback()
+        
+        refresh_token = await executar_db(info.context, emitir_refresh_token)
+        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+        access_token = create_access_token(
+            data=claims, expires_delta=access_token_expires
+        )
+        return TokenType(
+            access_token=access_token,
+            token_type="bearer",
+            refresh_token=refresh_token
+        )
+    
+    @strawberry.mutation
+    @nao_bloqueante
+    def renovar_token(self, info, refresh_token: str) -> TokenType:
+        """
+        Troca um refresh token (retornado por login ou pela renovação anterior) por um novo
+        token de acesso e um novo refresh token; o refresh token usado deixa de valer.
+        Não exige a senha: evita um novo login (e o custo do bcrypt) a cada expiração.
+        """
+        db = obter_db(info)
         try:
-            # Valida tamanho da senha (bcrypt tem limite de 72 bytes)
-            if len(login_data.password.encode('utf-8')) > 72:
-                raise Exception("A senha não pode ter mais de 72 caracteres")
-            
-            user = authenticate_user(db, login_data.username, login_data.password)
-            if not user:
-                raise Exception("Username ou senha incorretos")
+            resultado = AuthController.renovar_refresh_token(db, refresh_token)
+            if not resultado:
+                raise Exception("Refresh token inválido ou expirado")
             
+            claims, novo_refresh_token = resultado
             access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
             access_token = create_access_token(
-                data={"sub": user.username}, expires_delta=access_token_expires
+                data=claims, expires_delta=access_token_expires
             )
             return TokenType(
                 access_token=access_token,
-                token_type="bearer"
+                token_type="bearer",
+                refresh_token=novo_refresh_token
             )
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def criar_reserva(self, info, reserva: ReservaInput) -> ReservaType:
         """Cria uma nova reserva."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             reserva_create = ReservaCreate(
                 local=reserva.local,
@@ -840,29 +1200,68 @@ class Mutation:
                 link_meet=reserva.link_meet
             )
             r = ReservaController.criar(db, reserva_create, current_user.id, sala_id=reserva.sala_id)
-            return ReservaType(
-                id=r.id,
-                local=r.local,
-                sala=r.sala,
-                sala_id=r.sala_id,
-                data_hora_inicio=r.data_hora_inicio,
-                data_hora_fim=r.data_hora_fim,
-                responsavel_id=r.responsavel_id,
-                responsavel=criar_responsavel_type(r.responsavel),
-                cafe_quantidade=r.cafe_quantidade,
-                cafe_descricao=r.cafe_descricao,
-                link_meet=r.link_meet,
-                created_at=r.created_at,
-                updated_at=r.updated_at
+            return criar_reserva_type(r)
+        except ConflitoHorarioException as e:
+            raise Exception(str(e))
+        except ValueError as e:
+            raise Exception(str(e))
+        finally:
+            db.rollback()
+    
+    @strawberry.mutation
+    @nao_bloqueante
+    def criar_reservas_recorrentes(
+        self,
+        info,
+        reserva: ReservaInput,
+        recorrencia: RecorrenciaInput,
+        ignorar_conflitos: bool = False
+    ) -> ResultadoRecorrenciaType:
+        """
+        Cria uma reserva recorrente (diária, semanal ou mensal) em uma única transação.
+        Se ignorar_conflitos=False, nenhuma ocorrência é criada quando alguma conflita.
+        Se ignorar_conflitos=True, cria as ocorrências livres e retorna as conflitantes em `conflitos`.
+        """
+        current_user = get_current_user_from_context(info)
+        
+        db = obter_db(info)
+        try:
+            reserva_create = ReservaCreate(
+                local=reserva.local,
+                sala=reserva.sala,
+                sala_id=reserva.sala_id,
+                data_hora_inicio=reserva.data_hora_inicio,
+                data_hora_fim=reserva.data_hora_fim,
+                cafe_quantidade=reserva.cafe_quantidade,
+                cafe_descricao=reserva.cafe_descricao,
+                link_meet=reserva.link_meet
+            )
+            criadas, conflitos = ReservaController.criar_recorrentes(
+                db,
+                reserva_create,
+                current_user.id,
+                FrequenciaRecorrencia(recorrencia.frequencia.value),
+                intervalo=recorrencia.intervalo,
+                data_limite=recorrencia.data_fim,
+                ocorrencias=recorrencia.ocorrencias,
+                ignorar_conflitos=ignorar_conflitos
+            )
+            return ResultadoRecorrenciaType(
+                reservas_criadas=[
+                    criar_reserva_type(r)
+                    for r in criadas
+                ],
+                conflitos=[OcorrenciaConflitanteType(inicio=inicio, fim=fim) for inicio, fim in conflitos]
             )
         except ConflitoHorarioException as e:
             raise Exception(str(e))
         except ValueError as e:
             raise Exception(str(e))
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def atualizar_reserva(
         self,
         info,
@@ -872,7 +1271,7 @@ class Mutation:
         """Atualiza uma reserva existente."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             reserva_update = ReservaUpdate(
                 local=reserva.local,
@@ -889,45 +1288,33 @@ class Mutation:
                 return None
             # Recarrega a reserva com o relacionamento responsavel
             r = ReservaController.obter_por_id(db, r.id)
-            return ReservaType(
-                id=r.id,
-                local=r.local,
-                sala=r.sala,
-                sala_id=r.sala_id,
-                data_hora_inicio=r.data_hora_inicio,
-                data_hora_fim=r.data_hora_fim,
-                responsavel_id=r.responsavel_id,
-                responsavel=criar_responsavel_type(r.responsavel),
-                cafe_quantidade=r.cafe_quantidade,
-                cafe_descricao=r.cafe_descricao,
-                link_meet=r.link_meet,
-                created_at=r.created_at,
-                updated_at=r.updated_at
-            )
+            return criar_reserva_type(r)
         except ConflitoHorarioException as e:
             raise Exception(str(e))
         except ValueError as e:
             raise Exception(str(e))
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def deletar_reserva(self, info, reserva_id: int) -> bool:
         """Deleta uma reserva."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             return ReservaController.deletar(db, reserva_id, current_user.id)
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def criar_sala(self, info, sala: SalaInput) -> SalaType:
         """Cria uma nova sala de reunião. Apenas administradores podem criar salas."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             sala_create = SalaCreate(
                 nome=sala.nome,
@@ -936,23 +1323,14 @@ class Mutation:
                 descricao=sala.descricao
             )
             s = SalaController.criar(db, sala_create, current_user.id)
-            return SalaType(
-                id=s.id,
-                nome=s.nome,
-                local=s.local,
-                capacidade=s.capacidade,
-                descricao=s.descricao,
-                criador_id=s.criador_id,
-                ativa=s.ativa,
-                created_at=s.created_at,
-                updated_at=s.updated_at
-            )
+            return criar_sala_type(s)
         except PermissionError as e:
             raise Exception(str(e))
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def atualizar_sala(
         self,
         info,
@@ -962,7 +1340,7 @@ class Mutation:
         """Atualiza uma sala existente. Apenas administradores podem atualizar salas."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             sala_update = SalaUpdate(
                 nome=sala.nome,
@@ -974,65 +1352,54 @@ class Mutation:
             s = SalaController.atualizar(db, sala_id, sala_update, current_user.id)
             if not s:
                 raise Exception("Sala não encontrada ou você não tem permissão para atualizá-la")
-            return SalaType(
-                id=s.id,
-                nome=s.nome,
-                local=s.local,
-                capacidade=s.capacidade,
-                descricao=s.descricao,
-                criador_id=s.criador_id,
-                ativa=s.ativa,
-                created_at=s.created_at,
-                updated_at=s.updated_at
-            )
+            return criar_sala_type(s)
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def deletar_sala(self, info, sala_id: int) -> bool:
         """Deleta uma sala. Apenas administradores podem deletar salas."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             resultado = SalaController.deletar(db, sala_id, current_user.id)
             if not resultado:
                 raise Exception("Sala não encontrada ou você não tem permissão para deletá-la")
             return resultado
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
-    def atualizar_perfil(self, info, usuario: UsuarioUpdateInput) -> UsuarioType:
+    async def atualizar_perfil(self, info, usuario: UsuarioUpdateInput) -> UsuarioType:
         """Atualiza o perfil do usuário atual."""
-        current_user = get_current_user_from_context(info)
+        current_user = await executar_db(info.context, get_current_user_from_context, info)
+        usuario_id = current_user.id
+        hashed_password = await gerar_hash_senha(usuario.password)
         
-        db = SessionLocal()
-        try:
-            usuario_atualizado = AuthController.atualizar_usuario(
-                db,
-                current_user.id,
-                nome=usuario.nome,
-                email=usuario.email,
-                password=usuario.password
-            )
-            if not usuario_atualizado:
-                raise Exception("Erro ao atualizar perfil")
-            
-            return UsuarioType(
-                id=usuario_atualizado.id,
-                nome=usuario_atualizado.nome,
-                username=usuario_atualizado.username,
-                email=usuario_atualizado.email,
-                admin=usuario_atualizado.admin,
-                created_at=usuario_atualizado.created_at
-            )
-        except ValueError as e:
-            raise Exception(str(e))
-        finally:
-            db.close()
+        def atualizar() -> UsuarioType:
+            db = obter_db(info)
+            try:
+                usuario_atualizado = AuthController.atualizar_usuario(
+                    db,
+                    usuario_id,
+                    nome=usuario.nome,
+                    email=usuario.email,
+                    hashed_password=hashed_password
+                )
+                if not usuario_atualizado:
+                    raise Exception("Erro ao atualizar perfil")
+                return criar_usuario_type(usuario_atualizado)
+            except ValueError as e:
+                raise Exception(str(e))
+            finally:
+                db.rollback()
+        
+        return await executar_db(info.context, atualizar)
     
     @strawberry.mutation
+    @nao_bloqueante
     def adicionar_participante(
         self,
         info,
@@ -1046,7 +1413,7 @@ class Mutation:
         """
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             participante = ReservaParticipanteController.adicionar_participante(
                 db, reserva_id, usuario_id, current_user.id
@@ -1054,22 +1421,47 @@ class Mutation:
             if not participante:
                 raise Exception("Não foi possível adicionar o participante. Verifique se você é o responsável pela reserva e se o usuário não é admin.")
             
-            return ReservaParticipanteType(
-                id=participante.id,
-                reserva_id=participante.reserva_id,
-                usuario_id=participante.usuario_id,
-                notificado=participante.notificado,
-                visto=participante.visto,
-                created_at=participante.created_at,
-                usuario=criar_responsavel_type(participante.usuario) if participante.usuario else None,
-                reserva=criar_reserva_type_completa(participante.reserva) if participante.reserva else None
-            )
+            return criar_participante_type(participante)
         except Exception as e:
             raise Exception(str(e))
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
+    def adicionar_participantes(
+        self,
+        info,
+        reserva_id: int,
+        usuario_ids: List[int]
+    ) -> List[ResultadoAdicaoParticipanteType]:
+        """
+        Adiciona vários participantes a uma reserva de uma só vez.
+        Apenas o responsável pela reserva pode adicionar participantes.
+        Retorna o resultado de cada usuário: ADICIONADO, JA_PARTICIPANTE,
+        USUARIO_NAO_ENCONTRADO ou USUARIO_ADMIN (admins não podem ser participantes).
+        """
+        current_user = get_current_user_from_context(info)
+        
+        db = obter_db(info)
+        try:
+            resultado = ReservaParticipanteController.adicionar_participantes(
+                db, reserva_id, usuario_ids, current_user.id
+            )
+            if resultado is None:
+                raise Exception("Não foi possível adicionar os participantes. Verifique se você é o responsável pela reserva.")
+            
+            return [
+                ResultadoAdicaoParticipanteType(usuario_id=usuario_id, status=status)
+                for usuario_id, status in resultado.items()
+            ]
+        except ValueError as e:
+            raise Exception(str(e))
+        finally:
+            db.rollback()
+    
+    @strawberry.mutation
+    @nao_bloqueante
     def remover_participante(
         self,
         info,
@@ -1082,7 +1474,7 @@ class Mutation:
         """
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             resultado = ReservaParticipanteController.remover_participante(
                 db, reserva_id, usuario_id, current_user.id
@@ -1093,9 +1485,10 @@ class Mutation:
         except Exception as e:
             raise Exception(str(e))
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def marcar_reserva_como_notificada(
         self,
         info,
@@ -1104,7 +1497,7 @@ class Mutation:
         """Marca uma reserva como notificada para o usuário atual."""
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             resultado = ReservaParticipanteController.marcar_como_notificado(
                 db, reserva_id, current_user.id
@@ -1115,9 +1508,10 @@ class Mutation:
         except Exception as e:
             raise Exception(str(e))
         finally:
-            db.close()
+            db.rollback()
     
     @strawberry.mutation
+    @nao_bloqueante
     def marcar_reserva_como_vista(
         self,
         info,
@@ -1129,7 +1523,7 @@ class Mutation:
         """
         current_user = get_current_user_from_context(info)
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             resultado = ReservaParticipanteController.marcar_como_visto(
                 db, reserva_id, current_user.id
@@ -1140,51 +1534,70 @@ class Mutation:
         except Exception as e:
             raise Exception(str(e))
         finally:
-            db.close()
-    
+            db.rollback()
+
+    @strawberry.mutation
+    @nao_bloqueante
+    def marcar_todas_como_notificadas(self, info) -> int:
+        """Marca todas as reservas do usuário atual como notificadas. Retorna quantas foram marcadas."""
+        current_user = get_current_user_from_context(info)
+
+        db = obter_db(info)
+        try:
+            return ReservaParticipanteController.marcar_todas_como_notificadas(db, current_user.id)
+        except Exception as e:
+            raise Exception(str(e))
+        finally:
+            db.rollback()
+
+    @strawberry.mutation
+    @nao_bloqueante
+    def marcar_todas_como_vistas(self, info) -> int:
+        """
+        Marca todas as reservas do usuário atual como vistas (botão "marcar todas como lidas"
+        do sino). Retorna quantas foram marcadas.
+        """
+        current_user = get_current_user_from_context(info)
+
+        db = obter_db(info)
+        try:
+            return ReservaParticipanteController.marcar_todas_como_vistas(db, current_user.id)
+        except Exception as e:
+            raise Exception(str(e))
+        finally:
+            db.rollback()
+
     @strawberry.mutation
-    def criar_usuario_admin(self, info, usuario: UsuarioAdminInput) -> UsuarioType:
+    async def criar_usuario_admin(self, info, usuario: UsuarioAdminInput) -> UsuarioType:
         """
         Cria um novo usuário (apenas para administradores).
         Permite definir se o usuário será admin ou não.
         """
-        current_user = get_current_user_from_context(info)
+        current_user = await executar_db(info.context, get_current_user_from_context, info)
         if not current_user.admin:
             raise Exception("Apenas administradores podem criar usuários")
         
-        db = SessionLocal()
-        try:
-            # Valida tamanho da senha
-            if len(usuario.password.encode('utf-8')) > 72:
-                raise Exception("A senha não pode ter mais de 72 caracteres")
-            
-            # Verifica se username já existe
-            existing_user = db.query(Usuario).filter(Usuario.username == usuario.username).first()
-            if existing_user:
-                raise Exception("Username já está em uso")
-            
-            # Verifica se email já existe
-            existing_email = db.query(Usuario).filter(Usuario.email == usuario.email).first()
-            if existing_email:
-                raise Exception("Email já está em uso")
-            
-            novo_usuario = AuthController.criar_usuario(
-                db, usuario.username, usuario.email, usuario.password, 
-                nome=usuario.nome, admin=usuario.admin
-            )
-            return UsuarioType(
-                id=novo_usuario.id,
-                nome=novo_usuario.nome,
-                username=novo_usuario.username,
-                email=novo_usuario.email,
-                admin=novo_usuario.admin,
-                created_at=novo_usuario.created_at
-            )
-        finally:
-            db.close()
+        await executar_db(
+            info.context, verificar_username_e_email_livres,
+            obter_db(info), usuario.username, usuario.email
+        )
+        hashed_password = await gerar_hash_senha(usuario.password)
+        
+        def criar() -> UsuarioType:
+            db = obter_db(info)
+            try:
+                novo_usuario = AuthController.criar_usuario(
+                    db, usuario.username, usuario.email, None,
+                    nome=usuario.nome, admin=usuario.admin, hashed_password=hashed_password
+                )
+                return criar_usuario_type(novo_usuario)
+            finally:
+                db.rollback()
+        
+        return await executar_db(info.context, criar)
     
     @strawberry.mutation
-    def atualizar_usuario_admin(
+    async def atualizar_usuario_admin(
         self,
         info,
         usuario_id: int,
@@ -1194,37 +1607,35 @@ class Mutation:
         Atualiza um usuário (apenas para administradores).
         Permite atualizar nome, email, senha e status de admin.
         """
-        current_user = get_current_user_from_context(info)
+        current_user = await executar_db(info.context, get_current_user_from_context, info)
         if not current_user.admin:
             raise Exception("Apenas administradores podem atualizar usuários")
         
-        db = SessionLocal()
-        try:
-            usuario_atualizado = AuthController.atualizar_usuario_admin(
-                db,
-                usuario_id,
-                nome=usuario.nome,
-                email=usuario.email,
-                password=usuario.password,
-                admin=usuario.admin
-            )
-            if not usuario_atualizado:
-                raise Exception("Usuário não encontrado")
-            
-            return UsuarioType(
-                id=usuario_atualizado.id,
-                nome=usuario_atualizado.nome,
-                username=usuario_atualizado.username,
-                email=usuario_atualizado.email,
-                admin=usuario_atualizado.admin,
-                created_at=usuario_atualizado.created_at
-            )
-        except ValueError as e:
-            raise Exception(str(e))
-        finally:
-            db.close()
+        hashed_password = await gerar_hash_senha(usuario.password)
+        
+        def atualizar() -> UsuarioType:
+            db = obter_db(info)
+            try:
+                usuario_atualizado = AuthController.atualizar_usuario_admin(
+                    db,
+                    usuario_id,
+                    nome=usuario.nome,
+                    email=usuario.email,
+                    admin=usuario.admin,
+                    hashed_password=hashed_password
+                )
+                if not usuario_atualizado:
+                    raise Exception("Usuário não encontrado")
+                return criar_usuario_type(usuario_atualizado)
+            except ValueError as e:
+                raise Exception(str(e))
+            finally:
+                db.rollback()
+        
+        return await executar_db(info.context, atualizar)
     
     @strawberry.mutation
+    @nao_bloqueante
     def deletar_usuario(self, info, usuario_id: int) -> bool:
         """
         Deleta um usuário (apenas para administradores).
@@ -1233,7 +1644,7 @@ class Mutation:
         if not current_user.admin:
             raise Exception("Apenas administradores podem deletar usuários")
         
-        db = SessionLocal()
+        db = obter_db(info)
         try:
             resultado = AuthController.deletar_usuario(db, usuario_id)
             if not resultado:
@@ -1242,8 +1653,112 @@ class Mutation:
         except Exception as e:
             raise Exception(str(e))
         finally:
-            db.close()
+            db.rollback()
+
+
+async def aguardar_eventos_do_usuario(
+    info,
+    usuario_id: int,
+    emitir_inicial: bool = False
+) -> AsyncGenerator[Optional[dict], None]:
+    """
+    Eventos de participação do usuário publicados no barramento de notificações.
+    Com emitir_inicial, emite None logo após assinar o canal (para enviar o estado atual
+    sem perder eventos publicados entre a leitura e a assinatura).
+    Antes de esperar cada evento encerra a transação da sessão da conexão, para que uma
+    subscription ociosa não segure uma conexão do pool, e renova os DataLoaders, para que
+    cada evento seja resolvido com dados atuais.
+    """
+    db = obter_db(info)
+    fila = barramento_notificacoes.assinar(canal_usuario(usuario_id))
+    try:
+        if emitir_inicial:
+            yield None
+        while True:
+            await executar_db(info.context, db.rollback)
+            info.context["loaders"] = Loaders(info.context)
+            yield await fila.get()
+    finally:
+        barramento_notificacoes.cancelar(canal_usuario(usuario_id), fila)
+
+
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def novas_reservas_convidadas(self, info) -> AsyncGenerator[ReservaParticipanteType, None]:
+        """
+        Emite cada novo convite do usuário atual para uma reserva, no momento em que é criado.
+        Substitui o polling de minhasReservasConvidadas.
+        """
+        current_user = await executar_db(info.context, get_current_user_from_context, info)
+        usuario_id = current_user.id
+        
+        def carregar_convite(reserva_id: int) -> Optional[ReservaParticipanteType]:
+            participante = ReservaParticipanteController.obter_participante(
+                obter_db(info), reserva_id, usuario_id
+            )
+            return criar_participante_type(participante) if participante else None
+        
+        async for evento in aguardar_eventos_do_usuario(info, usuario_id):
+            if evento["tipo"] != "convite":
+                continue
+            convite = await executar_db(info.context, carregar_convite, evento["reserva_id"])
+            if convite is not None:
+                yield convite
+    
+    @strawberry.subscription
+    async def contador_nao_vistas(self, info) -> AsyncGenerator[int, None]:
+        """
+        Número de reservas não vistas do usuário atual: o valor atual ao assinar e um novo
+        valor a cada convite, remoção ou reserva marcada como vista.
+        Substitui o polling de contarReservasNaoVistas.
+        """
+        current_user = await executar_db(info.context, get_current_user_from_context, info)
+        usuario_id = current_user.id
+        
+        def contar() -> int:
+            return ReservaParticipanteController.contar_reservas_nao_vistas(obter_db(info), usuario_id)
+        
+        async for _evento in aguardar_eventos_do_usuario(info, usuario_id, emitir_inicial=True):
+            yield await executar_db(info.context, contar)
+
+
+def erro_consulta_nao_permitida() -> GraphQLError:
+    """Erro devolvido para operações fora da lista de consultas permitidas."""
+    return GraphQLError("Consulta não permitida", extensions={"code": "PERSISTED_QUERY_NOT_ALLOWED"})
+
+
+class Schema(strawberry.Schema):
+    """
+    Schema que também valida os documentos de subscription.
+    O Strawberry (0.212) executa subscriptions sem a etapa de validação das queries e
+    mutations, o que aceitaria campos inexistentes ou argumentos inválidos.
+    No modo somente consultas permitidas, também rejeita as operações recebidas pelo
+    WebSocket, que não passam pelo parser HTTP de GraphQLRouterConsultasPersistidas.
+    """
+
+    async def execute(self, query: Optional[str], *args, **kwargs) -> ExecutionResult:
+        if query and not consultas_persistidas.permitida(query):
+            return ExecutionResult(data=None, errors=[erro_consulta_nao_permitida()])
+        return await super().execute(query, *args, **kwargs)
+
+    async def subscribe(self, query: str, *args, **kwargs):
+        if not consultas_persistidas.permitida(query):
+            return GraphQLExecutionResult(data=None, errors=[erro_consulta_nao_permitida()])
+        try:
+            documento = parse(query)
+        except GraphQLError as e:
+            return GraphQLExecutionResult(data=None, errors=[e])
+        erros = validate(self._schema, documento)
+        if erros:
+            return GraphQLExecutionResult(data=None, errors=erros)
+        return await super().subscribe(query, *args, **kwargs)
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=[CacheDocumentos, LimiteCustoConsulta, TransacaoSomenteLeitura]
+)
 
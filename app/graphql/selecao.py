@@ -0,0 +1,94 @@
+import dataclasses
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+from strawberry.types.nodes import FragmentSpread, InlineFragment
+from strawberry.utils.str_converters import to_snake_case
+
+
+def _coletar_campos(selecoes: Iterable, caminho: Sequence[str], nomes: Set[str]) -> None:
+    for selecao in selecoes:
+        # Fragmentos (...on Tipo / ...NomeDoFragmento) contribuem com os campos que contêm
+        if isinstance(selecao, (FragmentSpread, InlineFragment)):
+            _coletar_campos(selecao.selections, caminho, nomes)
+        elif caminho:
+            if selecao.name == caminho[0]:
+                _coletar_campos(selecao.selections, caminho[1:], nomes)
+        else:
+            nomes.add(to_snake_case(selecao.name))
+
+
+def campos_selecionados(info, caminho: Sequence[str] = ()) -> Set[str]:
+    """
+    Nomes (em snake_case) dos campos pedidos pelo cliente no campo atual.
+    `caminho` desce por campos intermediários, ex: ("edges", "node") em uma conexão
+    ou ("reserva",) no histórico.
+    """
+    nomes: Set[str] = set()
+    for campo in info.selected_fields:
+        _coletar_campos(campo.selections, caminho, nomes)
+    return nomes
+
+
+def colunas_selecionadas(
+    info,
+    modelo,
+    caminho: Sequence[str] = (),
+    obrigatorios: Sequence[str] = ()
+) -> Tuple[str, ...]:
+    """
+    Nomes das colunas do modelo pedidas pelo cliente, mais a chave primária e os atributos
+    em `obrigatorios` (chaves estrangeiras usadas pelos DataLoaders, chaves de ordenação
+    dos cursores etc.), na ordem em que são declaradas no modelo.
+    """
+    colunas = inspect(modelo).column_attrs.keys()
+    pedidos = campos_selecionados(info, caminho)
+    chaves = [coluna.key for coluna in inspect(modelo).primary_key]
+    return tuple(nome for nome in colunas if nome in pedidos or nome in obrigatorios or nome in chaves)
+
+
+def opcoes_de_carregamento(
+    info,
+    modelo,
+    caminho: Sequence[str] = (),
+    obrigatorios: Sequence[str] = ()
+) -> List:
+    """
+    Converte a seleção GraphQL em opções de carregamento para as consultas dos controllers:
+    um load_only apenas com as colunas de colunas_selecionadas().
+
+    Relacionamentos não geram joinedload: campos como responsavel, salaRel e participantes
+    são resolvidos em lote pelos DataLoaders do request (ver app/graphql/loaders.py).
+    """
+    nomes = colunas_selecionadas(info, modelo, caminho, obrigatorios)
+    return [load_only(*[getattr(modelo, nome) for nome in nomes])]
+
+
+@lru_cache(maxsize=None)
+def mapeador_de_linhas(tipo, colunas: Tuple[str, ...]) -> Callable:
+    """
+    Função que converte uma linha de uma consulta Core (com as `colunas`, nessa ordem)
+    diretamente em uma instância do tipo Strawberry `tipo`, sem passar por objetos ORM.
+    Gerada uma única vez por tipo e conjunto de colunas; os campos do tipo que não
+    estão em `colunas` ficam None (o cliente não os pediu).
+    """
+    campos = {campo.name for campo in dataclasses.fields(tipo) if campo.init}
+    posicoes = tuple((nome, i) for i, nome in enumerate(colunas) if nome in campos)
+    ausentes = {campo: None for campo in campos if campo not in colunas}
+
+    def mapear(linha):
+        return tipo(**ausentes, **{nome: linha[i] for nome, i in posicoes})
+
+    return mapear
+
+
+def valores_carregados(obj) -> dict:
+    """
+    Valores já carregados de um objeto ORM, sem acessar o banco: colunas deixadas de
+    fora por load_only ou expiradas por um commit ficam ausentes do dicionário retornado.
+    Quem faz commit e depois converte o objeto deve chamar db.refresh antes (os
+    controllers já fazem isso), dentro da mesma chamada a executar_db.
+    """
+    return inspect(obj).dict
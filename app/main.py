@@ -1,9 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from strawberry.fastapi import GraphQLRouter
 import os
 
 from app.graphql.schema import schema
+from app.graphql.context import get_context
+from app.graphql.consultas_persistidas import GraphQLRouterConsultasPersistidas
+from app.notificacoes import iniciar_ouvinte_postgres, parar_ouvinte_postgres
+from app.routers import timeline
+from app.senhas import pool_senhas
 
 app = FastAPI(
     title="Sistema de Reservas API",
@@ -60,10 +64,30 @@ else:
     )
     print(f"[CORS] Modo: PRODUÇÃO - {len(allowed_origins)} origens explícitas")
 
-# Rota GraphQL com GraphiQL
-graphql_app = GraphQLRouter(schema, graphiql=True)
+# Rota GraphQL com GraphiQL e consultas persistidas (APQ)
+graphql_app = GraphQLRouterConsultasPersistidas(schema, graphiql=True, context_getter=get_context)
 app.include_router(graphql_app, prefix="/graphql")
 
+# Timeline das salas por Server-Sent Events (painéis na porta das salas)
+app.include_router(timeline.router)
+
+
+@app.on_event("startup")
+def iniciar_notificacoes():
+    """Com NOTIFICACOES_POSTGRES=true, repassa aos clientes deste worker os eventos dos demais."""
+    iniciar_ouvinte_postgres()
+
+
+@app.on_event("shutdown")
+def parar_notificacoes():
+    parar_ouvinte_postgres()
+
+
+@app.on_event("shutdown")
+def encerrar_pool_senhas():
+    """Encerra os processos de hash de senhas (bcrypt)."""
+    pool_senhas.encerrar()
+
 
 @app.get("/")
 def root():
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, CheckConstraint, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, CheckConstraint, Boolean, Computed, UniqueConstraint, Index, text
+from sqlalchemy.dialects.postgresql import TSRANGE, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -14,6 +15,8 @@ class Usuario(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     admin = Column(Boolean, default=False, nullable=False)
+    # Incrementada para invalidar os tokens já emitidos (claim "ver" do token)
+    token_versao = Column(Integer, default=0, server_default='0', nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     reservas = relationship("Reserva", back_populates="responsavel")
@@ -51,6 +54,8 @@ class Reserva(Base):
     cafe_quantidade = Column(Integer, nullable=True)
     cafe_descricao = Column(Text, nullable=True)
     link_meet = Column(String, nullable=True)  # Link da sala de meet (URL)
+    # Intervalo [inicio, fim) gerado pelo banco, usado pela constraint de exclusão
+    periodo = Column(TSRANGE, Computed("tsrange(data_hora_inicio, data_hora_fim, '[)')", persisted=True))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -60,6 +65,17 @@ class Reserva(Base):
 
     __table_args__ = (
         CheckConstraint('data_hora_fim > data_hora_inicio', name='check_data_hora_valida'),
+        # Impede duas reservas sobrepostas na mesma sala (índice GiST, requer btree_gist)
+        ExcludeConstraint(
+            ('sala_id', '='),
+            ('periodo', '&&'),
+            name='excl_reservas_sala_periodo',
+            using='gist'
+        ),
+        # Paginação por cursor ordenada por (data_hora_inicio, id)
+        Index('ix_reservas_data_hora_inicio_id', 'data_hora_inicio', 'id'),
+        # Histórico do usuário como responsável, ordenado por data
+        Index('ix_reservas_responsavel_inicio', 'responsavel_id', 'data_hora_inicio'),
     )
 
 
@@ -77,7 +93,47 @@ class ReservaParticipante(Base):
     usuario = relationship("Usuario", back_populates="reservas_participantes")
 
     __table_args__ = (
-        # Garante que um usuário não seja adicionado duas vezes na mesma reserva
         CheckConstraint('reserva_id IS NOT NULL AND usuario_id IS NOT NULL', name='check_reserva_usuario'),
+        # Garante que um usuário não seja adicionado duas vezes na mesma reserva
+        UniqueConstraint('reserva_id', 'usuario_id', name='uq_reserva_usuario'),
+        # Paginação por cursor dos convites de um usuário, ordenada por (created_at, id)
+        Index('ix_reserva_participantes_usuario_created_at', 'usuario_id', 'created_at', 'id'),
+        # Caixa de entrada: apenas os convites ainda não vistos / não notificados de cada usuário
+        Index(
+            'ix_reserva_participantes_nao_vistas', 'usuario_id', 'created_at', 'id',
+            postgresql_where=text('visto = false')
+        ),
+        Index(
+            'ix_reserva_participantes_nao_notificadas', 'usuario_id', 'created_at', 'id',
+            postgresql_where=text('notificado = false')
+        ),
     )
 
+
+
+class ContadorNotificacao(Base):
+    """
+    Número de participações não vistas de cada usuário.
+    Mantido pelo trigger trg_reserva_participantes_contador (ver migração
+    add_contadores_notificacoes) na mesma transação das alterações em reserva_participantes;
+    reconstruído por reconciliar_contadores.py.
+    """
+    __tablename__ = "contadores_notificacoes"
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True)
+    nao_vistas = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class RefreshToken(Base):
+    """
+    Refresh token emitido no login e trocado a cada renovação (renovarToken).
+    Guarda apenas o HMAC-SHA256 do token; um token já trocado que volte a ser usado
+    indica vazamento e revoga todos os refresh tokens do usuário.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    expira_em = Column(DateTime, nullable=False)
+    revogado_em = Column(DateTime, nullable=True)
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import select
+import threading
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import event, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+# Canal do LISTEN/NOTIFY usado para repassar eventos entre workers
+CANAL_POSTGRES = "reservas_notificacoes"
+
+# Chave em Session.info com os eventos aguardando o commit da transação
+_EVENTOS_PENDENTES = "eventos_pendentes"
+
+
+def canal_usuario(usuario_id: int) -> str:
+    """Canal com os eventos de participação de um usuário (convites, vistos, remoções)."""
+    return f"usuario:{usuario_id}"
+
+
+def canal_sala(sala_id: int) -> str:
+    """Canal com as reservas criadas, alteradas e removidas de uma sala (timeline)."""
+    return f"sala:{sala_id}"
+
+
+def _entregar(fila: asyncio.Queue, evento: dict) -> None:
+    """Coloca o evento na fila do assinante; se ela estiver cheia, descarta o evento mais antigo."""
+    if fila.full():
+        fila.get_nowait()
+    fila.put_nowait(evento)
+
+
+class BarramentoNotificacoes:
+    """
+    Pub/sub em memória do worker, por canal.
+    Cada assinante (uma subscription GraphQL ou a timeline de uma sala) recebe uma fila
+    asyncio do seu event loop; publicar() pode ser chamado de qualquer thread (os
+    controllers rodam no threadpool), e a entrega é agendada no loop do assinante.
+    """
+
+    def __init__(self, max_eventos_por_assinante: int):
+        self.max_eventos_por_assinante = max_eventos_por_assinante
+        self._assinantes: Dict[str, Dict[asyncio.Queue, asyncio.AbstractEventLoop]] = {}
+        self._lock = threading.Lock()
+
+    def assinar(self, canal: str) -> asyncio.Queue:
+        """Registra um assinante do canal e retorna a fila onde os eventos chegam."""
+        fila: asyncio.Queue = asyncio.Queue(maxsize=self.max_eventos_por_assinante)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._assinantes.setdefault(canal, {})[fila] = loop
+        return fila
+
+    def cancelar(self, canal: str, fila: asyncio.Queue) -> None:
+        """Remove o assinante do canal."""
+        with self._lock:
+            assinantes = self._assinantes.get(canal)
+            if assinantes is None:
+                return
+            assinantes.pop(fila, None)
+            if not assinantes:
+                del self._assinantes[canal]
+
+    def publicar(self, canal: str, evento: dict) -> None:
+        """Entrega o evento a todos os assinantes do canal neste worker."""
+        with self._lock:
+            destinos = list(self._assinantes.get(canal, {}).items())
+        for fila, loop in destinos:
+            try:
+                loop.call_soon_threadsafe(_entregar, fila, evento)
+            except RuntimeError:
+                # Loop já encerrado: a assinatura será cancelada pelo próprio assinante
+                pass
+
+
+barramento_notificacoes = BarramentoNotificacoes(
+    max_eventos_por_assinante=settings.notificacoes_max_eventos_por_assinante
+)
+
+
+def notificar(db: Session, canal: str, evento: dict) -> None:
+    """
+    Agenda um evento para ser publicado quando a transação atual de `db` for confirmada
+    (e descartado se ela for revertida).
+    Com NOTIFICACOES_POSTGRES=true o evento é enviado por NOTIFY na própria transação;
+    o PostgreSQL só o entrega no commit, a todos os workers (incluindo este), pelo OuvintePostgres.
+    """
+    if settings.notificacoes_postgres:
+        payload = json.dumps({"canal": canal, "evento": evento})
+        db.execute(func.pg_notify(CANAL_POSTGRES, payload).select())
+    else:
+        db.info.setdefault(_EVENTOS_PENDENTES, []).append((canal, evento))
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_eventos_pendentes(session):
+    for canal, evento in session.info.pop(_EVENTOS_PENDENTES, []):
+        barramento_notificacoes.publicar(canal, evento)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_eventos_pendentes(session):
+    session.info.pop(_EVENTOS_PENDENTES, None)
+
+
+class OuvintePostgres(threading.Thread):
+    """
+    Thread que faz LISTEN no canal de notificações e repassa cada NOTIFY ao barramento local.
+    Usa uma conexão própria (fora do pool) em autocommit e reconecta se ela cair.
+    """
+
+    def __init__(self, database_url: str, intervalo_segundos: float = 5.0):
+        super().__init__(name="ouvinte-notificacoes", daemon=True)
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.intervalo_segundos = intervalo_segundos
+        self._parar = threading.Event()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+    def run(self) -> None:
+        while not self._parar.is_set():
+            conexao = None
+            try:
+                conexao = psycopg2.connect(self.dsn)
+                conexao.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conexao.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CANAL_POSTGRES}")
+                while not self._parar.is_set():
+                    if select.select([conexao], [], [], self.intervalo_segundos) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    while conexao.notifies:
+                        notificacao = conexao.notifies.pop(0)
+                        dados = json.loads(notificacao.payload)
+                        barramento_notificacoes.publicar(dados["canal"], dados["evento"])
+            except (psycopg2.Error, OSError) as e:
+                print(f"[NOTIFICACOES] Conexão LISTEN perdida: {e}; reconectando")
+                self._parar.wait(self.intervalo_segundos)
+            finally:
+                if conexao is not None:
+                    conexao.close()
+
+
+ouvinte_postgres: Optional[OuvintePostgres] = None
+
+
+def iniciar_ouvinte_postgres() -> None:
+    """Inicia o repasse de NOTIFY entre workers, se NOTIFICACOES_POSTGRES=true."""
+    global ouvinte_postgres
+    if settings.notificacoes_postgres and ouvinte_postgres is None:
+        ouvinte_postgres = OuvintePostgres(settings.database_url)
+        ouvinte_postgres.start()
+
+
+def parar_ouvinte_postgres() -> None:
+    global ouvinte_postgres
+    if ouvinte_postgres is not None:
+        ouvinte_postgres.parar()
+        ouvinte_postgres = None
@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+# Maior número de itens aceito em uma página (argumento "first")
+MAXIMO_ITENS_POR_PAGINA = 100
+
+
+def codificar_cursor(*valores: Any) -> str:
+    """Codifica a chave de ordenação de um registro (ex: data_hora_inicio, id) em um cursor opaco."""
+    carga = [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(carga, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str, *tipos: type) -> Tuple:
+    """
+    Decodifica um cursor gerado por codificar_cursor, convertendo cada valor para o tipo esperado.
+    Lança ValueError se o cursor for inválido.
+    """
+    try:
+        carga = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(carga, list) or len(carga) != len(tipos):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(valor) if tipo is datetime else tipo(valor)
+            for tipo, valor in zip(tipos, carga)
+        )
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        raise ValueError("Cursor inválido")
+
+
+def validar_tamanho_pagina(first: int) -> None:
+    """Valida o número de itens pedidos em uma página."""
+    if first < 1 or first > MAXIMO_ITENS_POR_PAGINA:
+        raise ValueError(f"O argumento first deve estar entre 1 e {MAXIMO_ITENS_POR_PAGINA}")
@@ -0,0 +1,246 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import autenticar_token
+from app.config import settings
+from app.controllers.reserva_controller import ReservaController, dados_timeline
+from app.controllers.sala_controller import SalaController
+from app.database import SessionLocal
+from app.notificacoes import barramento_notificacoes, canal_sala
+
+router = APIRouter()
+
+Mensagem = Tuple[str, dict]
+
+
+def _carregar_reservas_do_dia(sala_id: int, dia: date) -> Dict[int, dict]:
+    db = SessionLocal()
+    try:
+        return {
+            r.id: dados_timeline(r)
+            for r in ReservaController.listar_timeline_do_dia(db, sala_id, dia)
+        }
+    finally:
+        db.close()
+
+
+class TransmissorTimelineSala:
+    """
+    Timeline do dia de uma sala, compartilhada por todos os clientes SSE conectados a ela
+    neste worker.
+    Carrega as reservas do dia uma única vez e as mantém atualizadas com os eventos do
+    canal da sala (publicados por ReservaController.criar/atualizar/deletar); cada cliente
+    recebe o estado inicial e depois apenas as alterações, sem novas consultas ao banco.
+    Na virada do dia as reservas são recarregadas e um novo estado é enviado a todos.
+    """
+
+    def __init__(self, sala_id: int):
+        self.sala_id = sala_id
+        self.dia: Optional[date] = None
+        self.reservas: Dict[int, dict] = {}
+        self.clientes: Set[asyncio.Queue] = set()
+        # Conexões esperando a primeira carga (ainda fora de self.clientes)
+        self._aguardando = 0
+        self._carregada = asyncio.Event()
+        self._erro: Optional[Exception] = None
+        self._tarefa: Optional[asyncio.Task] = None
+
+    def _estado(self) -> dict:
+        return {
+            "sala_id": self.sala_id,
+            "dia": self.dia.isoformat(),
+            "reservas": sorted(self.reservas.values(), key=lambda r: r["data_hora_inicio"]),
+        }
+
+    def _enviar(self, fila: asyncio.Queue, mensagem: Mensagem) -> None:
+        # Cliente lento: em vez de perder alterações, descarta a fila e reenvia o estado completo
+        if fila.full():
+            while not fila.empty():
+                fila.get_nowait()
+            mensagem = ("estado", self._estado())
+        fila.put_nowait(mensagem)
+
+    def _transmitir(self, mensagem: Mensagem) -> None:
+        for fila in self.clientes:
+            self._enviar(fila, mensagem)
+
+    def _toca_o_dia(self, reserva: dict) -> bool:
+        inicio_dia = datetime.combine(self.dia, datetime.min.time())
+        fim_dia = inicio_dia + timedelta(days=1)
+        return (
+            datetime.fromisoformat(reserva["data_hora_inicio"]) < fim_dia
+            and datetime.fromisoformat(reserva["data_hora_fim"]) > inicio_dia
+        )
+
+    def _aplicar(self, evento: dict) -> None:
+        reserva = evento["reserva"]
+        estava_na_timeline = reserva["id"] in self.reservas
+        if evento["tipo"] != "removida" and reserva["sala_id"] == self.sala_id and self._toca_o_dia(reserva):
+            self.reservas[reserva["id"]] = reserva
+            self._transmitir(("atualizada" if estava_na_timeline else "criada", reserva))
+        elif estava_na_timeline:
+            # Removida, movida para outra sala ou para outro dia
+            del self.reservas[reserva["id"]]
+            self._transmitir(("removida", {"id": reserva["id"]}))
+
+    async def _carregar(self) -> None:
+        self.dia = datetime.utcnow().date()
+        self.reservas = await run_in_threadpool(_carregar_reservas_do_dia, self.sala_id, self.dia)
+
+    async def _executar(self) -> None:
+        # Assina o canal antes de carregar o dia: eventos publicados durante a consulta
+        # são reaplicados depois (criar/atualizar/remover são idempotentes por id)
+        eventos = barramento_notificacoes.assinar(canal_sala(self.sala_id))
+        try:
+            try:
+                await self._carregar()
+            except Exception as e:
+                self._erro = e
+                return
+            finally:
+                self._carregada.set()
+            while True:
+                proximo_dia = datetime.combine(self.dia + timedelta(days=1), datetime.min.time())
+                try:
+                    evento = await asyncio.wait_for(
+                        eventos.get(), timeout=(proximo_dia - datetime.utcnow()).total_seconds()
+                    )
+                except asyncio.TimeoutError:
+                    try:
+                        await self._carregar()
+                    except Exception as e:
+                        # Sem o novo dia, a timeline não tem o que enviar: encerra as conexões
+                        # (o EventSource reconecta) e a próxima conexão monta outra timeline
+                        self._erro = e
+                        self._encerrar()
+                        return
+                    self._transmitir(("estado", self._estado()))
+                    continue
+                self._aplicar(evento)
+        finally:
+            barramento_notificacoes.cancelar(canal_sala(self.sala_id), eventos)
+
+    async def conectar(self) -> asyncio.Queue:
+        """
+        Registra um cliente e retorna a fila com o estado do dia seguido das alterações.
+        A fila recebe None se a timeline for encerrada (falha ao recarregar o dia).
+        """
+        fila: asyncio.Queue = asyncio.Queue(maxsize=settings.notificacoes_max_eventos_por_assinante)
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._executar())
+        self._aguardando += 1
+        try:
+            await self._carregada.wait()
+            if self._erro is not None:
+                raise self._erro
+        except BaseException:
+            self._aguardando -= 1
+            self._encerrar_se_ociosa()
+            raise
+        self._aguardando -= 1
+        # Só entra em self.clientes com a timeline carregada, e sem await até o estado:
+        # nenhuma alteração pode chegar à fila antes do estado em que ela se baseia
+        self.clientes.add(fila)
+        self._enviar(fila, ("estado", self._estado()))
+        return fila
+
+    def _encerrar(self) -> None:
+        """Retira a timeline de `transmissores` e fecha a fila de todos os clientes."""
+        if transmissores.get(self.sala_id) is self:
+            del transmissores[self.sala_id]
+        for fila in self.clientes:
+            while not fila.empty():
+                fila.get_nowait()
+            fila.put_nowait(None)
+
+    def desconectar(self, fila: asyncio.Queue) -> None:
+        """Remove o cliente; sem clientes, encerra a timeline da sala."""
+        self.clientes.discard(fila)
+        self._encerrar_se_ociosa()
+
+    def _encerrar_se_ociosa(self) -> None:
+        # Conexões ainda esperando a carga também mantêm a timeline ativa
+        if not self.clientes and not self._aguardando:
+            if self._tarefa is not None:
+                self._tarefa.cancel()
+            if transmissores.get(self.sala_id) is self:
+                del transmissores[self.sala_id]
+
+
+# Timelines ativas do worker, por sala (acessadas apenas pelo event loop)
+transmissores: Dict[int, TransmissorTimelineSala] = {}
+
+
+def _autenticar(token: Optional[str], sala_id: int) -> None:
+    """Valida o token (ver autenticar_token) e a existência da sala."""
+    credenciais_invalidas = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Não foi possível validar as credenciais",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if not token:
+        raise credenciais_invalidas
+
+    db = SessionLocal()
+    try:
+        try:
+            autenticar_token(db, token)
+        except Exception:
+            raise credenciais_invalidas
+        if not SalaController.obter_por_id(db, sala_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sala não encontrada")
+    finally:
+        db.close()
+
+
+def _formatar(evento: str, dados: dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados)}\n\n"
+
+
+@router.get("/salas/{sala_id}/timeline/stream")
+async def stream_timeline_sala(sala_id: int, request: Request, token: Optional[str] = None):
+    """
+    Timeline do dia da sala por Server-Sent Events (para os painéis na porta das salas).
+    Envia o evento "estado" com as reservas do dia e depois "criada", "atualizada" ou
+    "removida" a cada alteração. Como EventSource não envia headers, o token pode ser
+    passado em ?token=.
+    """
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        token = auth_header.replace("Bearer ", "")
+    await run_in_threadpool(_autenticar, token, sala_id)
+
+    transmissor = transmissores.get(sala_id)
+    if transmissor is None:
+        transmissor = transmissores[sala_id] = TransmissorTimelineSala(sala_id)
+    fila = await transmissor.conectar()
+
+    async def eventos():
+        try:
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(
+                        fila.get(), timeout=settings.timeline_keepalive_segundos
+                    )
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão aberta em proxies com timeout de inatividade
+                    yield ": keepalive\n\n"
+                    continue
+                if mensagem is None:
+                    # Timeline encerrada (ver TransmissorTimelineSala._encerrar)
+                    return
+                yield _formatar(*mensagem)
+        finally:
+            transmissor.desconectar(fila)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,80 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.auth import get_password_hash, verify_password
+from app.config import settings
+from app.exceptions import SobrecargaSenhasException
+
+
+class PoolSenhas:
+    """
+    Processos dedicados ao bcrypt (cerca de 200 ms de CPU por hash ou verificação).
+    Rodando fora do processo do worker, o hash não bloqueia o event loop nem disputa o GIL
+    com as demais requisições. Quando há mais de `fila_maxima` operações pendentes no
+    worker, novas operações são recusadas com SobrecargaSenhasException em vez de esperar
+    (um pico de logins não deve atrasar as consultas de disponibilidade).
+    O pool só é criado no primeiro uso.
+    """
+
+    def __init__(self, processos: int, fila_maxima: int):
+        self.processos = processos
+        self.fila_maxima = fila_maxima
+        self.pendentes = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _obter_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: o worker tem threads (threadpool, ouvinte de notificações), e fork
+                # copiaria travas e conexões abertas para os processos filhos
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processos,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    async def _executar(self, funcao, *args):
+        with self._lock:
+            if self.pendentes >= self.fila_maxima:
+                raise SobrecargaSenhasException(
+                    "Servidor sobrecarregado, tente novamente em instantes"
+                )
+            self.pendentes += 1
+        try:
+            pool = self._obter_pool()
+            return await asyncio.get_running_loop().run_in_executor(pool, funcao, *args)
+        except BrokenProcessPool:
+            # Um processo filho morreu: descarta o pool para que o próximo uso crie outro
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise
+        finally:
+            with self._lock:
+                self.pendentes -= 1
+
+    async def gerar_hash(self, password: str) -> str:
+        """Versão assíncrona de get_password_hash."""
+        return await self._executar(get_password_hash, password)
+
+    async def verificar(self, password: str, hashed_password: str) -> bool:
+        """Versão assíncrona de verify_password."""
+        return await self._executar(verify_password, password, hashed_password)
+
+    def encerrar(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+pool_senhas = PoolSenhas(
+    processos=settings.senhas_processos,
+    fila_maxima=settings.senhas_fila_maxima
+)
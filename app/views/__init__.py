@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from enum import Enum
 from typing import Optional
 
 
@@ -46,6 +47,12 @@ class ReservaCreate(ReservaBase):
     pass
 
 
+class FrequenciaRecorrencia(str, Enum):
+    DIARIA = "diaria"
+    SEMANAL = "semanal"
+    MENSAL = "mensal"
+
+
 class ReservaUpdate(BaseModel):
     local: Optional[str] = None
     sala: Optional[str] = None
@@ -97,6 +104,13 @@ class SalaResponse(SalaBase):
         from_attributes = True
 
 
+class StatusAdicaoParticipante(str, Enum):
+    ADICIONADO = "adicionado"
+    JA_PARTICIPANTE = "ja_participante"
+    USUARIO_NAO_ENCONTRADO = "usuario_nao_encontrado"
+    USUARIO_ADMIN = "usuario_admin"
+
+
 class ReservaParticipanteBase(BaseModel):
     reserva_id: int
     usuario_id: int
@@ -0,0 +1,33 @@
+"""
+Script para reconstruir os contadores de reservas não vistas.
+
+Os contadores (tabela contadores_notificacoes) são mantidos por trigger a cada alteração
+em reserva_participantes. Este script os recalcula a partir das participações e corrige
+os que divergirem (ex: após carga manual de dados com o trigger desabilitado).
+
+Uso:
+    python reconciliar_contadores.py
+"""
+import sys
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.controllers.reserva_participante_controller import ReservaParticipanteController
+
+
+def reconciliar_contadores():
+    """Recalcula os contadores de não vistas de todos os usuários."""
+    db: Session = SessionLocal()
+    try:
+        corrigidos = ReservaParticipanteController.reconciliar_contadores(db)
+        print(f"✅ Contadores reconciliados: {corrigidos} criado(s) ou corrigido(s).")
+        return True
+    except Exception as e:
+        print(f"Erro ao reconciliar contadores: {e}")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if reconciliar_contadores() else 1)
@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.cache import cache_disponibilidade
+from app.database import engine
+from app.models import Reserva, Sala, Usuario
+
+
+@pytest.fixture
+def db():
+    """
+    Sessão no banco de DATABASE_URL (com as migrações aplicadas) dentro de uma transação
+    desfeita ao final do teste; os commits dos controllers viram savepoints.
+    Pula o teste se o banco não estiver acessível.
+    """
+    try:
+        conexao = engine.connect()
+    except OperationalError:
+        pytest.skip("Banco de dados de DATABASE_URL indisponível")
+    transacao = conexao.begin()
+    sessao = Session(bind=conexao, join_transaction_mode="create_savepoint")
+    # O cache é por sala/dia e os ids das linhas desfeitas podem ser reutilizados
+    cache_disponibilidade.limpar()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+        transacao.rollback()
+        conexao.close()
+        cache_disponibilidade.limpar()
+
+
+@pytest.fixture
+def usuario(db) -> Usuario:
+    nome = f"teste_{uuid.uuid4().hex[:12]}"
+    usuario = Usuario(nome=nome, username=nome, email=f"{nome}@example.com", hashed_password="x")
+    db.add(usuario)
+    db.flush()
+    return usuario
+
+
+@pytest.fixture
+def criar_sala(db, usuario):
+    def criar() -> Sala:
+        sala = Sala(nome=f"Sala {uuid.uuid4().hex[:8]}", local="Teste", criador_id=usuario.id)
+        db.add(sala)
+        db.flush()
+        return sala
+    return criar
+
+
+@pytest.fixture
+def reservar(db, usuario):
+    """Insere uma reserva direto no banco (sem as notificações do controller)."""
+    def reservar(sala: Sala, inicio: datetime, fim: datetime) -> Reserva:
+        reserva = Reserva(sala_id=sala.id, data_hora_inicio=inicio, data_hora_fim=fim, responsavel_id=usuario.id)
+        db.add(reserva)
+        db.flush()
+        return reserva
+    return reservar
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+
+from app.controllers.reserva_controller import ReservaController
+
+
+def test_janela_com_fuso(db, criar_sala, reservar):
+    sala = criar_sala()
+    # Capacidade única para que só esta sala entre na busca
+    sala.capacidade = 10 ** 6
+    db.flush()
+    reservar(sala, datetime(2031, 3, 10, 12, 0), datetime(2031, 3, 10, 13, 0))
+    menos_3 = timezone(timedelta(hours=-3))
+
+    encontradas = ReservaController.buscar_salas_disponiveis(
+        db,
+        duracao_minutos=60,
+        janela_inicio=datetime(2031, 3, 10, 9, 0, tzinfo=menos_3),
+        janela_fim=datetime(2031, 3, 10, 12, 0, tzinfo=menos_3),
+        capacidade_minima=10 ** 6,
+        limite=1
+    )
+
+    # 09:00-12:00 em UTC-3 é 12:00-15:00 UTC; a reserva ocupa 12:00-13:00
+    assert [(s.id, inicio, fim) for s, inicio, fim in encontradas] == [
+        (sala.id, datetime(2031, 3, 10, 13, 0), datetime(2031, 3, 10, 14, 0))
+    ]
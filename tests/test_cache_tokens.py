@@ -0,0 +1,116 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app.auth import (
+    CacheTokens,
+    IdentidadeToken,
+    autenticar_token,
+    cache_tokens,
+    claims_do_usuario,
+    create_access_token,
+)
+from app.controllers.auth_controller import AuthController
+from app.models import Usuario
+
+
+def identidade(usuario_id: int) -> IdentidadeToken:
+    return IdentidadeToken(id=usuario_id, username=f"u{usuario_id}", admin=False, versao=0)
+
+
+@pytest.fixture(autouse=True)
+def limpar_cache_tokens():
+    cache_tokens.limpar()
+    yield
+    cache_tokens.limpar()
+
+
+# Cache (sem banco)
+
+def test_entrada_expirada_nao_e_servida():
+    cache = CacheTokens(max_entradas=10, revalidacao_segundos=60)
+    cache.registrar("t", identidade(1), expira_em=100, agora=50)
+
+    assert cache.obter("t", 99.9)[0] == identidade(1)
+    assert cache.obter("t", 100) is None
+    # A entrada expirada é descartada, não apenas escondida
+    assert cache.obter("t", 50) is None
+
+
+def test_cache_descarta_o_token_menos_usado():
+    cache = CacheTokens(max_entradas=2, revalidacao_segundos=60)
+    cache.registrar("a", identidade(1), 100, 0)
+    cache.registrar("b", identidade(2), 100, 0)
+    cache.obter("a", 1)
+    cache.registrar("c", identidade(3), 100, 0)
+
+    assert cache.obter("b", 1) is None
+    assert cache.obter("a", 1) is not None and cache.obter("c", 1) is not None
+
+
+def test_remover_usuario_descarta_so_os_tokens_dele():
+    cache = CacheTokens(max_entradas=10, revalidacao_segundos=60)
+    cache.registrar("a1", identidade(1), 100, 0)
+    cache.registrar("a2", identidade(1), 100, 0)
+    cache.registrar("b", identidade(2), 100, 0)
+
+    cache.remover_usuario(1)
+
+    assert cache.obter("a1", 1) is None and cache.obter("a2", 1) is None
+    assert cache.obter("b", 1) is not None
+
+
+def test_autenticar_nao_usa_entrada_expirada():
+    token = create_access_token({"sub": "u1", "uid": 1, "adm": False, "ver": 0}, timedelta(seconds=-1))
+    agora = time.time()
+    cache_tokens.registrar(token, identidade(1), expira_em=agora - 1, agora=agora - 2)
+
+    # Sem a entrada, o JWT é decodificado (e está expirado) antes de qualquer consulta ao banco
+    with pytest.raises(Exception, match="expirado"):
+        autenticar_token(None, token)
+
+
+# Com banco
+
+
+def test_token_em_cache_e_aceito(db, usuario):
+    token = create_access_token(claims_do_usuario(usuario))
+
+    assert autenticar_token(db, token).id == usuario.id
+    assert cache_tokens.obter(token, time.time()) is not None
+    assert autenticar_token(db, token).id == usuario.id
+
+
+def test_mudar_admin_rejeita_token_em_cache(db, usuario):
+    token = create_access_token(claims_do_usuario(usuario))
+    autenticar_token(db, token)
+
+    AuthController.atualizar_usuario_admin(db, usuario.id, admin=True)
+
+    assert cache_tokens.obter(token, time.time()) is None
+    with pytest.raises(Exception, match="revogado"):
+        autenticar_token(db, token)
+
+
+def test_deletar_usuario_rejeita_token_em_cache(db, usuario):
+    token = create_access_token(claims_do_usuario(usuario))
+    autenticar_token(db, token)
+
+    AuthController.deletar_usuario(db, usuario.id)
+
+    with pytest.raises(Exception, match="não encontrado"):
+        autenticar_token(db, token)
+
+
+def test_versao_alterada_em_outro_worker_e_conferida_na_revalidacao(db, usuario, monkeypatch):
+    token = create_access_token(claims_do_usuario(usuario))
+    autenticar_token(db, token)
+
+    # Outro worker incrementa a versão: o cache deste worker não é avisado
+    db.query(Usuario).filter(Usuario.id == usuario.id).update({Usuario.token_versao: Usuario.token_versao + 1})
+
+    assert autenticar_token(db, token).id == usuario.id  # ainda dentro da janela de revalidação
+    monkeypatch.setattr(cache_tokens, "revalidacao_segundos", 0)
+    with pytest.raises(Exception, match="revogado"):
+        autenticar_token(db, token)
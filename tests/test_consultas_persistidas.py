@@ -0,0 +1,115 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.graphql.consultas_persistidas import (
+    ArmazemConsultasPersistidas,
+    GraphQLRouterConsultasPersistidas,
+    calcular_hash,
+    consultas_persistidas,
+)
+from app.graphql.schema import schema
+
+QUERY = "query Teste { __typename }"
+MUTATION = "mutation Teste { __typename }"
+
+
+@pytest.fixture
+def cliente():
+    """Cliente do router de consultas persistidas sem o contexto com banco (__typename não o usa)."""
+    app = FastAPI()
+    app.include_router(GraphQLRouterConsultasPersistidas(schema), prefix="/graphql")
+    consultas_persistidas.limpar()
+    yield TestClient(app)
+    consultas_persistidas.limpar()
+
+
+@pytest.fixture
+def somente_permitidas():
+    permitidas, modo = consultas_persistidas.permitidas, consultas_persistidas.somente_permitidas
+    consultas_persistidas.permitidas = {calcular_hash(QUERY): QUERY}
+    consultas_persistidas.somente_permitidas = True
+    yield
+    consultas_persistidas.permitidas, consultas_persistidas.somente_permitidas = permitidas, modo
+
+
+def extensoes(query: str) -> dict:
+    return {"persistedQuery": {"version": 1, "sha256Hash": calcular_hash(query)}}
+
+
+def codigo_do_erro(resposta) -> str:
+    assert resposta.status_code == 200
+    return resposta.json()["errors"][0]["extensions"]["code"]
+
+
+def test_hash_desconhecido(cliente):
+    resposta = cliente.post("/graphql", json={"extensions": extensoes(QUERY)})
+    assert codigo_do_erro(resposta) == "PERSISTED_QUERY_NOT_FOUND"
+
+
+def test_registrar_e_reenviar_so_o_hash(cliente):
+    registro = cliente.post("/graphql", json={"query": QUERY, "extensions": extensoes(QUERY)})
+    assert registro.json()["data"] == {"__typename": "Query"}
+
+    por_post = cliente.post("/graphql", json={"extensions": extensoes(QUERY)})
+    por_get = cliente.get("/graphql", params={"extensions": json.dumps(extensoes(QUERY))})
+
+    assert por_post.json()["data"] == por_get.json()["data"] == {"__typename": "Query"}
+
+
+def test_hash_que_nao_confere_com_a_consulta(cliente):
+    resposta = cliente.post("/graphql", json={"query": QUERY, "extensions": extensoes("{ __typename }")})
+    assert resposta.status_code == 400
+    assert consultas_persistidas.obter(calcular_hash(QUERY)) is None
+
+
+def test_versao_de_consulta_persistida_desconhecida(cliente):
+    persistida = {"persistedQuery": {"version": 2, "sha256Hash": calcular_hash(QUERY)}}
+    assert cliente.post("/graphql", json={"query": QUERY, "extensions": persistida}).status_code == 400
+
+
+def test_mutation_por_get_e_rejeitada(cliente):
+    cliente.post("/graphql", json={"query": MUTATION, "extensions": extensoes(MUTATION)})
+
+    resposta = cliente.get("/graphql", params={"extensions": json.dumps(extensoes(MUTATION))})
+
+    assert resposta.status_code == 400
+    assert "mutations are not allowed" in resposta.text
+
+
+def test_somente_permitidas(cliente, somente_permitidas):
+    outra = "query Outra { __typename }"
+
+    permitida = cliente.post("/graphql", json={"extensions": extensoes(QUERY)})
+    texto_completo = cliente.post("/graphql", json={"query": outra})
+    registro = cliente.post("/graphql", json={"query": outra, "extensions": extensoes(outra)})
+    so_hash = cliente.post("/graphql", json={"extensions": extensoes(outra)})
+
+    assert permitida.json()["data"] == {"__typename": "Query"}
+    assert codigo_do_erro(texto_completo) == "PERSISTED_QUERY_NOT_ALLOWED"
+    assert codigo_do_erro(registro) == "PERSISTED_QUERY_NOT_ALLOWED"
+    assert codigo_do_erro(so_hash) == "PERSISTED_QUERY_NOT_ALLOWED"
+
+
+def test_armazem_descarta_a_menos_usada():
+    armazem = ArmazemConsultasPersistidas(max_entradas=2)
+    armazem.registrar("a", "query A { __typename }")
+    armazem.registrar("b", "query B { __typename }")
+
+    assert armazem.obter("a") is not None  # "a" passa a ser a mais recente
+    armazem.registrar("c", "query C { __typename }")
+
+    assert armazem.obter("b") is None
+    assert armazem.obter("a") is not None
+    assert armazem.obter("c") is not None
+
+
+def test_armazem_nunca_descarta_as_permitidas():
+    armazem = ArmazemConsultasPersistidas(max_entradas=1, permitidas={"p": "query P { __typename }"})
+    armazem.registrar("a", "query A { __typename }")
+    armazem.registrar("b", "query B { __typename }")
+
+    assert armazem.obter("p") == "query P { __typename }"
+    assert armazem.obter("a") is None
@@ -0,0 +1,89 @@
+import asyncio
+
+from graphql import parse
+
+from app.config import settings
+from app.graphql.custo import calcular_custo
+from app.graphql.schema import schema
+
+PADRAO = 10
+LIMITE = 100
+
+
+def custo(documento: str, variaveis: dict = None, nome_operacao: str = None):
+    return calcular_custo(schema._schema, parse(documento), nome_operacao, variaveis, PADRAO, LIMITE)
+
+
+def codigos(documento: str) -> list:
+    """Executa o documento no schema; as operações barradas pelo custo não chegam ao banco."""
+    resultado = asyncio.run(schema.execute(documento))
+    return [erro.extensions["code"] for erro in resultado.errors or []]
+
+
+def test_campos_escalares_e_introspeccao_nao_custam():
+    assert custo("{ __typename sala(salaId: 1) { id nome } }").custo == 1
+
+
+def test_lista_usa_o_argumento_de_tamanho():
+    assert custo("{ salas(limit: 7) { id } }").custo == 1 + 7 * 0
+    assert custo("{ reservas(limit: 7) { responsavel { id } } }").custo == 1 + 7 * 1
+
+
+def test_conexao_nao_multiplica_edges_de_novo():
+    # salasConexao (1) + 5 x [edges (1) + node (1)]; edges não usa o tamanho padrão de lista
+    resultado = custo("{ salasConexao(first: 5) { edges { cursor node { id nome } } } }")
+    assert resultado.custo == 1 + 5 * (1 + 1)
+    assert resultado.profundidade == 4  # salasConexao > edges > node > id
+
+
+def test_tamanho_vindo_de_variavel():
+    documento = "query Salas($n: Int!) { salasConexao(first: $n) { edges { node { id } } } }"
+    assert custo(documento, {"n": 50}).custo == 1 + 50 * 2
+
+
+def test_tamanhos_acima_do_limite():
+    resultado = custo(
+        "query Salas($n: Int!) { salasConexao(first: $n) { edges { node { id } } } reservas(limit: 500) { id } }",
+        {"n": LIMITE + 1}
+    )
+    assert resultado.tamanhos_excedidos == [("salasConexao", "first", LIMITE + 1), ("reservas", "limit", 500)]
+
+
+def test_ciclo_de_fragmentos_termina():
+    resultado = custo("""
+        { sala(salaId: 1) { ...A } }
+        fragment A on SalaType { id ...B }
+        fragment B on SalaType { nome ...A }
+    """)
+    assert resultado.custo == 1
+
+
+def test_custo_que_depende_dos_argumentos():
+    grade = custo(
+        '{ gradeOcupacao(salaIds: [1, 2, 2, 3], dataInicio: "2031-03-10", dataFim: "2031-03-16") { inicio } }'
+    )
+    # 3 salas distintas x 7 dias
+    assert grade.custo == 3 * 7
+
+    datas_invalidas = custo('{ gradeOcupacao(salaIds: [1, 2], dataInicio: "ontem", dataFim: "hoje") { inicio } }')
+    assert datas_invalidas.custo == 2
+
+
+def test_operacao_escolhida_pelo_nome():
+    documento = "query A { salas(limit: 2) { id } } query B { salas(limit: 3) { id } }"
+    assert custo(documento, nome_operacao="B").custo == 1
+    assert custo(documento) is None
+
+
+def test_extensao_rejeita_custo_acima_do_maximo(monkeypatch):
+    monkeypatch.setattr(settings, "graphql_custo_maximo", 10)
+    assert codigos("{ reservas(limit: 20) { responsavel { id } } }") == ["CUSTO_EXCEDIDO"]
+
+
+def test_extensao_rejeita_tamanho_acima_do_limite():
+    assert codigos(f"{{ salas(limit: {settings.graphql_limite_maximo + 1}) {{ id }} }}") == ["LIMITE_EXCEDIDO"]
+
+
+def test_extensao_rejeita_profundidade(monkeypatch):
+    monkeypatch.setattr(settings, "graphql_profundidade_maxima", 2)
+    assert codigos("{ salasConexao(first: 1) { edges { node { id } } } }") == ["PROFUNDIDADE_EXCEDIDA"]
@@ -0,0 +1,162 @@
+import base64
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.controllers.reserva_controller import (
+    MAXIMO_SALAS_GRADE,
+    ReservaController,
+    _montar_grade_ocupacao,
+    compactar_grade_ocupacao,
+)
+
+DIA = date(2031, 3, 10)
+INICIO = datetime(2031, 3, 10)
+
+
+def slots_ocupados(linha) -> list:
+    return [int(i) for i in linha.nonzero()[0]]
+
+
+def h(hora: int, minuto: int = 0, dia: int = 10) -> datetime:
+    return datetime(2031, 3, dia, hora, minuto)
+
+
+def grade_de_um_dia(linhas, sala_ids=(1,), passo_minutos=15):
+    total_slots = 24 * 60 // passo_minutos
+    return _montar_grade_ocupacao(linhas, list(sala_ids), INICIO, total_slots, passo_minutos * 60)
+
+
+# Vetor de diferenças (sem banco)
+
+def test_grade_sem_reservas():
+    grade = grade_de_um_dia([], sala_ids=(1, 2))
+    assert grade.shape == (2, 96) and not grade.any()
+
+
+def test_reservas_recortadas_nas_bordas_da_grade():
+    grade = grade_de_um_dia([
+        (1, h(22, dia=9), h(0, 30)),
+        (1, h(23, 45), h(2, dia=11)),
+    ])
+    assert slots_ocupados(grade[0]) == [0, 1, 95]
+
+
+def test_reserva_que_cobre_a_grade_inteira():
+    grade = grade_de_um_dia([(1, h(0, dia=9), h(0, dia=12))])
+    assert grade.all()
+
+
+def test_reserva_terminando_no_fim_exato_da_grade():
+    # O -1 vai para a coluna extra (total_slots) do vetor de diferenças
+    grade = grade_de_um_dia([(1, h(23, 30), h(0, dia=11))])
+    assert slots_ocupados(grade[0]) == [94, 95]
+
+
+def test_reservas_adjacentes_e_sobrepostas_nao_cancelam_a_contagem():
+    grade = grade_de_um_dia([
+        (1, h(9), h(10)),
+        (1, h(10), h(10, 30)),
+        (1, h(9, 15), h(9, 45)),
+    ])
+    assert slots_ocupados(grade[0]) == [36, 37, 38, 39, 40, 41]
+
+
+def test_reserva_fora_do_alinhamento_marca_os_slots_que_toca():
+    grade = grade_de_um_dia([(1, h(9, 5), h(9, 20))])
+    assert slots_ocupados(grade[0]) == [36, 37]
+
+
+def test_reserva_vazia_na_borda_de_um_slot_nao_marca_nada():
+    assert not grade_de_um_dia([(1, h(9), h(9))]).any()
+
+
+def test_reservas_vao_para_a_linha_da_sua_sala():
+    grade = grade_de_um_dia([(7, h(1), h(2)), (3, h(0), h(1))], sala_ids=(3, 7), passo_minutos=60)
+    assert slots_ocupados(grade[0]) == [0]
+    assert slots_ocupados(grade[1]) == [1]
+
+
+def test_compactar_grade_ocupacao():
+    grade = np.zeros((2, 12), dtype=bool)
+    grade[0, [0, 7, 8]] = True
+    grade[1, 11] = True
+
+    bitmaps = [base64.b64decode(b) for b in compactar_grade_ocupacao(grade)]
+
+    # Bit mais significativo primeiro; cada linha é completada com zeros até fechar o byte
+    assert bitmaps == [bytes([0b10000001, 0b10000000]), bytes([0b00000000, 0b00010000])]
+
+
+# Com banco
+
+
+def test_reserva_que_atravessa_a_meia_noite(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 23, 30), datetime(2031, 3, 11, 0, 30))
+
+    inicio, grade = ReservaController.gerar_grade_ocupacao(db, [sala.id], DIA, date(2031, 3, 11), 15)
+
+    assert inicio == datetime(2031, 3, 10)
+    assert grade.shape == (1, 2 * 96)
+    # 23:30-23:59 do primeiro dia e 00:00-00:29 do segundo
+    assert slots_ocupados(grade[0]) == [94, 95, 96, 97]
+
+
+def test_reserva_que_comeca_antes_do_periodo_e_recortada(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 9, 23, 0), datetime(2031, 3, 10, 0, 30))
+    reservar(sala, datetime(2031, 3, 10, 23, 45), datetime(2031, 3, 11, 1, 0))
+
+    _, grade = ReservaController.gerar_grade_ocupacao(db, [sala.id], DIA, DIA, 15)
+
+    assert grade.shape == (1, 96)
+    assert slots_ocupados(grade[0]) == [0, 1, 95]
+
+
+def test_reservas_adjacentes_ocupam_slots_consecutivos_sem_vazar(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 9, 0), datetime(2031, 3, 10, 10, 0))
+    reservar(sala, datetime(2031, 3, 10, 10, 0), datetime(2031, 3, 10, 10, 30))
+
+    _, grade = ReservaController.gerar_grade_ocupacao(db, [sala.id], DIA, DIA, 15)
+
+    # O fim exato na borda de um slot não marca o slot seguinte
+    assert slots_ocupados(grade[0]) == [36, 37, 38, 39, 40, 41]
+
+
+def test_reserva_menor_que_um_slot_marca_os_slots_que_toca(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 9, 0), datetime(2031, 3, 10, 9, 1))
+    reservar(sala, datetime(2031, 3, 10, 9, 59), datetime(2031, 3, 10, 10, 1))
+
+    _, grade = ReservaController.gerar_grade_ocupacao(db, [sala.id], DIA, DIA, 15)
+
+    assert slots_ocupados(grade[0]) == [36, 39, 40]
+
+
+def test_reserva_de_duracao_zero_e_rejeitada_pelo_banco(db, criar_sala, reservar):
+    sala = criar_sala()
+    with pytest.raises(IntegrityError):
+        reservar(sala, datetime(2031, 3, 10, 9, 0), datetime(2031, 3, 10, 9, 0))
+
+
+def test_uma_linha_por_sala_sem_duplicatas(db, criar_sala, reservar):
+    sala_livre, sala_ocupada = criar_sala(), criar_sala()
+    reservar(sala_ocupada, datetime(2031, 3, 10, 0, 0), datetime(2031, 3, 10, 0, 15))
+
+    _, grade = ReservaController.gerar_grade_ocupacao(
+        db, [sala_livre.id, sala_ocupada.id, sala_livre.id], DIA, DIA, 60
+    )
+
+    assert grade.shape == (2, 24)
+    assert slots_ocupados(grade[0]) == []
+    assert slots_ocupados(grade[1]) == [0]
+
+
+def test_limite_de_salas(db):
+    sala_ids = list(range(1, MAXIMO_SALAS_GRADE + 2))
+    with pytest.raises(ValueError, match="salas"):
+        ReservaController.gerar_grade_ocupacao(db, sala_ids, DIA, DIA, 15)
@@ -0,0 +1,152 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.controllers.reserva_controller import (
+    MAXIMO_SALAS_HORARIOS,
+    ReservaController,
+    _calcular_intervalos_livres,
+    _inicios_de_slots_livres,
+)
+
+DIA = date(2031, 3, 10)
+
+
+def h(hora: int, minuto: int = 0, dia: int = 10) -> datetime:
+    return datetime(2031, 3, dia, hora, minuto)
+
+
+def slots(ocupados, inicio, fim, passo_minutos, duracao_minutos=None):
+    """Mesmo cálculo de obter_horarios_disponiveis_por_hora, sem banco."""
+    passo = timedelta(minutes=passo_minutos)
+    duracao = max(passo, timedelta(minutes=duracao_minutos or 0))
+    return _inicios_de_slots_livres(_calcular_intervalos_livres(ocupados, inicio, fim), inicio, passo, duracao)
+
+
+# Varredura de intervalos (sem banco)
+
+def test_livres_sem_reservas():
+    assert _calcular_intervalos_livres([], h(8), h(18)) == [(h(8), h(18))]
+
+
+def test_livres_com_reserva_que_atravessa_a_meia_noite():
+    # Do dia anterior até 01:00, e de 23:30 até o dia seguinte
+    ocupados = [(h(23, dia=9), h(1)), (h(23, 30), h(0, 30, dia=11))]
+    assert _calcular_intervalos_livres(ocupados, h(0), h(23, 59)) == [(h(1), h(23, 30))]
+
+
+def test_livres_com_reservas_adjacentes():
+    ocupados = [(h(9), h(10)), (h(10), h(11))]
+    assert _calcular_intervalos_livres(ocupados, h(8), h(12)) == [(h(8), h(9)), (h(11), h(12))]
+
+
+def test_livres_ignora_intervalo_ocupado_vazio():
+    assert _calcular_intervalos_livres([(h(9, 30), h(9, 30))], h(8), h(10)) == [(h(8), h(10))]
+    assert slots([(h(9, 30), h(9, 30))], h(8), h(10), 60) == ["08:00", "09:00"]
+
+
+def test_livres_ignora_reservas_fora_da_janela():
+    ocupados = [(h(6), h(7)), (h(7), h(8)), (h(18), h(19))]
+    assert _calcular_intervalos_livres(ocupados, h(8), h(18)) == [(h(8), h(18))]
+
+
+def test_janela_vazia_nao_tem_intervalos_nem_slots():
+    assert _calcular_intervalos_livres([], h(9), h(9)) == []
+    assert slots([], h(9), h(9), 15) == []
+
+
+def test_slots_alinhados_a_grade_do_inicio_da_janela():
+    # Livre de 09:10 em diante: o primeiro slot de 30 minutos alinhado em 08:00 é 09:30
+    assert slots([(h(8), h(9, 10))], h(8), h(11), 30) == ["09:30", "10:00", "10:30"]
+
+
+def test_slot_precisa_caber_inteiro_no_intervalo_livre():
+    assert slots([(h(8, 45), h(9))], h(8), h(10), 60) == ["09:00"]
+    assert slots([(h(9), h(10))], h(8), h(11), 60) == ["08:00", "10:00"]
+
+
+def test_slots_com_duracao_minima():
+    # 45 minutos em slots de 15: só inícios com 45 minutos livres à frente
+    assert slots([(h(9), h(10))], h(8), h(11), 15, duracao_minutos=45) == [
+        "08:00", "08:15", "10:00", "10:15"
+    ]
+
+
+# Com banco
+
+
+def test_reserva_que_vem_do_dia_anterior(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 9, 23, 0), datetime(2031, 3, 10, 1, 0))
+
+    horas = ReservaController.obter_horarios_disponiveis_por_hora(
+        db, sala.id, DIA, "00:00:00", "04:00:00", granularidade_minutos=60
+    )
+
+    assert horas == ["01:00", "02:00", "03:00"]
+
+
+def test_reserva_que_termina_no_dia_seguinte(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 23, 30), datetime(2031, 3, 11, 0, 30))
+
+    horas = ReservaController.obter_horarios_disponiveis_por_hora(
+        db, sala.id, DIA, "22:00:00", "23:59:59", granularidade_minutos=30
+    )
+
+    assert horas == ["22:00", "22:30", "23:00"]
+
+
+def test_reservas_adjacentes_nao_deixam_slot_entre_elas(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 9, 0), datetime(2031, 3, 10, 10, 0))
+    reservar(sala, datetime(2031, 3, 10, 10, 0), datetime(2031, 3, 10, 11, 0))
+
+    horas = ReservaController.obter_horarios_disponiveis_por_hora(
+        db, sala.id, DIA, "08:00:00", "12:00:00", granularidade_minutos=60
+    )
+
+    assert horas == ["08:00", "11:00"]
+
+
+def test_intervalo_livre_menor_que_o_slot_e_ignorado(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 8, 0), datetime(2031, 3, 10, 8, 50))
+    reservar(sala, datetime(2031, 3, 10, 9, 0), datetime(2031, 3, 10, 10, 0))
+
+    horas = ReservaController.obter_horarios_disponiveis_por_hora(
+        db, sala.id, DIA, "08:00:00", "11:00:00", granularidade_minutos=15
+    )
+
+    # 08:50-09:00 fica livre, mas não cabe um slot alinhado à grade de 15 minutos
+    assert horas == ["10:00", "10:15", "10:30", "10:45"]
+
+
+def test_janela_de_duracao_zero(db, criar_sala):
+    sala = criar_sala()
+
+    horas = ReservaController.obter_horarios_disponiveis_por_hora(
+        db, sala.id, DIA, "09:00:00", "09:00:00", granularidade_minutos=15
+    )
+
+    assert horas == []
+
+
+def test_duracao_minima_zero_equivale_ao_slot(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 9, 0), datetime(2031, 3, 10, 10, 0))
+
+    sem_minimo = ReservaController.obter_horarios_disponiveis_por_hora(
+        db, sala.id, DIA, "08:00:00", "11:00:00", granularidade_minutos=30
+    )
+    minimo_zero = ReservaController.obter_horarios_disponiveis_por_hora(
+        db, sala.id, DIA, "08:00:00", "11:00:00", granularidade_minutos=30, duracao_minima_minutos=0
+    )
+
+    assert sem_minimo == minimo_zero == ["08:00", "08:30", "10:00", "10:30"]
+
+
+def test_limite_de_salas_em_horarios_disponiveis_salas(db):
+    sala_ids = list(range(1, MAXIMO_SALAS_HORARIOS + 2))
+    with pytest.raises(ValueError, match="salas"):
+        ReservaController.obter_horarios_disponiveis_salas(db, sala_ids, DIA)
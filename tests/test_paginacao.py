@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime
+
+import pytest
+
+from app.paginacao import (
+    MAXIMO_ITENS_POR_PAGINA,
+    codificar_cursor,
+    decodificar_cursor,
+    validar_tamanho_pagina,
+)
+
+
+def cursor_de(texto: str) -> str:
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii")
+
+
+def test_ida_e_volta_com_data_e_id():
+    chave = (datetime(2031, 3, 10, 9, 30, 15, 123456), 42)
+    assert decodificar_cursor(codificar_cursor(*chave), datetime, int) == chave
+
+
+def test_ida_e_volta_so_com_id():
+    assert decodificar_cursor(codificar_cursor(7), int) == (7,)
+
+
+def test_cursor_e_seguro_para_url():
+    cursor = codificar_cursor(datetime(2031, 3, 10), 10 ** 12)
+    assert "+" not in cursor and "/" not in cursor
+
+
+@pytest.mark.parametrize("cursor", [
+    "%%%não-é-base64",
+    "é",
+    cursor_de("{não é json"),
+    cursor_de('{"a": 1}'),
+    cursor_de("[1, 2]"),
+    cursor_de('["ontem", 1]'),
+    cursor_de('["2031-03-10T09:00:00", "x"]'),
+    cursor_de('["2031-03-10T09:00:00", {"id": 1}]'),
+    "",
+])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        decodificar_cursor(cursor, datetime, int)
+
+
+def test_cursor_com_numero_de_campos_diferente():
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        decodificar_cursor(codificar_cursor(7), datetime, int)
+
+
+def test_tamanho_da_pagina():
+    validar_tamanho_pagina(1)
+    validar_tamanho_pagina(MAXIMO_ITENS_POR_PAGINA)
+    for first in (0, -1, MAXIMO_ITENS_POR_PAGINA + 1):
+        with pytest.raises(ValueError, match=str(MAXIMO_ITENS_POR_PAGINA)):
+            validar_tamanho_pagina(first)
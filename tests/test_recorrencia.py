@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.controllers.reserva_controller import (
+    MAXIMO_OCORRENCIAS_RECORRENCIA,
+    _expandir_recorrencia,
+    _somar_meses,
+)
+from app.views import FrequenciaRecorrencia
+
+
+def inicios(intervalos) -> list:
+    return [inicio for inicio, _ in intervalos]
+
+
+def test_somar_meses_limita_ao_ultimo_dia_do_mes():
+    assert _somar_meses(datetime(2031, 1, 31, 9), 1) == datetime(2031, 2, 28, 9)
+    assert _somar_meses(datetime(2032, 1, 31, 9), 1) == datetime(2032, 2, 29, 9)
+    assert _somar_meses(datetime(2031, 3, 31, 9), 1) == datetime(2031, 4, 30, 9)
+
+
+def test_somar_meses_vira_o_ano():
+    assert _somar_meses(datetime(2031, 11, 15), 2) == datetime(2032, 1, 15)
+    assert _somar_meses(datetime(2031, 12, 31), 14) == datetime(2033, 2, 28)
+
+
+def test_mensal_sempre_a_partir_da_data_original():
+    intervalos = _expandir_recorrencia(
+        datetime(2031, 1, 31, 9), datetime(2031, 1, 31, 10),
+        FrequenciaRecorrencia.MENSAL, 1, data_limite=None, ocorrencias=4
+    )
+    # 31/03 e 30/04, e não 28/03 e 28/04 (que viriam de somar a partir de 28/02)
+    assert inicios(intervalos) == [
+        datetime(2031, 1, 31, 9), datetime(2031, 2, 28, 9), datetime(2031, 3, 31, 9), datetime(2031, 4, 30, 9)
+    ]
+
+
+def test_duracao_preservada_em_cada_ocorrencia():
+    intervalos = _expandir_recorrencia(
+        datetime(2031, 3, 10, 23, 30), datetime(2031, 3, 11, 0, 15),
+        FrequenciaRecorrencia.DIARIA, 2, data_limite=None, ocorrencias=3
+    )
+    assert all(fim - inicio == timedelta(minutes=45) for inicio, fim in intervalos)
+    assert inicios(intervalos) == [datetime(2031, 3, 10, 23, 30), datetime(2031, 3, 12, 23, 30), datetime(2031, 3, 14, 23, 30)]
+
+
+def test_data_limite_inclui_o_ultimo_dia():
+    intervalos = _expandir_recorrencia(
+        datetime(2031, 3, 3, 9), datetime(2031, 3, 3, 10),
+        FrequenciaRecorrencia.SEMANAL, 1, data_limite=date(2031, 3, 24), ocorrencias=None
+    )
+    assert inicios(intervalos)[-1] == datetime(2031, 3, 24, 9)
+    assert len(intervalos) == 4
+
+
+def test_data_limite_antes_do_inicio_nao_gera_ocorrencias():
+    assert _expandir_recorrencia(
+        datetime(2031, 3, 3, 9), datetime(2031, 3, 3, 10),
+        FrequenciaRecorrencia.DIARIA, 1, data_limite=date(2031, 3, 2), ocorrencias=None
+    ) == []
+
+
+def test_para_no_que_vier_primeiro_entre_limite_e_ocorrencias():
+    intervalos = _expandir_recorrencia(
+        datetime(2031, 3, 3, 9), datetime(2031, 3, 3, 10),
+        FrequenciaRecorrencia.DIARIA, 1, data_limite=date(2031, 12, 31), ocorrencias=5
+    )
+    assert len(intervalos) == 5
+
+
+def test_limite_de_ocorrencias():
+    inicio, fim = datetime(2031, 1, 1, 9), datetime(2031, 1, 1, 10)
+    assert len(_expandir_recorrencia(
+        inicio, fim, FrequenciaRecorrencia.DIARIA, 1, data_limite=None, ocorrencias=MAXIMO_OCORRENCIAS_RECORRENCIA
+    )) == MAXIMO_OCORRENCIAS_RECORRENCIA
+    with pytest.raises(ValueError, match=str(MAXIMO_OCORRENCIAS_RECORRENCIA)):
+        _expandir_recorrencia(
+            inicio, fim, FrequenciaRecorrencia.DIARIA, 1, data_limite=None, ocorrencias=MAXIMO_OCORRENCIAS_RECORRENCIA + 1
+        )
+    with pytest.raises(ValueError):
+        _expandir_recorrencia(
+            inicio, fim, FrequenciaRecorrencia.DIARIA, 1, data_limite=date(2033, 1, 1), ocorrencias=None
+        )
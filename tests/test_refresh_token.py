@@ -0,0 +1,88 @@
+import hashlib
+import hmac
+import re
+from datetime import datetime, timedelta
+
+from app.auth import gerar_refresh_token, hash_refresh_token
+from app.config import settings
+from app.controllers.auth_controller import AuthController
+from app.models import RefreshToken
+
+
+# Geração e hash (sem banco)
+
+def test_refresh_tokens_sao_aleatorios_e_seguros_para_url():
+    tokens = {gerar_refresh_token() for _ in range(100)}
+    assert len(tokens) == 100
+    assert all(re.fullmatch(r"[A-Za-z0-9_-]{43}", token) for token in tokens)
+
+
+def test_hash_e_hmac_com_a_secret_key():
+    token = gerar_refresh_token()
+    esperado = hmac.new(settings.secret_key.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    assert hash_refresh_token(token) == hash_refresh_token(token) == esperado
+    assert re.fullmatch(r"[0-9a-f]{64}", esperado)
+    # Sem a chave, o hash não é o SHA-256 puro do token
+    assert esperado != hashlib.sha256(token.encode("utf-8")).hexdigest()
+    assert hash_refresh_token(gerar_refresh_token()) != esperado
+
+
+def test_hash_depende_da_secret_key(monkeypatch):
+    token = gerar_refresh_token()
+    original = hash_refresh_token(token)
+    monkeypatch.setattr(settings, "secret_key", settings.secret_key + "-outra")
+    assert hash_refresh_token(token) != original
+
+
+# Com banco
+
+
+def test_rotacao_revoga_o_token_usado(db, usuario):
+    token = AuthController.emitir_refresh_token(db, usuario.id)
+
+    claims, novo_token = AuthController.renovar_refresh_token(db, token)
+
+    assert claims["sub"] == usuario.username
+    assert claims["uid"] == usuario.id
+    assert novo_token != token
+    usado = db.query(RefreshToken).filter_by(token_hash=hash_refresh_token(token)).one()
+    assert usado.revogado_em is not None
+
+
+def test_reapresentar_token_ja_trocado_revoga_todos(db, usuario):
+    token = AuthController.emitir_refresh_token(db, usuario.id)
+    _, token_rotacionado = AuthController.renovar_refresh_token(db, token)
+    outro_dispositivo = AuthController.emitir_refresh_token(db, usuario.id)
+
+    # Replay do token já trocado: indica vazamento
+    assert AuthController.renovar_refresh_token(db, token) is None
+
+    # O token obtido na rotação e os demais tokens do usuário também deixam de valer
+    assert AuthController.renovar_refresh_token(db, token_rotacionado) is None
+    assert AuthController.renovar_refresh_token(db, outro_dispositivo) is None
+    ativos = db.query(RefreshToken).filter(
+        RefreshToken.usuario_id == usuario.id,
+        RefreshToken.revogado_em.is_(None)
+    ).count()
+    assert ativos == 0
+
+
+def test_token_expirado_ou_desconhecido(db, usuario):
+    token = AuthController.emitir_refresh_token(db, usuario.id)
+    db.query(RefreshToken).filter_by(token_hash=hash_refresh_token(token)).update(
+        {RefreshToken.expira_em: datetime.utcnow() - timedelta(seconds=1)}
+    )
+
+    assert AuthController.renovar_refresh_token(db, token) is None
+    assert AuthController.renovar_refresh_token(db, "nao-existe") is None
+
+
+def test_troca_de_senha_no_perfil_invalida_tokens(db, usuario):
+    token = AuthController.emitir_refresh_token(db, usuario.id)
+    versao = usuario.token_versao
+
+    AuthController.atualizar_usuario(db, usuario.id, hashed_password="novo-hash")
+
+    assert usuario.token_versao == versao + 1
+    assert AuthController.renovar_refresh_token(db, token) is None
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.routers import timeline
+
+
+def _transmissor_com_carga(sala_id: int, falhas_a_partir_de: int) -> timeline.TransmissorTimelineSala:
+    """Timeline cuja carga (sem banco) falha a partir da chamada `falhas_a_partir_de`."""
+    transmissor = timeline.transmissores[sala_id] = timeline.TransmissorTimelineSala(sala_id)
+    chamadas = []
+
+    async def carregar():
+        chamadas.append(1)
+        if len(chamadas) >= falhas_a_partir_de:
+            raise RuntimeError("banco indisponível")
+        # Dia já passado: a virada do dia (nova carga) acontece em seguida
+        transmissor.dia = datetime.utcnow().date() - timedelta(days=1)
+        transmissor.reservas = {}
+
+    transmissor._carregar = carregar
+    return transmissor
+
+
+def test_falha_ao_recarregar_na_virada_do_dia_encerra_a_timeline():
+    async def cenario():
+        transmissor = _transmissor_com_carga(9001, falhas_a_partir_de=2)
+        fila = await transmissor.conectar()
+        assert fila.get_nowait()[0] == "estado"
+
+        # A fila do cliente é fechada e a timeline sai de `transmissores`
+        assert await asyncio.wait_for(fila.get(), timeout=2) is None
+        await asyncio.sleep(0)
+        assert transmissor._tarefa.done() and transmissor._tarefa.exception() is None
+        assert 9001 not in timeline.transmissores
+        transmissor.desconectar(fila)
+
+    asyncio.run(cenario())
+
+
+def test_falha_na_primeira_carga_nao_registra_o_cliente():
+    async def cenario():
+        transmissor = _transmissor_com_carga(9002, falhas_a_partir_de=1)
+        try:
+            await transmissor.conectar()
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("conectar deveria propagar o erro da carga")
+        assert not transmissor.clientes
+        assert 9002 not in timeline.transmissores
+
+    asyncio.run(cenario())
+
+
+def test_cancelar_uma_conexao_nao_cancela_a_carga_das_demais():
+    async def cenario():
+        transmissor = timeline.transmissores[9003] = timeline.TransmissorTimelineSala(9003)
+        liberar = asyncio.Event()
+
+        async def carregar():
+            await liberar.wait()
+            transmissor.dia = datetime.utcnow().date()
+            transmissor.reservas = {}
+
+        transmissor._carregar = carregar
+        primeira = asyncio.create_task(transmissor.conectar())
+        segunda = asyncio.create_task(transmissor.conectar())
+        await asyncio.sleep(0)
+        assert not transmissor.clientes
+
+        primeira.cancel()
+        await asyncio.sleep(0)
+        assert not transmissor._tarefa.done()
+
+        liberar.set()
+        fila = await segunda
+        assert fila.get_nowait()[0] == "estado"
+        assert transmissor.clientes == {fila}
+        transmissor.desconectar(fila)
+        await asyncio.sleep(0)
+        assert 9003 not in timeline.transmissores
+
+    asyncio.run(cenario())
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta, timezone
+
+from app.controllers.reserva_controller import ReservaController, _para_utc_ingenuo
+
+
+def test_para_utc_ingenuo():
+    assert _para_utc_ingenuo(datetime(2031, 3, 10, 9, 0)) == datetime(2031, 3, 10, 9, 0)
+    assert _para_utc_ingenuo(datetime(2031, 3, 10, 9, 0, tzinfo=timezone.utc)) == datetime(2031, 3, 10, 9, 0)
+    menos_3 = timezone(timedelta(hours=-3))
+    # 22:00 em UTC-3 já é o dia seguinte em UTC
+    assert _para_utc_ingenuo(datetime(2031, 3, 10, 22, 0, tzinfo=menos_3)) == datetime(2031, 3, 11, 1, 0)
+
+
+def test_horarios_com_fuso_usam_o_cache_em_utc(db, criar_sala, reservar):
+    sala = criar_sala()
+    reservar(sala, datetime(2031, 3, 10, 12, 0), datetime(2031, 3, 10, 13, 0))
+    menos_3 = timezone(timedelta(hours=-3))
+
+    assert ReservaController.verificar_disponibilidade(
+        db, sala.id, datetime(2031, 3, 10, 12, 30, tzinfo=timezone.utc), datetime(2031, 3, 10, 12, 45, tzinfo=timezone.utc)
+    ) is False
+    assert ReservaController.verificar_disponibilidade(
+        db, sala.id, datetime(2031, 3, 10, 10, 0, tzinfo=menos_3), datetime(2031, 3, 10, 11, 0, tzinfo=menos_3)
+    ) is True
+    assert ReservaController.verificar_disponibilidade(
+        db, sala.id, datetime(2031, 3, 10, 9, 30, tzinfo=menos_3), datetime(2031, 3, 10, 9, 45, tzinfo=menos_3)
+    ) is False